@@ -1,76 +1,447 @@
 import random
+from array import array
+
+EMPTY_TILE = '_'
+PICKED_TILE = ' '
+
+
+def cell_typecode(t: int) -> str:
+    """
+    Returns the smallest unsigned array typecode able to hold treasure values up to t.
+    :param t: Largest treasure value that will be stored on the board
+    :return: 'B' (1 byte), 'H' (2 bytes) or 'I' (4 bytes)
+    """
+    if t <= 0xFF: return 'B'
+    if t <= 0xFFFF: return 'H'
+    return 'I'
+
+
+# Random probes per chain before falling back to enumerating every valid placement
+SAMPLE_ATTEMPTS = 32
+# Chains undone while searching before switching to the guaranteed one-chain-per-row layout
+MAX_BACKTRACKS = 64
+# Vectorized probe rounds per chain in Board.generate_many before a board is rebuilt with place_chains
+BATCH_ATTEMPTS = 16
+# Chains going up or left cover the same tiles as chains going down or right from their other end,
+# so only down and right need to be considered
+CHAIN_STEPS = ((1, 0), (0, 1))
+
+
+def check_treasure_fits(n: int, t: int) -> None:
+    """
+    Rejects (n, t) combinations that can never be placed, before any placement work is done.
+    Any t <= n always fits: one chain per row (see rows_layout).
+    :param n: Board size
+    :param t: Longest treasure chain
+    :raises ValueError: if n < 1, t < 1, or t > n
+    :return: None
+    """
+    if n < 1: raise ValueError("n must be greater than 0")
+    if t < 1: raise ValueError("t must be greater than 0")
+    if t > n: raise ValueError("Treasure t length cant be greater than n board length")
+
+
+def chain_positions(n: int, row: int, col: int, step: tuple[int, int], length: int) -> list[int]:
+    """
+    Returns the row-major indices of a chain, wrapping around the board edges.
+    :param n: Board size
+    :param row: Starting row
+    :param col: Starting column
+    :param step: (row, col) direction of the chain
+    :param length: Number of tiles in the chain
+    :return: List of tile indices
+    """
+    return [((row + step[0] * i) % n) * n + (col + step[1] * i) % n for i in range(length)]
+
+
+def free_runs(line) -> list[int]:
+    """
+    For each tile of a circular line, counts the consecutive free (zero) tiles starting at it.
+    Walks the line backwards twice so runs can wrap around the board edge.
+    :param line: Sequence of tile values, 0 meaning free
+    :return: Run length for each position, n for every tile if the whole line is free
+    """
+    n = len(line)
+    if not any(line): return [n] * n
+    runs = [0] * n
+    run = 0
+    for i in range(2 * n - 1, -1, -1):
+        run = 0 if line[i % n] else run + 1
+        runs[i % n] = run
+    return runs
+
+
+def chain_candidates(cells, n: int, length: int) -> list[tuple[int, int, tuple[int, int]]]:
+    """
+    Enumerates every (row, col, step) where a chain of the given length fits on free tiles.
+    :param cells: Row-major tile values, 0 meaning free
+    :param n: Board size
+    :param length: Chain length
+    :return: List of (row, col, step) candidates
+    """
+    down, right = CHAIN_STEPS
+    candidates = []
+    for row in range(n):
+        runs = free_runs(cells[row * n:(row + 1) * n])
+        candidates.extend((row, col, right) for col in range(n) if runs[col] >= length)
+    if length == 1: return candidates
+    for col in range(n):
+        runs = free_runs(cells[col::n])
+        candidates.extend((row, col, down) for row in range(n) if runs[row] >= length)
+    return candidates
+
+
+def sample_chain(cells, n: int, length: int, rng) -> list[int] | None:
+    """
+    Tries SAMPLE_ATTEMPTS random starts and directions for a chain, returning the first that is free.
+    :return: Tile indices of the chain, or None if every probe collided
+    """
+    for _ in range(SAMPLE_ATTEMPTS):
+        positions = chain_positions(n, rng.randrange(n), rng.randrange(n), rng.choice(CHAIN_STEPS), length)
+        if not any(cells[index] for index in positions):
+            return positions
+    return None
+
+
+def rows_layout(cells, n: int, t: int, rng) -> None:
+    """
+    Places each chain in its own randomly chosen row (or column), which always fits when t <= n.
+    :param cells: Row-major tile values, all 0
+    :return: None
+    """
+    transpose = rng.random() < 0.5
+    for length, line in zip(range(t, 0, -1), rng.sample(range(n), t)):
+        step = CHAIN_STEPS[0] if transpose else CHAIN_STEPS[1]
+        row, col = (rng.randrange(n), line) if transpose else (line, rng.randrange(n))
+        for index in chain_positions(n, row, col, step, length):
+            cells[index] = length
+
+
+# The web app has a copy of this engine (website/game/placement.py, deployed without this module);
+# test_placement_engines_agree keeps the two in step.
+def place_chains(cells, n: int, t: int, rng) -> None:
+    """
+    Places treasure chains from t down to 1 on an empty row-major board.
+    Each chain is first tried with a few random probes; if they all collide, every valid placement is enumerated
+    and one is chosen at random. When no placement exists, earlier chains are undone and moved to their next
+    candidate (backtracking). After MAX_BACKTRACKS the board is cleared and rows_layout is used, so placement
+    always finishes in bounded time.
+    :param cells: Row-major tile values (mutable sequence of n * n zeros), filled in place
+    :param n: Board size
+    :param t: Longest treasure chain
+    :param rng: random.Random (or the random module) used for every choice
+    :raises ValueError: if the chains can never fit (see check_treasure_fits)
+    :return: None
+    """
+    check_treasure_fits(n, t)
+    placed = []  # (length, remaining candidates or None, positions) for every chain on the board
+    backtracks = 0
+    length = t
+    while length > 0:
+        remaining = None
+        positions = sample_chain(cells, n, length, rng)
+        if positions is None:
+            remaining = chain_candidates(cells, n, length)
+            rng.shuffle(remaining)
+        while positions is None:
+            if remaining:
+                row, col, step = remaining.pop()
+                positions = chain_positions(n, row, col, step, length)
+                break
+            if not placed or backtracks >= MAX_BACKTRACKS:
+                for index in range(n * n):
+                    cells[index] = 0
+                rows_layout(cells, n, t, rng)
+                return
+            backtracks += 1
+            length, remaining, undone = placed.pop()
+            for index in undone:
+                cells[index] = 0
+            if remaining is None:
+                # The chain was placed by a probe; enumerate its other placements now
+                remaining = [candidate for candidate in chain_candidates(cells, n, length)
+                             if chain_positions(n, *candidate, length) != undone]
+                rng.shuffle(remaining)
+        for index in positions:
+            cells[index] = length
+        placed.append((length, remaining, positions))
+        length -= 1
+
+
+def validate_board_args(n: int, t: str) -> None:
+    """
+    Validates the board size and treasure count passed to Board or Board.generate_many.
+    :param n: Board size, must be an int >= 2
+    :param t: Number of treasure types as a digit string, 1 <= t <= n
+    :raises ValueError: if n is not an int, n < 2, t is not a digit, t <= 0, or t > n
+    :return: None
+    """
+    if type(n) != int: raise ValueError("n must be an int")
+    if n < 2: raise ValueError("n must not be less than 2")
+    if not t.isdigit() or int(t) <= 0: raise ValueError("t must be digit greater 0")
+    if int(t) <= 0 or int(t) > n: raise ValueError("Treasure t length cant be greater than n board length")
+
+
+class ReadOnlyList(list):
+    """
+    A list that cannot be changed in place, returned by Board.board: the rows are built from the compact storage on
+    every access, so a write into them would otherwise be lost without an error. Compares equal to a plain list.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Board.board is a read-only copy; assign a whole board to Board.board instead")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return list, (list(self),)
 
 
 class Board:
 
-    def __init__(self, n: int = 10, t: str = '4') -> None:
+    def __init__(self, n: int = 10, t: str = '4', seed: int | None = None, rng: random.Random | None = None) -> None:
         """
         Initialize the board, validating n and t, raising ValueErrors if invalid.
-        Creates a board as a 2D list with all tiles initially set to '_' (underscore).
+        Tiles are stored row-major in a compact unsigned array (0 is an empty tile, otherwise the treasure value),
+        with a separate bitmap (one bit per tile) recording which tiles have been picked.
         Default (no args) is a 10 x 10 board with 4 treasures.
         :param n: Board size - creates an n x n square grid of tiles. Must be >= 2
         :param t: Number of treasure types (as string). Creates treasure chains from t down to 1.
                   Each treasure type has a value equal to its number.
                   For example, if t='4', creates treasures labeled 4, 3, 2, and 1.
+        :param seed: Optional seed; the same n, t and seed always produce the same board
+        :param rng: Optional random.Random used for treasure placement (instead of seed).
+                    Without seed or rng the global random module is used.
         :raises ValueError: if n is not an int, n < 2, t is not a digit, t <= 0, or t > n
+        :raises ValueError: if both seed and rng are given
         :return: None
         """
-        if type(n) != int: raise ValueError("n must be an int")
-        if n < 2: raise ValueError("n must not be less than 2")
-        if not t.isdigit() or int(t) <= 0: raise ValueError("t must be digit greater 0")
-        if int(t) <= 0 or int(t) > n: raise ValueError("Treasure t length cant be greater than n board length")
+        validate_board_args(n, t)
+        if seed is not None and rng is not None: raise ValueError("Pass either seed or rng, not both")
 
         self.n = n
         self.t = int(t)
-        self.board = [['_' for _ in range(n)] for _ in range(self.n)]
+        self.rng = rng if rng is not None else random.Random(seed) if seed is not None else random
+        self._reset_tiles()
         self.place_treasure()
 
-    def place_treasure(self) -> None:
+    @classmethod
+    def generate_many(cls, count: int, n: int = 10, t: str = '4', seed: int | None = None):
         """
-        Places treasure chains on the board when the board is initialized.
-        For each treasure type from self.t down to 1:
-        Randomly selects a starting position and direction (up/down/left/right)
-        Places a chain of tiles with length equal to the treasure value
-        Each tile in the chain is labeled with the treasure value (I.e a 4-treasure (t) is 4 tiles labeled '4')
-        Wraparound board edges
-        Ensures no overlap with existing treasures by retrying if collision detected
+        Generates a batch of boards as one stacked NumPy array, placing each chain length on every board at once.
+        For each chain from t down to 1, every board still needing that chain gets a random start and direction,
+        collisions are checked for the whole batch with one fancy-indexing lookup, and only the boards that collided
+        are probed again. A board still colliding after BATCH_ATTEMPTS rounds is rebuilt on its own with
+        place_chains, so the batch always finishes. Requires NumPy.
+        :param count: Number of boards to generate
+        :param n: Board size, as for Board()
+        :param t: Number of treasure types (as string), as for Board()
+        :param seed: Optional seed; the same arguments and seed always produce the same batch
+        :raises ValueError: if count < 0 or n and t are invalid (see validate_board_args)
+        :return: Array of shape (count, n, n) holding tile values (0 for empty), convert slices with from_array()
+        """
+        import numpy as np
+
+        validate_board_args(n, t)
+        if type(count) != int or count < 0: raise ValueError("count must be an int >= 0")
+        t = int(t)
+        rng = np.random.default_rng(seed)
+        cells = np.zeros((count, n * n), dtype=np.dtype(cell_typecode(t)))
+        rebuilt = np.zeros(count, dtype=bool)
+
+        for length in range(t, 0, -1):
+            offsets = np.arange(length)
+            pending = np.flatnonzero(~rebuilt)
+            for _ in range(BATCH_ATTEMPTS):
+                rows = rng.integers(0, n, len(pending))[:, None]
+                cols = rng.integers(0, n, len(pending))[:, None]
+                down = rng.integers(0, 2, len(pending)).astype(bool)[:, None]
+                positions = ((rows + offsets * down) % n) * n + (cols + offsets * ~down) % n
+                free = ~cells[pending[:, None], positions].any(axis=1)
+                cells[pending[free][:, None], positions[free]] = length
+                pending = pending[~free]
+                if not len(pending): break
+            for board in pending:
+                tiles = array(cell_typecode(t), bytes(n * n * cells.itemsize))
+                place_chains(tiles, n, t, random.Random(int(rng.integers(1 << 63))))
+                cells[board] = np.frombuffer(tiles, dtype=cells.dtype)
+                rebuilt[board] = True
+
+        return cells.reshape(count, n, n)
+
+    @classmethod
+    def from_array(cls, tiles) -> 'Board':
+        """
+        Builds an unpicked Board from an n x n array of tile values, such as one slice of generate_many().
+        :param tiles: n x n NumPy array (or nested sequence) of ints, 0 for empty tiles
+        :raises ValueError: if tiles is not a square array of size >= 2
+        :return: Board with those tile values and t set to the largest value
+        """
+        import numpy as np
+
+        tiles = np.asarray(tiles)
+        if tiles.ndim != 2 or tiles.shape[0] != tiles.shape[1]: raise ValueError("tiles must be an n x n array")
+        if tiles.shape[0] < 2: raise ValueError("n must not be less than 2")
+
+        board = cls.__new__(cls)
+        board.n = tiles.shape[0]
+        board.t = max(int(tiles.max()), 1)
+        board.rng = random
+        board._reset_tiles()
+        board._cells = array(cell_typecode(board.t), tiles.astype(np.dtype(cell_typecode(board.t))).tobytes())
+        return board
+
+    @classmethod
+    def from_cells(cls, n: int, t: int, cells: bytes) -> 'Board':
+        """
+        Builds an unpicked Board from raw tile values, as returned by cells_bytes().
+        :param n: Board size
+        :param t: Largest treasure value, which sets the cell size (see cell_typecode)
+        :param cells: n * n tile values in row-major order, in the native byte order
+        :raises ValueError: if n < 2, t < 1 or cells does not hold n * n tiles
+        :return: Board with those tile values
+        """
+        if type(n) != int or n < 2: raise ValueError("n must not be less than 2")
+        if type(t) != int or t < 1: raise ValueError("t must be >= 1")
+        if len(cells) != n * n * array(cell_typecode(t)).itemsize: raise ValueError("cells must hold n * n tiles")
+
+        board = cls.__new__(cls)
+        board.n = n
+        board.t = t
+        board.rng = random
+        board._reset_tiles()
+        board._cells = array(cell_typecode(t), cells)
+        return board
+
+    def cells_bytes(self) -> bytes:
+        """
+        Returns the tile values, hidden treasure included, for storage (see from_cells).
+
+        :return: n * n tile values in row-major order (0 for empty), cell_typecode(t) items in the native byte order
+        """
+        return self._cells.tobytes()
+
+    def _reset_tiles(self) -> None:
+        """
+        Allocates an empty, unpicked board: n * n zeroed cells, a zeroed picked bitmap and an empty pick history.
         :return: None
         """
-        t_count = int(self.t)
+        typecode = cell_typecode(self.t)
+        self._cells = array(typecode, bytes(self.n * self.n * array(typecode).itemsize))
+        self._picked = bytearray((self.n * self.n + 7) // 8)
+        # Row-major index of every newly picked tile, in pick order; its length is the board version
+        self._history = array('I')
+        self._rebuild_mask()
 
-        directions = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1)}
+    @property
+    def version(self) -> int:
+        """
+        Board version: the number of tiles picked so far. Only picks of unpicked tiles change it.
+        :return: Current version
+        """
+        return len(self._history)
 
-        while t_count > 0:
-            placed = False
-            while not placed:
-                row = random.randint(0, self.n - 1)
-                col = random.randint(0, self.n - 1)
-                direction = random.choice(list(directions.values()))
+    def changes_since(self, version: int) -> array:
+        """
+        Returns the tiles picked after the given version, so a client at that version can catch up with a delta.
+        :param version: A version previously read from self.version
+        :return: Array of row-major tile indices (row * n + col) in pick order
+        :raises ValueError: if version is negative or newer than the board
+        """
+        if version < 0 or version > len(self._history): raise ValueError("version must be between 0 and board version")
+        return self._history[version:]
 
-                temp_row, temp_col = row, col
+    def _rebuild_mask(self) -> None:
+        """
+        Re-encodes the masked board buffer from the picked bitmap.
+        The buffer holds the exact bytes mask_board() returns: each row is 2n bytes ('_ ' or '  ' per tile)
+        and rows are separated by a newline, so a tile's byte offset is row * (2n + 1) + 2 * col.
+        :return: None
+        """
+        n = self.n
+        stride = 2 * n + 1
+        self._mask = bytearray(b'\n'.join([b'_ ' * n] * n))
+        self._mask_str = None
+        if self._picked.count(0) == len(self._picked): return
+        for byte_index, bits in enumerate(self._picked):
+            if not bits: continue
+            for index in range(byte_index * 8, min(byte_index * 8 + 8, n * n)):
+                if self._is_picked(index):
+                    self._mask[(index // n) * stride + 2 * (index % n)] = 0x20
 
-                positions = []
-                for _ in range(t_count):
-                    temp_row = temp_row % self.n
-                    temp_col = temp_col % self.n
+    def _is_picked(self, index: int) -> bool:
+        """
+        Checks the picked bitmap for a tile. Bits are stored most significant bit first.
+        :param index: Row-major tile index (row * n + col)
+        :return: True if the tile has been picked
+        """
+        return bool(self._picked[index >> 3] & (0x80 >> (index & 7)))
 
-                    if self.board[temp_row][temp_col] != '_': break
-                    positions.append((temp_row, temp_col))
-                    temp_row += direction[0]
-                    temp_col += direction[1]
+    def _tile_str(self, index: int) -> str:
+        """
+        Returns the display character(s) for a tile: ' ' if picked, '_' if empty, otherwise the treasure value.
+        :param index: Row-major tile index (row * n + col)
+        :return: String for the tile
+        """
+        if self._is_picked(index): return PICKED_TILE
+        value = self._cells[index]
+        return str(value) if value else EMPTY_TILE
 
-                if len(positions) == t_count:
-                    for pos_row, pos_col in positions:
-                        self.board[pos_row][pos_col] = str(t_count)
-                    placed = True
-                    t_count -= 1
+    @property
+    def board(self) -> list[list[str]]:
+        """
+        Returns the board as a 2D list of tile strings, built from the compact storage.
+        ' ' is a picked tile, '_' an empty tile, otherwise the treasure value as a string.
+        The rows are a fresh read-only copy: b.board[row][col] = tile raises TypeError instead of changing nothing.
+        To change tiles, assign a whole board (see the setter).
+        :return: ReadOnlyList of rows, each a ReadOnlyList of tile strings
+        """
+        n = self.n
+        return ReadOnlyList(ReadOnlyList(self._tile_str(row * n + col) for col in range(n)) for row in range(n))
+
+    @board.setter
+    def board(self, rows: list[list[str]]) -> None:
+        """
+        Loads the board from a 2D list of tile strings (the same format returned by the getter).
+        Picked tiles are recorded in the pick history in row-major order.
+        :param rows: n x n list of tile strings: ' ' for picked, '_' for empty, digits for treasure
+        :raises ValueError: if rows is not n x n or a tile is not a valid tile string
+        :return: None
+        """
+        if len(rows) != self.n or any(len(row) != self.n for row in rows): raise ValueError("board must be n x n")
+        self._reset_tiles()
+        for row, tiles in enumerate(rows):
+            for col, tile in enumerate(tiles):
+                index = row * self.n + col
+                if tile == PICKED_TILE:
+                    self._picked[index >> 3] |= 0x80 >> (index & 7)
+                    self._history.append(index)
+                elif tile != EMPTY_TILE:
+                    if not tile.isdigit(): raise ValueError("tile must be '_', ' ' or a digit")
+                    self._cells[index] = int(tile)
+        self._rebuild_mask()
+
+    def place_treasure(self) -> None:
+        """
+        Places treasure chains on the board when the board is initialized.
+        For each treasure type from self.t down to 1:
+        Randomly selects a starting position and direction (down/right, which also covers up/left)
+        Places a chain of tiles with length equal to the treasure value
+        Each tile in the chain is labeled with the treasure value (I.e a 4-treasure (t) is 4 tiles labeled '4')
+        Wraparound board edges
+        Ensures no overlap with existing treasures, backtracking when a chain has no free placement left
+        (see place_chains), so it always terminates.
+        :return: None
+        """
+        place_chains(self._cells, self.n, self.t, self.rng)
 
     def pick(self, row: int, col: int) -> int:
         """
         Picks a tile from the board at the specified position and returns its value.
-        The tile is then replaced with ' ' showings its been picked.
-        If the tile contains a treasure digit, returns that treasure value.
-        If the tile is empty ('_'), returns 0 points.
+        The tile is then marked in the picked bitmap, showing its been picked.
+        If the tile contains a treasure, returns that treasure value.
+        If the tile is empty or was already picked, returns 0 points.
 
         :param row: Row index (0 to n-1) of the tile to pick
         :param col: Column index (0 to n-1) of the tile to pick
@@ -82,11 +453,92 @@ class Board:
         if row < 0 or row >= self.n or col < 0 or col >= self.n: raise ValueError(
             "Row and Column must be between 0 and n-1")
 
-        value = self.board[row][col]
-        self.board[row][col] = ' '
-        if value == '_' or value == ' ':
+        index = row * self.n + col
+        bit = 0x80 >> (index & 7)
+        if self._picked[index >> 3] & bit:
             return 0
-        return int(value)
+        self._picked[index >> 3] |= bit
+        self._history.append(index)
+        self._mask[row * (2 * self.n + 1) + 2 * col] = 0x20
+        self._mask_str = None
+        return self._cells[index]
+
+    def pick_many(self, coords) -> array:
+        """
+        Picks a sequence of tiles in order, as if pick() were called for each, and returns their values.
+        All coordinates are validated before any tile is picked, so a bad coordinate leaves the board untouched.
+        A list of (row, col) pairs is applied in a tight loop; an (k, 2) NumPy integer array is applied with
+        vectorized lookups (only the first pick of a repeated tile scores). The masked board is updated once at the end.
+        :param coords: Sequence of (row, col) pairs, or a NumPy integer array of shape (k, 2)
+        :return: Array of tile values in pick order: 0 for empty or already picked tiles
+        :raises ValueError: if a row or col is not an int
+        :raises ValueError: if a row or col is out of bounds (< 0 or >= n)
+        """
+        if type(coords).__module__ == 'numpy':
+            return self._pick_many_vectorized(coords)
+
+        n = self.n
+        coords = list(coords)
+        rows = [row for row, _ in coords]
+        cols = [col for _, col in coords]
+        if not set(map(type, rows)).union(map(type, cols)) <= {int}: raise ValueError("Row and Column must be digits")
+        if coords and (min(rows) < 0 or max(rows) >= n or min(cols) < 0 or max(cols) >= n): raise ValueError(
+            "Row and Column must be between 0 and n-1")
+
+        cells = self._cells
+        picked = self._picked
+        values = array(cells.typecode, bytes(len(coords) * cells.itemsize))
+        fresh = []
+        for i, index in enumerate([row * n + col for row, col in coords]):
+            bit = 0x80 >> (index & 7)
+            if picked[index >> 3] & bit: continue
+            picked[index >> 3] |= bit
+            values[i] = cells[index]
+            fresh.append(index)
+
+        self._history.extend(fresh)
+        mask = self._mask
+        stride = 2 * n + 1
+        for index in fresh:
+            mask[(index // n) * stride + 2 * (index % n)] = 0x20
+        self._mask_str = None
+        return values
+
+    def _pick_many_vectorized(self, coords) -> array:
+        """
+        NumPy path of pick_many(): validates with array min/max, then applies every pick with fancy indexing.
+        :param coords: NumPy integer array of shape (k, 2)
+        :return: Array of tile values in pick order
+        """
+        import numpy as np
+
+        if coords.dtype.kind not in 'iu' or coords.ndim != 2 or coords.shape[1] != 2: raise ValueError(
+            "Row and Column must be digits")
+        # One signed dtype for the index math: uint64 mixed with int64 would become float64. Values past int64 wrap
+        # to negatives, which the bounds check rejects
+        coords = coords.astype(np.int64, copy=False)
+        if len(coords) and (coords.min() < 0 or coords.max() >= self.n): raise ValueError(
+            "Row and Column must be between 0 and n-1")
+
+        n = self.n
+        indices = coords[:, 0] * n + coords[:, 1]
+        unique, first = np.unique(indices, return_index=True)
+        picked = np.frombuffer(self._picked, dtype=np.uint8)
+        bits = (0x80 >> (unique & 7)).astype(np.uint8)
+        unpicked = (picked[unique >> 3] & bits) == 0
+        fresh = unique[unpicked]
+
+        cells = np.frombuffer(self._cells, dtype=np.dtype(self._cells.typecode))
+        values = np.zeros(len(indices), dtype=cells.dtype)
+        values[first[unpicked]] = cells[fresh]
+        # fresh is sorted, so tiles sharing a bitmap byte are adjacent: OR their bits together, then set each byte once
+        fresh_bytes = fresh >> 3
+        starts = np.flatnonzero(np.diff(fresh_bytes, prepend=-1))
+        if len(fresh): picked[fresh_bytes[starts]] |= np.bitwise_or.reduceat(bits[unpicked], starts)
+        np.frombuffer(self._mask, dtype=np.uint8)[(fresh // n) * (2 * n + 1) + 2 * (fresh % n)] = 0x20
+        self._history.extend(indices[np.sort(first[unpicked])].tolist())
+        self._mask_str = None
+        return array(self._cells.typecode, values.tobytes())
 
     def __str__(self) -> str:
         """
@@ -102,16 +554,27 @@ class Board:
         Shows only picked tiles (space) vs unpicked tiles (underscore), hiding treasure values.
         This prevents clients from seeing where treasures are located before picking.
         Each tile is followed by a space (including the last tile in each row).
+        The string is decoded from the masked buffer pick() keeps up to date, and cached until the next pick.
 
         :return: String with ' ' for picked tiles, '_' for unpicked tiles, each followed by a space
         """
-        result = []
-        for row in self.board:
-            row_str = ''
-            for tile in row:
-                if tile == ' ':
-                    row_str += '  '
-                else:
-                    row_str += '_ '
-            result.append(row_str)
-        return '\n'.join(result)
+        if self._mask_str is None:
+            self._mask_str = self._mask.decode('ascii')
+        return self._mask_str
+
+    def picked_bytes(self) -> bytes:
+        """
+        Returns which tiles have been picked as a bitmap, the compact alternative to mask_bytes().
+
+        :return: One bit per tile, row-major, most significant bit first, 1 for picked tiles
+        """
+        return bytes(self._picked)
+
+    def mask_bytes(self) -> bytes:
+        """
+        Returns the masked board already encoded as ASCII bytes, ready to compress and send.
+        Same content as mask_board().encode(), without building the string.
+
+        :return: Bytes with b' ' for picked tiles, b'_' for unpicked tiles, each followed by a space
+        """
+        return bytes(self._mask)
@@ -0,0 +1,51 @@
+"""
+Benchmark: full board frames as zlib-compressed masked text (FRAME_FULL) against one bit per tile (FRAME_BITMAP),
+half-way through a game. Reports payload bytes, server encode time and client decode time per frame.
+
+Run from the repository root:  python -m benchmarks.bench_bitmap
+"""
+import random
+import time
+import zlib
+
+from Board import Board
+from network_functions import bitmap_to_mask, build_bitmap, unpack_bitmap
+
+SIZES = (16, 256, 1024)
+
+
+def per_call(function, repeat: int) -> float:
+    """
+    :return: Mean microseconds per call of function()
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> None:
+    print(f"{'n':>6} {'text raw':>10} {'text zlib':>10} {'encode us':>10} {'decode us':>10} "
+          f"{'bitmap':>8} {'encode us':>10} {'decode us':>10}")
+    for n in SIZES:
+        board = Board(n, '4', seed=n)
+        coords = random.Random(n).sample(range(n * n), n * n // 2)
+        board.pick_many([(index // n, index % n) for index in coords])
+        repeat = max(3, 200_000 // (n * n))
+
+        text = board.mask_bytes()
+        compressed = zlib.compress(text)
+        text_encode = per_call(lambda: zlib.compress(board.mask_bytes()), repeat)
+        text_decode = per_call(lambda: bytearray(zlib.decompress(compressed)), repeat)
+
+        payload = build_bitmap(n, board.picked_bytes())
+        assert bitmap_to_mask(*unpack_bitmap(payload)) == text
+        bitmap_encode = per_call(lambda: build_bitmap(n, board.picked_bytes()), repeat)
+        bitmap_decode = per_call(lambda: bitmap_to_mask(*unpack_bitmap(payload)), repeat)
+
+        print(f"{n:>6} {len(text):>10,} {len(compressed):>10,} {text_encode:>10,.1f} {text_decode:>10,.1f} "
+              f"{len(payload):>8,} {bitmap_encode:>10,.1f} {bitmap_decode:>10,.1f}")
+
+
+if __name__ == '__main__':
+    main()
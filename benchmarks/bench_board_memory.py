@@ -0,0 +1,50 @@
+"""
+Memory benchmark: bytes allocated per game board for the compact Board backend
+versus the old list-of-lists-of-str grid.
+
+Run from the repository root:  python -m benchmarks.bench_board_memory
+"""
+import gc
+import tracemalloc
+
+from Board import Board
+
+SIZES = (10, 100, 1000)
+
+
+def legacy_grid(board: Board) -> list[list[str]]:
+    """
+    Builds the grid the old Board stored: an n x n list of lists of one-character strings.
+    :param board: Board to copy tile values from
+    :return: List of lists of tile strings
+    """
+    return [[str(tile) for tile in row] for row in board.board]
+
+
+def measure(factory) -> int:
+    """
+    Measures the bytes still allocated after calling factory, keeping its result alive.
+    :param factory: Zero argument callable building the object to measure
+    :return: Number of bytes allocated by the object
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = factory()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return after - before
+
+
+def main() -> None:
+    print(f"{'n':>6} {'compact (B)':>14} {'list-of-str (B)':>16} {'ratio':>7}")
+    for n in SIZES:
+        board = Board(n, '4')
+        compact = measure(lambda: Board(n, '4'))
+        legacy = measure(lambda: legacy_grid(board))
+        print(f"{n:>6} {compact:>14,} {legacy:>16,} {legacy / compact:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark: bytes on the wire and encode time per board update, comparing the v1 response
+(the whole masked board, zlib-compressed on every pick) against delta frames (only the tiles picked since the
+client's last version). Every pick is followed by one update for a client that is one pick behind.
+
+Run from the repository root:  python -m benchmarks.bench_delta
+"""
+import random
+import time
+import zlib
+
+from Board import Board
+from main import board_frame
+
+SIZES = (16, 256, 1024)
+PICKS = 200
+
+
+def measure(n: int) -> tuple[float, float, float, float]:
+    """
+    Plays PICKS random picks on a fresh board, encoding a v1 payload and a delta frame after each.
+    :return: (v1 mean bytes, v1 mean us, delta mean bytes, delta mean us)
+    """
+    board = Board(n, '4', seed=n)
+    coords = random.Random(n).sample(range(n * n), PICKS)
+    v1_bytes = v1_time = delta_bytes = delta_time = 0
+    for index in coords:
+        known = board.version
+        board.pick(index // n, index % n)
+
+        start = time.perf_counter()
+        v1_bytes += 2 + len(zlib.compress(board.mask_bytes()))
+        v1_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        delta_bytes += len(board_frame(board, known))
+        delta_time += time.perf_counter() - start
+    return v1_bytes / PICKS, v1_time / PICKS * 1e6, delta_bytes / PICKS, delta_time / PICKS * 1e6
+
+
+def main() -> None:
+    print(f"{'n':>6} {'v1 bytes':>10} {'v1 us':>10} {'delta bytes':>12} {'delta us':>9} {'bytes saved':>12}")
+    for n in SIZES:
+        v1_bytes, v1_us, delta_bytes, delta_us = measure(n)
+        print(f"{n:>6} {v1_bytes:>10,.0f} {v1_us:>10,.1f} {delta_bytes:>12,.0f} {delta_us:>9,.1f} "
+              f"{v1_bytes / delta_bytes:>11,.0f}x")
+
+
+if __name__ == '__main__':
+    main()
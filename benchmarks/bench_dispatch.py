@@ -0,0 +1,113 @@
+"""
+Benchmark: pick latency (p50/p99) through the board task with many connected clients, comparing per-request
+futures (main.request_board) against the old shared output_queue, where a handler that gets someone else's
+response puts it back. Runs in one event loop without sockets, so it measures the dispatch only.
+Every client picks in a loop, waiting for each response like client_handler does, for SECONDS per case; picks still
+waiting at the end are cancelled and not counted.
+
+Run from the repository root:  python -m benchmarks.bench_dispatch
+"""
+import asyncio
+import contextlib
+import io
+import random
+import statistics
+import time
+
+import main
+from Board import Board
+from Player import Player
+from network_functions import Session, score_into_byte
+
+CLIENTS = (2, 100, 1000)
+SECONDS = 5.0
+N = 16
+
+
+async def legacy_board_at_play(board: Board, players: list[Player], requests: asyncio.Queue,
+                               responses: asyncio.Queue) -> None:
+    """
+    The old board task loop: answers go to one shared output queue, tagged with the client id.
+    """
+    while True:
+        request = await requests.get()
+        if request is None:
+            break
+        client_id, row, col, player = request
+        player.add_score(board.pick(row, col))
+        result = (score_into_byte(players[0].get_score()) << 7) | score_into_byte(players[1].get_score())
+        await responses.put((client_id, result, board.mask_bytes()))
+        print(board)
+
+
+async def legacy_request(client_id: int, row: int, col: int, player: Player, requests: asyncio.Queue,
+                         responses: asyncio.Queue) -> tuple[int, bytes]:
+    """
+    The old send_response loop: takes responses off the shared queue until its own turns up.
+    The old loop never yielded: Queue.get() on a non-empty queue returns straight away, so a handler could take
+    back the response it had just put back forever (a livelock). The sleep(0) lets the owner run so the old
+    design can be measured at all.
+    """
+    await requests.put((client_id, row, col, player))
+    while True:
+        response_id, result, payload = await responses.get()
+        if response_id == client_id:
+            return result, payload
+        await responses.put((response_id, result, payload))
+        await asyncio.sleep(0)
+
+
+async def run(clients: int, legacy: bool) -> list[float]:
+    """
+    :return: Latency of every pick answered within SECONDS, in milliseconds
+    """
+    board = Board(N, '4', seed=clients)
+    players = [Player(f"P{i}") for i in range(clients)]
+    requests, responses = asyncio.Queue(), asyncio.Queue()
+    if legacy:
+        task = asyncio.create_task(legacy_board_at_play(board, players, requests, responses))
+    else:
+        task = asyncio.create_task(main.board_at_play(board, players, requests))
+    latencies = []
+    deadline = time.perf_counter() + SECONDS
+
+    async def client(client_id: int) -> None:
+        rng = random.Random(client_id)
+        session = Session()
+        while time.perf_counter() < deadline:
+            row, col = rng.randrange(N), rng.randrange(N)
+            start = time.perf_counter()
+            if legacy:
+                await legacy_request(client_id, row, col, players[client_id], requests, responses)
+            else:
+                await main.request_board(requests, row, col, players[client_id], session)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    _, waiting = await asyncio.wait([asyncio.create_task(client(client_id)) for client_id in range(clients)],
+                                    timeout=SECONDS + 1)
+    for client_task in waiting:
+        client_task.cancel()
+    task.cancel()
+    return latencies
+
+
+def percentile(values: list[float], p: int) -> float:
+    return statistics.quantiles(values, n=100)[p - 1]
+
+
+def main_() -> None:
+    print(f"{'clients':>8} {'dispatch':>14} {'picks':>8} {'p50 ms':>9} {'p99 ms':>9} {'picks/s':>10}")
+    for clients in CLIENTS:
+        for name, legacy in (('shared queue', True), ('futures', False)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                latencies = asyncio.run(run(clients, legacy))
+            if len(latencies) < 2:
+                print(f"{clients:>8} {name:>14} {len(latencies):>8} {'-':>9} {'-':>9} "
+                      f"{len(latencies) / SECONDS:>10,.1f}")
+                continue
+            print(f"{clients:>8} {name:>14} {len(latencies):>8,} {percentile(latencies, 50):>9.3f} "
+                  f"{percentile(latencies, 99):>9.3f} {len(latencies) / SECONDS:>10,.1f}")
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,147 @@
+"""
+Benchmark: reading server messages with the buffered frame codec (network_functions.FrameReader and
+SocketFrameReader) against the unbuffered readers they replace, over loopback TCP.
+- async: messages of a v2 score field plus a FRAME_BITMAP board frame, read with read_scores + read_board_frame
+  (four readexactly calls per message) and with FrameReader (parse_scores + parse_board_frame out of one buffer)
+- sync: one board frame at a time read with the old receive() (bytes joined with data += chunk) and with
+  SocketFrameReader (recv_into a reused buffer)
+Reports messages per second and MB/s for boards from 16x16 to 4096x4096, best of REPEATS runs.
+
+Run from the repository root:  python -m benchmarks.bench_frames
+"""
+import asyncio
+import socket
+import threading
+import time
+
+from network_functions import (
+    BOARD_FRAME,
+    FRAME_BITMAP,
+    FrameReader,
+    SocketFrameReader,
+    build_bitmap,
+    build_board_frame,
+    is_empty_buffer,
+    pack_scores,
+    parse_board_frame,
+    parse_scores,
+    read_board_frame,
+    read_scores,
+    STATUS_OK,
+)
+
+SIZES = (16, 256, 1024, 4096)
+VOLUME = 32 * 1024 * 1024  # bytes sent per run (MIN_MESSAGES to MAX_MESSAGES messages)
+MIN_MESSAGES = 50
+MAX_MESSAGES = 50_000
+REPEATS = 5  # the best run is reported
+SEND_BATCH = 64 * 1024  # small messages are written many per write, so the sender does not dominate
+
+
+def board_frame(n: int) -> bytes:
+    """
+    :return: A bitmap frame of an n x n board
+    """
+    return build_board_frame(FRAME_BITMAP, 0, 1, build_bitmap(n, bytes((n * n + 7) // 8)))
+
+
+def message(n: int) -> bytes:
+    """
+    :return: A response as the server sends it in bitpack mode: scores, then a bitmap frame of an n x n board
+    """
+    return pack_scores(STATUS_OK, [3, 4]) + board_frame(n)
+
+
+def batch(n: int) -> int:
+    """
+    :return: Number of messages of an n x n board the async sender writes at once
+    """
+    return max(1, SEND_BATCH // len(message(n)))
+
+
+def legacy_receive(sc: socket.socket, size: int) -> bytes:
+    """
+    The old network_functions.receive(): joins the chunks with data += curr_data.
+    """
+    data = b''
+    while len(data) < size:
+        curr_data = sc.recv(size - len(data))
+        if is_empty_buffer(curr_data):
+            return data
+        data += curr_data
+    return data
+
+
+async def run_async(n: int, count: int, buffered: bool) -> float:
+    """
+    :return: Seconds to read count messages of an n x n board, count a multiple of batch(n)
+    """
+    data = message(n) * batch(n)
+
+    async def send(_, writer: asyncio.StreamWriter) -> None:
+        for _ in range(count // batch(n)):
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(send, '127.0.0.1', 0)
+    reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname())
+    frames = FrameReader(reader)
+    start = time.perf_counter()
+    for _ in range(count):
+        if buffered:
+            await frames.read(parse_scores)
+            await frames.read(parse_board_frame)
+        else:
+            await read_scores(reader)
+            await read_board_frame(reader)
+    elapsed = time.perf_counter() - start
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return elapsed
+
+
+def run_sync(n: int, count: int, buffered: bool) -> float:
+    """
+    :return: Seconds to read count board frames of an n x n board
+    """
+    frame = board_frame(n)
+    listener = socket.create_server(('127.0.0.1', 0))
+    client = socket.create_connection(listener.getsockname())
+    peer, _ = listener.accept()
+    sender = threading.Thread(target=lambda: [peer.sendall(frame) for _ in range(count)])
+    sender.start()
+    frames = SocketFrameReader(client)
+    start = time.perf_counter()
+    for _ in range(count):
+        if buffered:
+            frames.read(parse_board_frame)
+        else:
+            header = legacy_receive(client, BOARD_FRAME.size)
+            legacy_receive(client, BOARD_FRAME.unpack(header)[3])
+    elapsed = time.perf_counter() - start
+    sender.join()
+    for sock in (client, peer, listener):
+        sock.close()
+    return elapsed
+
+
+def main_() -> None:
+    print(f"{'path':>6} {'n':>5} {'msg bytes':>10} {'reader':>10} {'msgs/s':>12} {'MB/s':>9}")
+    for n in SIZES:
+        size = len(message(n))
+        count = min(MAX_MESSAGES, max(MIN_MESSAGES, VOLUME // size)) // batch(n) * batch(n)
+        for path in ('async', 'sync'):
+            for buffered in (False, True):
+                if path == 'async':
+                    elapsed = min(asyncio.run(run_async(n, count, buffered)) for _ in range(REPEATS))
+                else:
+                    elapsed = min(run_sync(n, count, buffered) for _ in range(REPEATS))
+                name = ('FrameReader' if path == 'async' else 'recv_into') if buffered else 'legacy'
+                print(f"{path:>6} {n:>5} {size:>10,} {name:>10} {count / elapsed:>12,.0f} "
+                      f"{count * size / elapsed / 1e6:>9,.1f}")
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,31 @@
+"""
+Benchmark: boards/sec from the vectorized Board.generate_many() against building Board() objects one at a time.
+
+Run from the repository root:  python -m benchmarks.bench_generate_many
+"""
+import time
+
+from Board import Board
+
+CASES = ((100_000, 10, '4'), (10_000, 10, '10'), (1_000, 64, '16'))
+LOOP_SECONDS = 1.0
+
+
+def main() -> None:
+    print(f"{'count':>8} {'n':>4} {'t':>4} {'generate_many boards/s':>23} {'Board() boards/s':>17} {'speedup':>8}")
+    for count, n, t in CASES:
+        start = time.perf_counter()
+        Board.generate_many(count, n, t, seed=count)
+        batch = count / (time.perf_counter() - start)
+
+        built = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < LOOP_SECONDS:
+            Board(n, t, seed=built)
+            built += 1
+        single = built / (time.perf_counter() - start)
+        print(f"{count:>8} {n:>4} {t:>4} {batch:>23,.0f} {single:>17,.0f} {batch / single:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
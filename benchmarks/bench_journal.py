@@ -0,0 +1,105 @@
+"""
+Benchmark: cost of the move journal (move_journal.MoveJournal) and speed of replaying it (replay.py).
+- pick latency: one client makes sequential picks through the board task (request_board) for SECONDS, with and
+  without a journal being written (and fsynced) in the background; reports p50/p99 latency per pick
+- replay: a journal of GAMES games of PICKS random picks each is read, split into games, and one game is replayed
+  with a single bulk pick; reports the time of each step and moves per second
+Journal files are written to a temporary directory.
+
+Run from the repository root:  python -m benchmarks.bench_journal
+"""
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+
+import main
+from Board import Board
+from Player import Player
+from move_journal import MoveJournal, journal_path
+from network_functions import Session
+from replay import journal_games, read_journal
+
+N = 256
+SECONDS = 2.0
+REPLAY_N = 1024
+GAMES = 4
+PICKS = 1_000_000
+
+
+async def run(directory: str | None) -> list[float]:
+    """
+    Picks random tiles for SECONDS.
+    :param directory: Journal directory, None to run without a journal
+    :return: Latency of every pick in ms
+    """
+    board = Board(N, '4', seed=N)
+    players = [Player("One"), Player("Two")]
+    journal = MoveJournal(journal_path(directory)) if directory else None
+    writing = asyncio.create_task(journal.run()) if journal else None
+    requests = asyncio.Queue()
+    task = asyncio.create_task(main.board_at_play(board, players, requests, journal=journal))
+    session = Session()
+    rng = random.Random(1)
+    latencies = []
+    deadline = time.perf_counter() + SECONDS
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await main.request_board(requests, rng.randrange(N), rng.randrange(N), players[len(latencies) & 1], session)
+        latencies.append((time.perf_counter() - start) * 1000)
+    await requests.put(None)
+    await task
+    if journal is not None:
+        writing.cancel()
+        journal.close()
+    return latencies
+
+
+def write_journal(directory: str) -> str:
+    """
+    :return: Path of a journal holding GAMES games of PICKS random picks each, interleaved in batches
+    """
+    journal = MoveJournal(journal_path(directory, 1))
+    rng = random.Random(2)
+    boards = [Board(REPLAY_N, '8', seed=game) for game in range(GAMES)]
+    for game, board in enumerate(boards):
+        journal.start_game(game, board)
+    batch = 1000
+    for _ in range(PICKS // batch):
+        for game, board in enumerate(boards):
+            picks = [(rng.randrange(REPLAY_N), rng.randrange(REPLAY_N)) for _ in range(batch)]
+            journal.record(game, rng.randrange(2), picks, board.pick_many(picks))
+    journal.close()
+    return journal.path
+
+
+def main_() -> None:
+    print(f"{'journal':>8} {'picks':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for journaled in (False, True):
+            latencies = asyncio.run(run(directory if journaled else None))
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            print(f"{'on' if journaled else 'off':>8} {len(latencies):>7} "
+                  f"{statistics.median(latencies):>9.4f} {p99:>9.4f}")
+
+        path = write_journal(directory)
+        start = time.perf_counter()
+        records = read_journal(path)
+        read = time.perf_counter()
+        games = journal_games(records)
+        split = time.perf_counter()
+        board, scores, mismatches = games[-1].replay()
+        replayed = time.perf_counter()
+        assert mismatches == 0
+        moves = len(games[-1])
+        print()
+        print(f"journal: {len(records):,} records, {GAMES} games of {moves:,} picks on {REPLAY_N}x{REPLAY_N}")
+        print(f"read  {(read - start) * 1000:8.1f} ms  {len(records) / (read - start):>14,.0f} records/s")
+        print(f"split {(split - read) * 1000:8.1f} ms  {len(records) / (split - read):>14,.0f} records/s")
+        print(f"replay {(replayed - split) * 1000:7.1f} ms  {moves / (replayed - split):>14,.0f} moves/s")
+        print(f"total {(replayed - start) * 1000:8.1f} ms  {moves / (replayed - start):>14,.0f} moves/s (one game)")
+
+
+if __name__ == '__main__':
+    main_()
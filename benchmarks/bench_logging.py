@@ -0,0 +1,96 @@
+"""
+Benchmark: pick latency with the old per-pick print() calls versus the queue-backed server log.
+One client makes sequential picks through the board task (request_board). Reports p50/p99 latency per pick:
+- print: the old board_at_play (print(board) after every pick) plus the old per-pick peer print in client_handler
+- log INFO: the current board_at_play with the default log level (no board dumps)
+- log DEBUG: the current board_at_play with board dumps on, written by the listener thread
+All output goes to a temporary file, so the numbers include real writes but not a slow terminal.
+
+Run from the repository root:  python -m benchmarks.bench_logging
+"""
+import asyncio
+import contextlib
+import logging
+import statistics
+import tempfile
+import time
+
+import main
+import server_log
+from Board import Board
+from Player import Player
+from network_functions import OUT_OF_BOUNDS, Session, score_into_byte
+
+SIZES = (16, 256, 1024)
+SECONDS = 2.0
+
+
+async def legacy_board_at_play(board: Board, players: list[Player], requests: asyncio.Queue) -> None:
+    """
+    The old board_at_play (v1 replies only), printing the board after every pick.
+    """
+    print(board)
+    while True:
+        request = await requests.get()
+        if request is None:
+            break
+        response, picks, player, session, known_version = request
+        row, col = picks[0]
+        if row >= board.n or col >= board.n:
+            result = OUT_OF_BOUNDS
+        else:
+            player.add_score(board.pick(row, col))
+            result = (score_into_byte(players[0].get_score()) << 7) | score_into_byte(players[1].get_score())
+        response.set_result((result, board.mask_bytes()))
+        print(board)
+
+
+async def run(n: int, legacy: bool) -> list[float]:
+    """
+    Picks tiles in row-major order for SECONDS.
+    :return: Latency of every pick in ms
+    """
+    board = Board(n, '4', seed=n)
+    players = [Player("One"), Player("Two")]
+    requests = asyncio.Queue()
+    task = asyncio.create_task((legacy_board_at_play if legacy else main.board_at_play)(board, players, requests))
+    session = Session()
+    latencies = []
+    deadline = time.perf_counter() + SECONDS
+    index = 0
+    while time.perf_counter() < deadline and index < n * n:
+        row, col = divmod(index, n)
+        start = time.perf_counter()
+        if legacy:
+            print(f"{('127.0.0.1', 50000)} {row:02x} {row} {row} {col}")
+        await main.request_board(requests, row, col, players[index & 1], session)
+        latencies.append((time.perf_counter() - start) * 1000)
+        index += 1
+    await requests.put(None)
+    await task
+    return latencies
+
+
+def measure(n: int, mode: str, sink) -> list[float]:
+    if mode == 'print':
+        with contextlib.redirect_stdout(sink):
+            return asyncio.run(run(n, True))
+    listener = server_log.start_logging(logging.DEBUG if mode == 'log DEBUG' else logging.INFO, sink)
+    try:
+        return asyncio.run(run(n, False))
+    finally:
+        listener.stop()
+
+
+def main_() -> None:
+    print(f"{'n':>5} {'mode':>10} {'picks':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    for n in SIZES:
+        for mode in ('print', 'log INFO', 'log DEBUG'):
+            with tempfile.TemporaryFile('w') as sink:
+                latencies = measure(n, mode, sink)
+            p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else latencies[0]
+            print(f"{n:>5} {mode:>10} {len(latencies):>7} {statistics.median(latencies):>9.3f} {p99:>9.3f}")
+
+
+if __name__ == '__main__':
+    main_()
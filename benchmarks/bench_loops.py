@@ -0,0 +1,102 @@
+"""
+Benchmark: event loop backends (python main.py --loop NAME) for the single-process server.
+For each backend, the server and the bot load generator both run on that loop:
+- connections/sec: CONNECTIONS clients at a time connect, read their player name and hang up, for SECONDS
+- picks/sec: CONNECTIONS v1 clients (so every game gets two players) pick random tiles in a loop, waiting for
+  every response, for SECONDS
+Backends that are not installed (uvloop) are reported and skipped. The bots run on the same machine as the server,
+so compare runs on the same host only.
+
+Run from the repository root:  python -m benchmarks.bench_loops
+"""
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from struct import unpack
+
+from benchmarks.bench_workers import wait_for_port
+from network_functions import PORT, loop_factory, loop_name, receive_decoded_string, run_with_loop
+
+BACKENDS = ('asyncio', 'uvloop')
+CONNECTIONS = 100
+SECONDS = 5.0
+N = 10
+
+
+async def connect_loop(deadline: float) -> int:
+    """
+    Connects, reads the player name and hangs up until the deadline.
+    :return: Connections completed
+    """
+    connections = 0
+    while time.time() < deadline:
+        reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+        await receive_decoded_string(reader, '!H')
+        writer.close()
+        await writer.wait_closed()
+        connections += 1
+    return connections
+
+
+async def pick_loop(deadline: float, seed: int) -> int:
+    """
+    One v1 client picking random tiles until the deadline.
+    :return: Picks answered
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    await receive_decoded_string(reader, '!H')
+    picks = 0
+    while time.time() < deadline:
+        writer.write(bytes([rng.randrange(N) << 4 | rng.randrange(N)]))
+        await reader.readexactly(2)
+        await reader.readexactly(unpack('!H', await reader.readexactly(2))[0])
+        picks += 1
+    writer.close()
+    return picks
+
+
+async def load(workload: str, deadline: float) -> int:
+    if workload == 'connect':
+        counts = await asyncio.gather(*(connect_loop(deadline) for _ in range(CONNECTIONS)))
+    else:
+        counts = await asyncio.gather(*(pick_loop(deadline, seed) for seed in range(CONNECTIONS)))
+    return sum(counts)
+
+
+def bot_process(backend: str, workload: str) -> int:
+    """
+    Runs one workload for SECONDS on the backend's loop, in its own process so it gets a fresh loop policy.
+    :return: Connections or picks completed
+    """
+    return run_with_loop(load(workload, time.time() + SECONDS), backend)
+
+
+def main() -> None:
+    print(f"{CONNECTIONS} concurrent clients, {SECONDS:.0f} s per run")
+    print(f"{'loop':>8} {'connections/s':>14} {'picks/s':>10}")
+    for backend in BACKENDS:
+        loop = loop_factory(backend)()
+        installed = loop_name(loop) == backend
+        loop.close()
+        if not installed:
+            print(f"{backend:>8} {'not installed':>14}")
+            continue
+        server = subprocess.Popen([sys.executable, 'main.py', '--loop', backend, str(N), '4'],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port()
+            with ProcessPoolExecutor(1) as pool:
+                connections = pool.submit(bot_process, backend, 'connect').result()
+                picks = pool.submit(bot_process, backend, 'pick').result()
+            print(f"{backend:>8} {connections / SECONDS:>14,.0f} {picks / SECONDS:>10,.0f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
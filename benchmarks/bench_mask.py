@@ -0,0 +1,78 @@
+"""
+Microbenchmark: picks/sec when every pick is followed by mask_board(), the way board_at_play
+uses the board, comparing the incremental masked buffer against the old full rescan.
+
+Run from the repository root:  python -m benchmarks.bench_mask
+"""
+import random
+import time
+
+from Board import Board
+
+SIZES = (16, 1024)
+SECONDS = 1.0
+
+
+def legacy_mask_board(board: list[list[str]]) -> str:
+    """
+    The old Board.mask_board(): rescans every tile and builds the string with += concatenation.
+    :param board: List of lists of tile strings
+    :return: Masked board string
+    """
+    result = []
+    for row in board:
+        row_str = ''
+        for tile in row:
+            if tile == ' ':
+                row_str += '  '
+            else:
+                row_str += '_ '
+        result.append(row_str)
+    return '\n'.join(result)
+
+
+def legacy_pick(board: list[list[str]], row: int, col: int) -> int:
+    """
+    The old Board.pick() on the list-of-lists grid.
+    :return: Treasure value at row, col or 0
+    """
+    value = board[row][col]
+    board[row][col] = ' '
+    if value == '_' or value == ' ':
+        return 0
+    return int(value)
+
+
+def picks_per_second(pick, mask, coords: list[tuple[int, int]]) -> float:
+    """
+    Runs pick + mask for each coordinate until SECONDS elapse or the coordinates run out.
+    :return: Picks per second
+    """
+    count = 0
+    start = time.perf_counter()
+    for row, col in coords:
+        pick(row, col)
+        mask()
+        count += 1
+        if time.perf_counter() - start >= SECONDS:
+            break
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    print(f"{'n':>6} {'incremental picks/s':>20} {'rescan picks/s':>16} {'speedup':>8}")
+    for n in SIZES:
+        coords = [(row, col) for row in range(n) for col in range(n)]
+        random.Random(n).shuffle(coords)
+
+        board = Board(n, '4')
+        incremental = picks_per_second(board.pick, board.mask_board, coords)
+
+        grid = [list(row) for row in Board(n, '4').board]  # a mutable copy, as the old grid was
+        rescan = picks_per_second(lambda row, col: legacy_pick(grid, row, col),
+                                  lambda: legacy_mask_board(grid), coords)
+        print(f"{n:>6} {incremental:>20,.0f} {rescan:>16,.1f} {incremental / rescan:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
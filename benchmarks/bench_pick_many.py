@@ -0,0 +1,64 @@
+"""
+Benchmark: replaying a 10k-move log with Board.pick_many() against one pick() call per move.
+The per-move baseline is measured both with and without rebuilding the masked board after every pick,
+since the server sends the mask after each move.
+
+Run from the repository root:  python -m benchmarks.bench_pick_many
+"""
+import random
+import time
+
+from Board import Board
+
+N = 128
+MOVES = 10_000
+REPEATS = 5
+
+
+def best_of(replay) -> float:
+    """
+    Runs replay on fresh seeded boards and returns the best wall time in seconds.
+    """
+    best = float('inf')
+    for _ in range(REPEATS):
+        board = Board(N, '16', seed=1)
+        start = time.perf_counter()
+        replay(board)
+        board.mask_board()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    rng = random.Random(2)
+    moves = [(rng.randrange(N), rng.randrange(N)) for _ in range(MOVES)]
+
+    def per_pick_with_mask(board):
+        for row, col in moves:
+            board.pick(row, col)
+            board.mask_board()
+
+    def per_pick(board):
+        for row, col in moves:
+            board.pick(row, col)
+
+    results = {
+        'pick() + mask_board() per move': best_of(per_pick_with_mask),
+        'pick() per move': best_of(per_pick),
+        'pick_many(list)': best_of(lambda board: board.pick_many(moves)),
+    }
+    try:
+        import numpy as np
+        coords = np.array(moves, dtype=np.int64)
+        results['pick_many(ndarray)'] = best_of(lambda board: board.pick_many(coords))
+    except ImportError:
+        pass
+
+    baseline = results['pick() per move']
+    print(f"{MOVES:,} moves on a {N}x{N} board")
+    for name, seconds in results.items():
+        print(f"{name:>32} {seconds * 1000:>9.2f} ms {MOVES / seconds:>14,.0f} moves/s {baseline / seconds:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: lock-step picks versus pipelined picks (FEATURE_PIPELINE) against the single-process server.
+CONNECTIONS v1 bots (so every game gets two players) pick random tiles for SECONDS:
+- lock-step: the original protocol, every pick waits for its response before the next one is sent
+- pipelined DEPTH: the bot keeps DEPTH picks in flight and tops the window up after every response; the server
+  applies every pick it has received as one batch and answers it with one response
+Reports picks/sec and the mean number of picks answered per response. The bots run on the same machine as the
+server, so compare runs on the same host only.
+
+Run from the repository root:  python -m benchmarks.bench_pipeline
+"""
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from struct import unpack
+
+from benchmarks.bench_workers import wait_for_port
+from network_functions import FEATURE_PIPELINE, PIPELINE_ACK, PORT, receive_decoded_string, send_hello
+
+DEPTHS = (0, 4, 16, 64)  # 0 = lock-step
+CONNECTIONS = 20
+SECONDS = 5.0
+N = 10
+
+
+async def bot(deadline: float, seed: int, depth: int) -> tuple[int, int]:
+    """
+    One v1 client picking random tiles until the deadline, lock-step (depth 0) or with depth picks in flight.
+    :return: (picks answered, responses received)
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    await receive_decoded_string(reader, '!H')
+
+    def picks(count: int) -> bytes:
+        return bytes(rng.randrange(N) << 4 | rng.randrange(N) for _ in range(count))
+
+    if depth:
+        await send_hello(reader, writer, FEATURE_PIPELINE)
+    answered = sent = responses = 0
+    while time.time() < deadline:
+        writer.write(picks(max(depth, 1) - (sent - answered)))
+        sent = answered + max(depth, 1)
+        if depth:
+            answered = PIPELINE_ACK.unpack(await reader.readexactly(PIPELINE_ACK.size))[0]
+        else:
+            answered += 1
+        await reader.readexactly(2)
+        await reader.readexactly(unpack('!H', await reader.readexactly(2))[0])
+        responses += 1
+    writer.close()
+    return answered, responses
+
+
+def bot_process(depth: int) -> tuple[int, int]:
+    """
+    Runs CONNECTIONS bots in one event loop for SECONDS.
+    :return: (picks answered, responses received) across the bots
+    """
+    async def run_bots() -> list[tuple[int, int]]:
+        deadline = time.time() + SECONDS
+        return await asyncio.gather(*(bot(deadline, seed, depth) for seed in range(CONNECTIONS)))
+    counts = asyncio.run(run_bots())
+    return sum(picks for picks, _ in counts), sum(responses for _, responses in counts)
+
+
+def main() -> None:
+    print(f"{CONNECTIONS} v1 clients, {SECONDS:.0f} s per run")
+    print(f"{'mode':>14} {'picks/s':>10} {'picks/response':>15}")
+    for depth in DEPTHS:
+        server = subprocess.Popen([sys.executable, 'main.py', str(N), '4'],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port()
+            with ProcessPoolExecutor(1) as pool:
+                picks, responses = pool.submit(bot_process, depth).result()
+            mode = f"pipelined {depth}" if depth else "lock-step"
+            print(f"{mode:>14} {picks / SECONDS:>10,.0f} {picks / responses:>15.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
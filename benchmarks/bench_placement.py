@@ -0,0 +1,70 @@
+"""
+Benchmark: treasure placement time across a grid of board sizes (n) and treasure counts (t),
+comparing the backtracking placement engine against the old unbounded rejection sampling.
+The old sampler is capped at LEGACY_PROBE_LIMIT probes per board; boards that hit the cap are counted as stuck.
+
+Run from the repository root:  python -m benchmarks.bench_placement
+"""
+import random
+import time
+from array import array
+
+from Board import cell_typecode, place_chains
+
+SIZES = (3, 4, 5, 8, 16, 64, 256)
+BOARDS = 50
+LEGACY_PROBE_LIMIT = 200_000
+
+
+def legacy_place(cells, n: int, t: int, rng) -> int | None:
+    """
+    The old Board.place_treasure() loop, with a probe cap so it cannot spin forever.
+    :return: Number of probes used, or None if the cap was reached
+    """
+    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    probes = 0
+    t_count = t
+    while t_count > 0:
+        probes += 1
+        if probes > LEGACY_PROBE_LIMIT:
+            return None
+        row, col = rng.randint(0, n - 1), rng.randint(0, n - 1)
+        direction = rng.choice(directions)
+        positions = [((row + direction[0] * i) % n) * n + (col + direction[1] * i) % n for i in range(t_count)]
+        if not any(cells[index] for index in positions):
+            for index in positions:
+                cells[index] = t_count
+            t_count -= 1
+    return probes
+
+
+def run(place, n: int, t: int) -> tuple[float, float, int]:
+    """
+    Places treasure on BOARDS fresh boards.
+    :return: (mean ms, worst ms, boards where place returned None)
+    """
+    rng = random.Random(n * 1000 + t)
+    times = []
+    stuck = 0
+    for _ in range(BOARDS):
+        cells = array(cell_typecode(t), [0]) * (n * n)
+        start = time.perf_counter()
+        if place(cells, n, t, rng) is None and place is legacy_place:
+            stuck += 1
+        times.append((time.perf_counter() - start) * 1000)
+    return sum(times) / len(times), max(times), stuck
+
+
+def main() -> None:
+    print(f"{'n':>5} {'t':>5} {'engine mean ms':>15} {'engine max ms':>14} "
+          f"{'legacy mean ms':>15} {'legacy max ms':>14} {'legacy stuck':>13}")
+    for n in SIZES:
+        for t in sorted({1, max(1, n // 2), n}):
+            mean, worst, _ = run(place_chains, n, t)
+            legacy_mean, legacy_worst, stuck = run(legacy_place, n, t)
+            print(f"{n:>5} {t:>5} {mean:>15.3f} {worst:>14.3f} {legacy_mean:>15.3f} {legacy_worst:>14.3f} "
+                  f"{stuck:>10}/{BOARDS}")
+
+
+if __name__ == '__main__':
+    main()
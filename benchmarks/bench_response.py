@@ -0,0 +1,155 @@
+"""
+Benchmark: one coalesced write per response (main.send_response, a single writelines of build_response) against the
+old send_response, which wrote every part of a response separately before draining.
+A client thread makes lock-step round trips over loopback TCP against an asyncio server: it sends a one-byte pick,
+the server answers it with the same response every time, and the client reads the whole response.
+- send() calls: socket send/sendmsg calls the server's transport makes per response. The transport sends as soon as
+  its buffer is empty, so every separate write is its own syscall (and TCP segment, as asyncio sets TCP_NODELAY)
+- recv() calls: reads the client needs per response, one per segment that arrived on its own
+- latency: p50/p99 of the round trip, in µs
+Responses: a v1 16x16 board (score, length, compressed board), a v2 bitpack frame in push + pipeline mode
+(MESSAGE, PIPELINE_ACK, score field, board frame) and a v2 256x256 board (score field, length, compressed board).
+
+Run from the repository root:  python -m benchmarks.bench_response
+"""
+import asyncio
+import socket
+import statistics
+import threading
+import time
+from struct import pack
+
+import main
+from Board import Board
+from network_functions import (
+    BOARD_FRAME,
+    FEATURE_BITPACK,
+    FEATURE_PIPELINE,
+    FEATURE_PUSH,
+    FRAME_BITMAP,
+    FRAMED_FEATURES,
+    MESSAGE,
+    MSG_RESPONSE,
+    PIPELINE_ACK,
+    PROTOCOL_V1,
+    PROTOCOL_V2,
+    STATUS_OK,
+    Session,
+    build_bitmap,
+    build_board_frame,
+    pack_scores,
+)
+
+ROUNDS = 20_000
+LARGE_ROUNDS = 2_000
+
+
+async def legacy_send_response(writer: asyncio.StreamWriter, response: tuple[int | bytes, bytes],
+                               session: Session) -> None:
+    """
+    The old main.send_response: one writer.write per part, then one drain.
+    """
+    result, payload = response
+    wide = session.version >= PROTOCOL_V2
+    if session.has(FEATURE_PUSH):
+        writer.write(MESSAGE.pack(MSG_RESPONSE))
+        session.board_version = max(session.board_version, BOARD_FRAME.unpack_from(payload)[2])
+    if session.has(FEATURE_PIPELINE):
+        writer.write(PIPELINE_ACK.pack(session.picks_answered))
+    writer.write(result if wide else pack('!H', result))
+    if session.has(FRAMED_FEATURES):
+        writer.write(payload)
+    else:
+        compressed_board = session.compress(payload)
+        writer.write(pack('!I' if wide else '!H', len(compressed_board)))
+        writer.write(compressed_board)
+    await writer.drain()
+
+
+def cases() -> list[tuple[str, int, int, tuple[int | bytes, bytes], int]]:
+    """
+    :return: (name, protocol version, features, response, rounds) of every response benchmarked
+    """
+    small, large = Board(16, '4', seed=1), Board(256, '4', seed=1)
+    for board in (small, large):
+        board.pick_many([(row, row) for row in range(board.n)])
+    frame = build_board_frame(FRAME_BITMAP, small.version, small.version, build_bitmap(16, small.picked_bytes()))
+    return [
+        ('v1 16x16', PROTOCOL_V1, 0, (3, small.mask_bytes()), ROUNDS),
+        ('v2 push+pipeline bitpack', PROTOCOL_V2, FEATURE_BITPACK | FEATURE_PUSH | FEATURE_PIPELINE,
+         (pack_scores(STATUS_OK, [3, 4]), frame), ROUNDS),
+        ('v2 256x256', PROTOCOL_V2, 0, (pack_scores(STATUS_OK, [3, 4]), large.mask_bytes()), LARGE_ROUNDS),
+    ]
+
+
+def run(version: int, features: int, response: tuple[int | bytes, bytes], rounds: int,
+        coalesced: bool) -> tuple[float, float, list[float]]:
+    """
+    :return: (server send calls per response, client recv calls per response, round trip latencies in µs)
+    """
+    size = sum(map(len, main.build_response(response, Session(version, features))))
+    sends = 0
+    original = {name: getattr(socket.socket, name) for name in ('send', 'sendmsg')}
+
+    def counted(name: str):
+        def call(sock, *args):
+            nonlocal sends
+            sends += 1
+            return original[name](sock, *args)
+        return call
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = Session(version, features)
+        send = main.send_response if coalesced else legacy_send_response
+        while await reader.read(1):
+            session.picks_answered += 1
+            await send(writer, response, session)
+        writer.close()
+
+    latencies = []
+    recvs = 0
+
+    def client(address: tuple) -> None:
+        nonlocal recvs
+        buffer = memoryview(bytearray(size))
+        with socket.create_connection(address) as sock:
+            for _ in range(rounds):
+                start = time.perf_counter()
+                sock.sendall(b'\x00')
+                received = 0
+                while received < size:
+                    received += sock.recv_into(buffer[received:])
+                    recvs += 1
+                latencies.append((time.perf_counter() - start) * 1e6)
+
+    async def bench() -> None:
+        server = await asyncio.start_server(serve, '127.0.0.1', 0)
+        thread = threading.Thread(target=client, args=(server.sockets[0].getsockname(),))
+        thread.start()
+        await asyncio.to_thread(thread.join)
+        server.close()
+        await server.wait_closed()
+
+    for name in original:
+        setattr(socket.socket, name, counted(name))
+    try:
+        asyncio.run(bench())
+    finally:
+        for name, method in original.items():
+            setattr(socket.socket, name, method)
+    return sends / rounds, recvs / rounds, latencies
+
+
+def main_() -> None:
+    print(f"{'response':>26} {'bytes':>7} {'writes':>10} {'send()':>7} {'recv()':>7} {'p50 µs':>8} {'p99 µs':>8}")
+    for name, version, features, response, rounds in cases():
+        size = sum(map(len, main.build_response(response, Session(version, features))))
+        for coalesced in (False, True):
+            sends, recvs, latencies = run(version, features, response, rounds, coalesced)
+            p99 = statistics.quantiles(latencies, n=100)[98]
+            print(f"{name:>26} {size:>7,} {'coalesced' if coalesced else 'per part':>10} {sends:>7.2f} "
+                  f"{recvs:>7.2f} {statistics.median(latencies):>8.1f} {p99:>8.1f}")
+
+
+if __name__ == '__main__':
+    main_()
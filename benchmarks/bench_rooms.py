@@ -0,0 +1,89 @@
+"""
+Benchmark: game rooms in one server process (main.GameRegistry).
+Memory: traced allocations per idle game (board, board task, request queue, two seated players).
+Throughput: total picks/sec across GAMES rooms, two clients per room picking in a loop through request_board for
+SECONDS. Runs in one event loop without sockets, so it measures the rooms, not the network.
+
+Run from the repository root:  python -m benchmarks.bench_rooms
+"""
+import asyncio
+import contextlib
+import gc
+import io
+import random
+import time
+import tracemalloc
+
+import main
+from Board import Board
+from network_functions import Session
+
+IDLE_GAMES = 10_000
+GAMES = (1, 10, 100, 1000)
+SECONDS = 3.0
+N = 10
+
+
+def new_board(game_id: int) -> Board:
+    return Board(N, '4', seed=game_id)
+
+
+async def idle_game_memory() -> float:
+    """
+    :return: Bytes per idle game with both seats taken
+    """
+    registry = main.GameRegistry(new_board)
+    await asyncio.sleep(0)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(2 * IDLE_GAMES):
+        registry.join()
+    await asyncio.sleep(0)  # let every board task start and wait on its queue
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    for game in list(registry.games.values()):
+        for player in list(game.players):
+            await registry.leave(game, player)
+    return used / IDLE_GAMES
+
+
+async def throughput(games: int) -> float:
+    """
+    :return: Picks per second across every room
+    """
+    registry = main.GameRegistry(new_board)
+    seats = [registry.join() for _ in range(2 * games)]
+    deadline = time.perf_counter() + SECONDS
+    picks = 0
+
+    async def client(game: main.Game, player, seed: int) -> None:
+        nonlocal picks
+        rng = random.Random(seed)
+        session = Session()
+        while time.perf_counter() < deadline:
+            await main.request_board(game.requests, rng.randrange(N), rng.randrange(N), player, session)
+            picks += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(game, player, seed) for seed, (game, player) in enumerate(seats)))
+    elapsed = time.perf_counter() - start
+    for game, player in seats:
+        await registry.leave(game, player)
+    return picks / elapsed
+
+
+def main_() -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        per_game = asyncio.run(idle_game_memory())
+    print(f"idle game ({N}x{N} board, 2 players): {per_game / 1024:.1f} KiB "
+          f"({IDLE_GAMES:,} games: {per_game * IDLE_GAMES / 2 ** 20:.1f} MiB)")
+    print(f"{'games':>6} {'picks/s':>10}")
+    for games in GAMES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            rate = asyncio.run(throughput(games))
+        print(f"{games:>6} {rate:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main_()
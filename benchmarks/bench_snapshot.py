@@ -0,0 +1,89 @@
+"""
+Benchmark: cost of mirroring every game into a memory-mapped snapshot file (board_snapshot.BoardSnapshot).
+- pick latency: one client makes sequential picks through the board task (request_board) for SECONDS, with and
+  without a snapshot; reports p50/p99 latency per pick
+- restore: time to reattach to the snapshot of a fully picked board and rebuild the board and scores
+Snapshot files are written to a temporary directory.
+
+Run from the repository root:  python -m benchmarks.bench_snapshot
+"""
+import asyncio
+import statistics
+import tempfile
+import time
+
+import main
+from board_snapshot import BoardSnapshot, snapshot_path, snapshot_size
+from Board import Board
+from Player import Player
+from network_functions import Session
+
+SIZES = (16, 256, 1024)
+SECONDS = 2.0
+
+
+async def run(n: int, directory: str | None) -> list[float]:
+    """
+    Picks tiles in row-major order for SECONDS.
+    :param directory: Snapshot directory, None to run without a snapshot
+    :return: Latency of every pick in ms
+    """
+    board = Board(n, '4', seed=n)
+    players = [Player("One"), Player("Two")]
+    snapshot = BoardSnapshot.create(snapshot_path(directory, n), board, n, 2) if directory else None
+    requests = asyncio.Queue()
+    task = asyncio.create_task(main.board_at_play(board, players, requests, snapshot=snapshot))
+    session = Session()
+    latencies = []
+    deadline = time.perf_counter() + SECONDS
+    index = 0
+    while time.perf_counter() < deadline and index < n * n:
+        row, col = divmod(index, n)
+        start = time.perf_counter()
+        await main.request_board(requests, row, col, players[index & 1], session)
+        latencies.append((time.perf_counter() - start) * 1000)
+        index += 1
+    await requests.put(None)
+    await task
+    if snapshot is not None:
+        snapshot.close()
+    return latencies
+
+
+def restore_ms(n: int, directory: str) -> float:
+    """
+    :return: Time in ms to restore the snapshot of a fully picked n x n board
+    """
+    board = Board(n, '4', seed=n)
+    path = snapshot_path(directory, n)
+    snapshot = BoardSnapshot.create(path, board, n, 2)
+    for index in range(n * n):
+        base = board.version
+        board.pick(*divmod(index, n))
+        snapshot.record(board, base, index & 1)
+    snapshot.close()
+    start = time.perf_counter()
+    snapshot, _, restored, scores = BoardSnapshot.restore(path)
+    elapsed = (time.perf_counter() - start) * 1000
+    snapshot.close(remove=True)
+    assert restored.mask_bytes() == board.mask_bytes()
+    return elapsed
+
+
+def main_() -> None:
+    print(f"{'n':>5} {'snapshot':>9} {'picks':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in SIZES:
+            for mirrored in (False, True):
+                latencies = asyncio.run(run(n, directory if mirrored else None))
+                p99 = statistics.quantiles(latencies, n=100)[98]
+                print(f"{n:>5} {'on' if mirrored else 'off':>9} {len(latencies):>7} "
+                      f"{statistics.median(latencies):>9.4f} {p99:>9.4f}")
+        print()
+        print(f"{'n':>5} {'file KiB':>9} {'restore ms':>11}")
+        for n in SIZES:
+            print(f"{n:>5} {snapshot_size(n, 4) / 1024:>9,.0f} {restore_ms(n, directory):>11.2f}")
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,87 @@
+"""
+Benchmark: server throughput from 1 to N worker processes (python main.py --workers W, 0 = the single-process
+server), driven by a local bot load generator. Bot processes each open CONNECTIONS v1 connections (so every game
+gets two players) and pick random tiles in a loop, waiting for every response, for SECONDS. Reports total picks/sec.
+The bots run on the same machine, so they compete with the workers for cores; compare runs on the same host only.
+
+Run from the repository root:  python -m benchmarks.bench_workers
+"""
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from struct import unpack
+
+from network_functions import PORT, receive_decoded_string
+
+WORKERS = (0, 1, 2, 4)
+BOT_PROCESSES = 2
+CONNECTIONS = 50
+SECONDS = 5.0
+N = 10
+
+
+async def bot(deadline: float, seed: int) -> int:
+    """
+    One v1 client picking random tiles until the deadline.
+    :return: Picks answered
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    await receive_decoded_string(reader, '!H')
+    picks = 0
+    while time.time() < deadline:
+        writer.write(bytes([rng.randrange(N) << 4 | rng.randrange(N)]))
+        await reader.readexactly(2)
+        await reader.readexactly(unpack('!H', await reader.readexactly(2))[0])
+        picks += 1
+    writer.close()
+    return picks
+
+
+def bot_process(deadline: float, seed: int) -> int:
+    """
+    Runs CONNECTIONS bots in one event loop.
+    :return: Picks answered across the bots
+    """
+    async def run_bots() -> list[int]:
+        return await asyncio.gather(*(bot(deadline, seed * CONNECTIONS + i) for i in range(CONNECTIONS)))
+    return sum(asyncio.run(run_bots()))
+
+
+def wait_for_port(timeout: float = 10.0) -> None:
+    import socket
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            socket.create_connection(('127.0.0.1', PORT)).close()
+            time.sleep(0.2)  # let the server drop the probe's seat
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError("server did not start")
+
+
+def main() -> None:
+    print(f"cores: {os.cpu_count()}, bot processes: {BOT_PROCESSES} x {CONNECTIONS} connections")
+    print(f"{'workers':>8} {'picks/s':>10}")
+    for workers in WORKERS:
+        launcher = ['--workers', str(workers)] if workers else []
+        server = subprocess.Popen([sys.executable, 'main.py', *launcher, str(N), '4'],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port()
+            deadline = time.time() + SECONDS
+            with ProcessPoolExecutor(BOT_PROCESSES) as pool:
+                picks = sum(pool.map(bot_process, [deadline] * BOT_PROCESSES, range(BOT_PROCESSES)))
+            print(f"{workers:>8} {picks / SECONDS:>10,.0f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: per-frame compressed size and compress time for a run of consecutive boards (one pick between frames),
+comparing zlib.compress per frame (v1) against one per-connection zlib stream with Z_SYNC_FLUSH (FEATURE_ZSTREAM),
+with and without the preset dictionary. Also reports the zlib state each streaming connection holds.
+
+Run from the repository root:  python -m benchmarks.bench_zstream
+"""
+import random
+import time
+import tracemalloc
+import zlib
+
+from Board import Board
+from network_functions import FEATURE_ZSTREAM, Session
+
+SIZES = ((16, 200), (256, 20), (1024, 3))
+
+
+def stream_without_dict(data: bytes, compressor=None) -> bytes:
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def run(n: int, frames: int, compress) -> tuple[float, float, float]:
+    """
+    Compresses the board after each of frames picks.
+    :return: (mean bytes of the first frame, mean bytes of the later frames, mean ms per frame)
+    """
+    board = Board(n, '4', seed=n)
+    coords = random.Random(n).sample(range(n * n), frames)
+    sizes = []
+    elapsed = 0.0
+    for index in coords:
+        board.pick(index // n, index % n)
+        data = board.mask_bytes()
+        start = time.perf_counter()
+        sizes.append(len(compress(data)))
+        elapsed += time.perf_counter() - start
+    later = sizes[1:] or sizes
+    return sizes[0], sum(later) / len(later), elapsed / frames * 1000
+
+
+def session_memory() -> int:
+    """
+    :return: Bytes allocated by one streaming session once both of its zlib objects exist
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    session = Session(features=FEATURE_ZSTREAM)
+    session.decompress(session.compress(b'_ ' * 16))
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used
+
+
+def main() -> None:
+    print(f"{'n':>5} {'mode':>16} {'first bytes':>12} {'next bytes':>11} {'ms/frame':>9}")
+    for n, frames in SIZES:
+        modes = (
+            ('zlib.compress', zlib.compress),
+            ('stream', lambda data, c=zlib.compressobj(): stream_without_dict(data, c)),
+            ('stream + dict', Session(features=FEATURE_ZSTREAM).compress),
+        )
+        for name, compress in modes:
+            first, later, ms = run(n, frames, compress)
+            print(f"{n:>5} {name:>16} {first:>12,} {later:>11,.0f} {ms:>9.3f}")
+    print(f"zlib state per streaming connection (compressor + decompressor): {session_memory() / 1024:,.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
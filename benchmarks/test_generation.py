@@ -0,0 +1,57 @@
+"""
+Board generation and full-game simulation benchmarks (pytest-benchmark).
+Every board is seeded, so runs are comparable and placement regressions show up as numbers.
+
+Run from the repository root:  python -m pytest benchmarks/test_generation.py
+Save and compare runs with --benchmark-autosave / --benchmark-compare.
+"""
+import random
+
+import pytest
+
+from Board import Board
+from Player import Player
+
+pytest.importorskip('pytest_benchmark')
+
+SEED = 226
+GENERATION_GRID = [(n, t) for n in (16, 256, 1024, 4096) for t in sorted({4, n // 4, n})]
+GAME_SIZES = (16, 256, 1024, 4096)
+
+
+def rounds_for(n: int) -> int:
+    """
+    Fewer rounds for the big boards so the suite finishes in minutes.
+    """
+    return 20 if n <= 256 else 3 if n <= 1024 else 1
+
+
+def play_full_game(n: int, t: int, seed: int) -> int:
+    """
+    Two players alternately pick every tile of a seeded board in a seeded random order.
+    :return: Total score, which is always the sum of value * value for value in 1..t
+    """
+    board = Board(n, str(t), seed=seed)
+    players = [Player("One"), Player("Two")]
+    order = list(range(n * n))
+    random.Random(seed).shuffle(order)
+    for turn, index in enumerate(order):
+        players[turn & 1].add_score(board.pick(index // n, index % n))
+    return sum(player.get_score() for player in players)
+
+
+@pytest.mark.parametrize('n,t', GENERATION_GRID)
+def test_board_generation(benchmark, n, t):
+    seeds = iter(range(SEED, SEED + 1000))
+    board = benchmark.pedantic(lambda: Board(n, str(t), seed=next(seeds)), rounds=rounds_for(n))
+    assert board.n == n
+    benchmark.extra_info['tiles'] = n * n
+
+
+@pytest.mark.parametrize('n', GAME_SIZES)
+def test_full_game_simulation(benchmark, n):
+    t = min(n, 16)
+    total = benchmark.pedantic(play_full_game, args=(n, t, SEED), rounds=rounds_for(n))
+    assert total == t * (t + 1) * (2 * t + 1) // 6
+    benchmark.extra_info['picks'] = n * n
+    benchmark.extra_info['picks_per_second'] = n * n / benchmark.stats.stats.mean
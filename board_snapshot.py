@@ -0,0 +1,155 @@
+import mmap
+import os
+from array import array
+from struct import Struct
+from Board import Board, cell_typecode
+
+SNAPSHOT_MAGIC = b'THSN'
+SNAPSHOT_LAYOUT = 1
+# magic, layout, cell size, seats taken, n, t, game id, board version; native byte order, since a snapshot is only
+# reopened on the host that wrote it. The version (offset 20) is written last and marks what is committed.
+SNAPSHOT_HEADER = Struct('=4sBBHIIII')
+VERSION = Struct('=I')
+VERSION_OFFSET = 20
+SEATS = Struct('=H')
+SEATS_OFFSET = 6
+HEADER_SIZE = 32  # header padded, so the sections after it are 4-byte aligned
+SNAPSHOT_SUFFIX = '.snap'
+
+
+def snapshot_path(directory: str, game_id: int) -> str:
+    """
+    :param directory: Snapshot directory
+    :param game_id: Id of the game
+    :return: Path of the game's snapshot file
+    """
+    return os.path.join(directory, f"game-{game_id}{SNAPSHOT_SUFFIX}")
+
+
+def snapshot_size(n: int, t: int) -> int:
+    """
+    :param n: Board size
+    :param t: Largest treasure value
+    :return: Size in bytes of the snapshot file of such a board
+    """
+    cells = n * n * array(cell_typecode(t)).itemsize
+    return HEADER_SIZE + (cells + 3) // 4 * 4 + n * n * 4 + n * n
+
+
+class BoardSnapshot:
+    """
+    Mirrors one game into a fixed-layout, memory-mapped file, so a restarted server can resume it (see restore).
+    Layout after the header: the tile values (written once), then the row-major index of every picked tile in pick
+    order (the board history), then the seat of the player who made each of those picks. Sections are sized for a
+    fully picked board, so the file never grows.
+    record() writes the new history and seat entries in place and then stores the new board version, so the file
+    only ever claims picks that are fully written. Writes go to the page cache straight away and survive the server
+    process crashing or being killed; flush() (msync) also makes them survive the host going down.
+    """
+
+    def __init__(self, path: str, file_map: mmap.mmap, n: int, itemsize: int) -> None:
+        """
+        Use create() or restore().
+        :param path: Path of the snapshot file
+        :param file_map: Memory map of the whole file
+        :param n: Board size
+        :param itemsize: Bytes per tile value
+        """
+        self.path = path
+        self._map = file_map
+        history = HEADER_SIZE + (n * n * itemsize + 3) // 4 * 4
+        self._cells = memoryview(file_map)[HEADER_SIZE:HEADER_SIZE + n * n * itemsize]
+        self._history = memoryview(file_map)[history:history + n * n * 4].cast('I')
+        self._seats = memoryview(file_map)[history + n * n * 4:history + n * n * 5]
+
+    @classmethod
+    def create(cls, path: str, board: Board, game_id: int, seats: int = 0) -> 'BoardSnapshot':
+        """
+        Writes a new snapshot of a board, replacing any file at path.
+        Picks already on the board are recorded for seat 0.
+        :param path: Path of the snapshot file
+        :param board: The game's Board
+        :param game_id: Id of the game
+        :param seats: Seats taken so far
+        :return: The snapshot, ready for record()
+        """
+        with open(path, 'w+b') as file:
+            file.truncate(snapshot_size(board.n, board.t))
+            file_map = mmap.mmap(file.fileno(), 0)
+        itemsize = array(cell_typecode(board.t)).itemsize
+        SNAPSHOT_HEADER.pack_into(file_map, 0, SNAPSHOT_MAGIC, SNAPSHOT_LAYOUT, itemsize, seats, board.n, board.t,
+                                  game_id, 0)
+        snapshot = cls(path, file_map, board.n, itemsize)
+        snapshot._cells[:] = board.cells_bytes()
+        snapshot.record(board, 0, 0)
+        return snapshot
+
+    @classmethod
+    def restore(cls, path: str) -> tuple['BoardSnapshot', int, Board, list[int]]:
+        """
+        Reattaches to a snapshot: rebuilds the board from its tiles and committed picks, and every seat's score.
+        :param path: Path of the snapshot file
+        :return: (the snapshot, ready for record(), game id, Board, score of each seat taken)
+        :raises ValueError: if the file is not a snapshot of this layout or is truncated
+        """
+        with open(path, 'r+b') as file:
+            file_map = mmap.mmap(file.fileno(), 0)
+        try:
+            if len(file_map) < HEADER_SIZE: raise ValueError(f"{path} is not a snapshot")
+            magic, layout, itemsize, seats, n, t, game_id, version = SNAPSHOT_HEADER.unpack_from(file_map)
+            if magic != SNAPSHOT_MAGIC or layout != SNAPSHOT_LAYOUT: raise ValueError(f"{path} is not a snapshot")
+            if len(file_map) != snapshot_size(n, t) or version > n * n: raise ValueError(f"{path} is truncated")
+        except Exception:
+            file_map.close()
+            raise
+        snapshot = cls(path, file_map, n, itemsize)
+        board = Board.from_cells(n, t, bytes(snapshot._cells))
+        history = snapshot._history[:version].tolist()
+        values = board.pick_many([divmod(index, n) for index in history])
+        scores = [0] * seats
+        for seat, value in zip(snapshot._seats[:version], values):
+            if seat < seats:
+                scores[seat] += value
+        return snapshot, game_id, board, scores
+
+    def record(self, board: Board, base: int, seat: int) -> None:
+        """
+        Mirrors the picks made since base, then commits the board's new version.
+        :param board: The game's Board
+        :param base: Board version already recorded
+        :param seat: Seat of the player who made the picks
+        :return: None
+        """
+        version = board.version
+        if version == base:
+            return
+        self._history[base:version] = board.changes_since(base)
+        self._seats[base:version] = bytes((seat,)) * (version - base)
+        VERSION.pack_into(self._map, VERSION_OFFSET, version)
+
+    def set_seats(self, seats: int) -> None:
+        """
+        Records how many seats of the game have been taken.
+        :param seats: Seats taken so far
+        :return: None
+        """
+        SEATS.pack_into(self._map, SEATS_OFFSET, seats)
+
+    def flush(self) -> None:
+        """
+        Writes the mapped pages to disk (msync), so the snapshot survives a crash of the host as well.
+        :return: None
+        """
+        self._map.flush()
+
+    def close(self, remove: bool = False) -> None:
+        """
+        Unmaps the file.
+        :param remove: Delete the file too (the game is over and will not be resumed)
+        :return: None
+        """
+        for view in (self._cells, self._history, self._seats):
+            view.release()
+        self._map.close()
+        if remove:
+            os.remove(self.path)
@@ -1,60 +1,224 @@
 import logging
-import zlib
-from struct import unpack, pack
-from asyncio import run, StreamReader, StreamWriter, open_connection
+import sys
+from asyncio import IncompleteReadError, StreamWriter, open_connection
 
 from network_functions import (
     HOST,
     PORT,
-    FORMAT_MAP,
+    FEATURE_DELTA,
+    FEATURE_BITPACK,
+    FEATURE_ZSTREAM,
+    FEATURE_REJOIN,
+    FEATURE_PUSH,
+    SPECTATOR_PORT,
+    SPECTATE,
+    NEWEST_GAME,
+    MESSAGE,
+    MSG_UPDATE,
+    FRAMED_FEATURES,
+    REJOIN_TOKEN,
+    SCORE_V1,
+    BOARD_LENGTH_V1,
+    BOARD_LENGTH_V2,
+    Session,
+    PROTOCOL_V1,
+    PROTOCOL_V2,
+    STATUS_OUT_OF_BOUNDS,
+    ClientBoard,
+    FrameReader,
     receive_decoded_string,
+    send_hello,
+    send_rejoin,
+    pack_pick,
+    parse_board_frame,
+    parse_scores,
+    parse_sized,
+    parse_struct,
+    parse_update,
     is_empty_buffer,
     get_player_scores,
+    pop_loop_arg,
+    run_with_loop,
 )
 
 
-async def send_row_col_async(writer: StreamWriter) -> None:
+async def send_row_col_async(writer: StreamWriter, known_version: int | None = None,
+                             session: Session | None = None) -> None:
     """
     Prompt user for Row and Column input. Validate in loop.
     After validated, pack and write to server.
+    In delta mode the pick is followed by the board version the client has.
     :param writer: StreamWriter
+    :param known_version: Client board version (delta mode), None for v1
+    :param session: Protocol options agreed with the server; v2 allows rows and columns up to 65535
     :return: None
     """
+    session = session or Session()
+    limit = 0xFFFF if session.version >= PROTOCOL_V2 else 15
     while True:
-        row = input("Enter Row (0-15): ")
-        col = input("Enter Column (0-15): ")
+        row = input(f"Enter Row (0-{limit}): ")
+        col = input(f"Enter Column (0-{limit}): ")
         if row == '' or col == '':
-            print("Input cannot be empty. Please enter valid integers between 0 and 15.")
+            print(f"Input cannot be empty. Please enter valid integers between 0 and {limit}.")
             continue
         try:
             row_int = int(row)
             col_int = int(col)
         except ValueError:
-            print("Invalid input. Please enter integers between 0 and 15.")
+            print(f"Invalid input. Please enter integers between 0 and {limit}.")
             continue
 
-        if 0 <= row_int <= 15 and 0 <= col_int <= 15:
-            data = pack("!B", (row_int << 4) | col_int)
-            writer.write(data)
+        if 0 <= row_int <= limit and 0 <= col_int <= limit:
+            writer.write(pack_pick(row_int, col_int, session, known_version))
             await writer.drain()
             break
         else:
-            print("Invalid input. Please enter integers between 0 and 15.")
+            print(f"Invalid input. Please enter integers between 0 and {limit}.")
             continue
 
 
+def client_features() -> int:
+    """
+    Parses command line flags into the protocol features to ask the server for.
+    Expects: python client.py [--v2] [--delta] [--bitpack] [--zstream] [--token] [--push]
+    :return: FEATURE_* flags, 0 for the original protocol
+    """
+    flags = {'--delta': FEATURE_DELTA, '--bitpack': FEATURE_BITPACK, '--zstream': FEATURE_ZSTREAM,
+             '--token': FEATURE_REJOIN, '--push': FEATURE_PUSH}
+    return sum(feature for flag, feature in flags.items() if flag in sys.argv[1:])
+
+
+def rejoin_args() -> tuple[int, int] | None:
+    """
+    Parses "--rejoin GAME:SEAT" (the token printed by an earlier --token session).
+    :return: (game id, seat), or None to join as a new player
+    :raises ValueError: if the token is malformed
+    """
+    if '--rejoin' not in sys.argv[1:]: return None
+    index = sys.argv.index('--rejoin')
+    token = sys.argv[index + 1] if index + 1 < len(sys.argv) else ''
+    game_id, _, seat = token.partition(':')
+    if not game_id.isdigit() or not seat.isdigit(): raise ValueError("--rejoin expects GAME:SEAT")
+    return int(game_id), int(seat)
+
+
+def spectate_args() -> int | None:
+    """
+    Parses "--spectate [GAME]".
+    :return: Game id to watch (NEWEST_GAME if none is given), or None to play
+    :raises ValueError: if GAME is not a number
+    """
+    if '--spectate' not in sys.argv[1:]: return None
+    index = sys.argv.index('--spectate')
+    game_id = sys.argv[index + 1] if index + 1 < len(sys.argv) and not sys.argv[index + 1].startswith('--') else ''
+    if game_id and not game_id.isdigit(): raise ValueError("--spectate expects a game id")
+    return int(game_id) if game_id else NEWEST_GAME
+
+
+def print_update(board: ClientBoard, scores: tuple[int, ...], frame: tuple[int, int, int, bytes]) -> None:
+    """
+    Applies and prints an update pushed by the server.
+    :param board: Client copy of the board
+    :param scores: Score of each seat
+    :param frame: Board frame of the update
+    :return: None
+    """
+    board.apply_frame(*frame)
+    print("Update - " + " || ".join(f"Player {seat + 1}: {score}" for seat, score in enumerate(scores)))
+    print_board(str(board))
+
+
+async def receive_updates(frames: FrameReader, board: ClientBoard, session: Session) -> None:
+    """
+    With --push, prints the updates the server pushed until the response to this client's own request starts.
+    :param frames: Buffered reader of the connection
+    :param board: Client copy of the board
+    :param session: Protocol options agreed with the server
+    :return: None
+    """
+    if not session.has(FEATURE_PUSH):
+        return
+    while (await frames.read(parse_struct, MESSAGE))[0] == MSG_UPDATE:
+        print_update(board, *await frames.read(parse_update))
+
+
+async def spectate(game_id: int) -> None:
+    """
+    Watches a game from SPECTATOR_PORT: prints every update the server pushes until it closes the connection.
+    :param game_id: Game to watch, NEWEST_GAME for the newest game
+    :return: None
+    """
+    reader, writer = await open_connection(HOST, SPECTATOR_PORT)
+    frames = FrameReader(reader)
+    board = ClientBoard()
+    try:
+        writer.write(SPECTATE.pack(game_id))
+        await writer.drain()
+        while True:
+            await frames.read(parse_struct, MESSAGE)
+            print_update(board, *await frames.read(parse_update))
+    except IncompleteReadError:
+        print("The game is over or does not exist.")
+    except Exception as e:
+        logging.error(f"Error in spectate: {e}")
+    writer.close()
+    await writer.wait_closed()
+
+
+async def receive_scores(frames: FrameReader, session: Session | None = None) -> None:
+    """
+    Receives and prints the score field that starts every response: 2 bytes for v1, every seat's score for v2.
+    :param frames: Buffered reader of the connection
+    :param session: Protocol options agreed with the server
+    :return: None
+    :raises IncompleteReadError: if the server closed the connection
+    """
+    if session is not None and session.version >= PROTOCOL_V2:
+        status, scores = await frames.read(parse_scores)
+        if status == STATUS_OUT_OF_BOUNDS:
+            print("Pick is outside the board.")
+        print("Current Scores - " + " || ".join(f"Player {seat + 1}: {score}" for seat, score in enumerate(scores)))
+        return
+
+    score_data = (await frames.read(parse_struct, SCORE_V1))[0]
+    player1, player2 = get_player_scores(score_data)
+    print(f"Current Scores - Player 1: {player1} || Player 2: {player2}")
+
+
+def print_board(board_str: str) -> None:
+    print("\nCurrent Board:")
+    print(board_str)
+    print()
+
+
 async def client_program() -> None:
     """
     Asyncio client program that connects to the server, receives player name.and sends row/column picks in a loop,
     Prints the current score and board after each pick.
     Now receives compressed board data using zlib.
+    Everything after the player name is read through one buffered FrameReader.
+    With --v2, negotiates protocol v2: 16-bit rows and columns and a score for every seat.
+    With --delta, negotiates delta board frames: the server sends a full board once, then only changed tiles.
+    With --bitpack, full boards arrive as one bit per tile instead of compressed text.
+    With --zstream, compressed boards are chunks of one zlib stream kept for the whole connection.
+    With --token (launcher mode servers), prints a GAME:SEAT token; --rejoin GAME:SEAT takes that seat back later.
+    With --push, the server also sends every other player's picks; they are printed before the next response.
+    With --spectate [GAME], watches a game (by default the newest) instead of playing.
+    With --loop NAME, runs on the asyncio, uvloop or auto (uvloop if installed) event loop.
     Displays error message if server is full.
     :return: None
     :raises: Exception if connection or communication fails
     """
+    game_id = spectate_args()
+    if game_id is not None:
+        await spectate(game_id)
+        return
+    rejoin = rejoin_args()
     reader, writer = await open_connection(HOST, PORT)
 
     try:
+        if rejoin is not None:
+            await send_rejoin(writer, *rejoin)
         name = await receive_decoded_string(reader, '!H')
         if is_empty_buffer(name):
             print("Error: Server is full. Maximum 2 players allowed. Please try again later.")
@@ -64,34 +228,41 @@ async def client_program() -> None:
 
         print("Player Name:", name)
 
-        while True:
-            await send_row_col_async(writer)
-
-            resp = await reader.readexactly(FORMAT_MAP["!H"])
-            if is_empty_buffer(resp):
-                logging.error("Empty buffer response...")
-                break
+        frames = FrameReader(reader)
+        board = None
+        session = Session()
+        features = client_features()
+        version = PROTOCOL_V2 if '--v2' in sys.argv[1:] else PROTOCOL_V1
+        if features or version != PROTOCOL_V1:
+            session = await send_hello(reader, writer, features, version)
+            if session.has(FEATURE_REJOIN):
+                game_id, seat = await frames.read(parse_struct, REJOIN_TOKEN)
+                print(f"Rejoin token: {game_id}:{seat} (python client.py --rejoin {game_id}:{seat})")
+            if session.has(FRAMED_FEATURES):
+                board = ClientBoard(session)
+                await receive_updates(frames, board, session)
+                await receive_scores(frames, session)
+                board.apply_frame(*await frames.read(parse_board_frame))
+                print_board(str(board))
 
-            score_data = unpack("!H", resp)[0]
-            player1, player2 = get_player_scores(score_data)
-            print(f"Current Scores - Player 1: {player1} || Player 2: {player2}")
-
-            board_len_data = await reader.readexactly(FORMAT_MAP["!H"])
-            if is_empty_buffer(board_len_data):
-                logging.error("Empty buffer response...")
-                break
+        while True:
+            await send_row_col_async(writer, board.version if session.has(FEATURE_DELTA) else None, session)
 
-            board_len = unpack("!H", board_len_data)[0]
+            if board is not None:
+                await receive_updates(frames, board, session)
+            await receive_scores(frames, session)
 
-            compressed_board = await reader.readexactly(board_len)
-            if len(compressed_board) < board_len:
-                logging.error("Failed to receive board...")
-                break
+            if board is not None:
+                if not board.apply_frame(*await frames.read(parse_board_frame)):
+                    logging.error("Board out of sync, requesting a full board on the next pick...")
+                    continue
+                print_board(str(board))
+                continue
 
-            board_str = zlib.decompress(compressed_board).decode()
-            print("\nCurrent Board:")
-            print(board_str)
-            print()
+            length = BOARD_LENGTH_V2 if session.version >= PROTOCOL_V2 else BOARD_LENGTH_V1
+            compressed_board = await frames.read(parse_sized, length)
+            board_str = session.decompress(compressed_board).decode()
+            print_board(board_str)
 
     except Exception as e:
         logging.error(f"Error in client_program: {e}")
@@ -99,4 +270,5 @@ async def client_program() -> None:
     await writer.wait_closed()
 
 
-run(client_program())
+if __name__ == '__main__':
+    run_with_loop(client_program(), pop_loop_arg(sys.argv))
@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from network_functions import (
+    BOARD_LENGTH_V1,
+    BOARD_LENGTH_V2,
+    PORT,
+    PROTOCOL_V1,
+    PROTOCOL_V2,
+    LOOP_BACKENDS,
+    DEFAULT_LOOP,
+    SCORE_V1,
+    FrameReader,
+    Session,
+    pack_pick,
+    parse_scores,
+    parse_sized,
+    parse_struct,
+    receive_decoded_string,
+    run_with_loop,
+    send_hello,
+)
+
+BUCKETS_PER_OCTAVE = 8  # latency histogram resolution: bucket bounds grow by 2 ** (1 / 8), about 9%
+DEFAULT_CONNECTIONS = 1000
+DEFAULT_CONNECT_CONCURRENCY = 100  # connection attempts in flight per process, below the server's listen backlog
+BOT_READ_BUFFER = 4096  # initial receive buffer of each bot; it grows to fit larger boards
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with log-spaced buckets (BUCKETS_PER_OCTAVE per doubling, from 1 microsecond), so memory does
+    not grow with the number of samples. Mergeable across worker processes; percentiles are bucket upper bounds.
+    """
+
+    def __init__(self) -> None:
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """
+        Adds one sample.
+        :param seconds: Latency in seconds
+        :return: None
+        """
+        self.buckets[int(math.log2(max(seconds * 1e6, 1.0)) * BUCKETS_PER_OCTAVE)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """
+        Folds another histogram into this one.
+        :param other: Histogram gathered separately (e.g. by another worker)
+        :return: None
+        """
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @staticmethod
+    def upper_bound(bucket: int) -> float:
+        """
+        :param bucket: Bucket index
+        :return: Largest latency in the bucket, in seconds
+        """
+        return 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE) / 1e6
+
+    def percentile(self, percent: float) -> float:
+        """
+        :param percent: Percentile, 0-100
+        :return: Latency in seconds that percent of the samples do not exceed (bucket upper bound), 0 without samples
+        :raises ValueError: if percent is not in 0-100
+        """
+        if not 0 <= percent <= 100: raise ValueError("percent must be between 0 and 100")
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.upper_bound(bucket), self.max)
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000 if self.count else None,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000,
+            'histogram_ms': {f"{self.upper_bound(bucket) * 1000:.4g}": self.buckets[bucket]
+                             for bucket in sorted(self.buckets)},
+        }
+
+
+class LoadResult:
+    """
+    Aggregated outcome of a load run: connection and pick counts, errors, and latency histograms for connecting
+    (connect until the player name arrives) and for every pick (pick sent until its whole response arrives).
+    """
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.rejected = 0  # server full
+        self.connect_errors = 0
+        self.errors = 0  # connections lost while picking, or that broke the protocol
+        self.picks = 0
+        self.connect_seconds = 0.0  # from the start until the last bot was seated
+        self.seconds = 0.0  # length of the run
+        self.connect_latency = LatencyHistogram()
+        self.latency = LatencyHistogram()
+
+    def merge(self, other: 'LoadResult') -> None:
+        """
+        Folds the result of another worker process of the same run into this one.
+        :param other: Result gathered separately
+        :return: None
+        """
+        self.connections += other.connections
+        self.rejected += other.rejected
+        self.connect_errors += other.connect_errors
+        self.errors += other.errors
+        self.picks += other.picks
+        self.connect_seconds = max(self.connect_seconds, other.connect_seconds)
+        self.seconds = max(self.seconds, other.seconds)
+        self.connect_latency.merge(other.connect_latency)
+        self.latency.merge(other.latency)
+
+    def to_dict(self) -> dict:
+        return {
+            'connections': self.connections,
+            'rejected': self.rejected,
+            'connect_errors': self.connect_errors,
+            'errors': self.errors,
+            'picks': self.picks,
+            'seconds': self.seconds,
+            'connections_per_sec': self.connections / self.connect_seconds if self.connect_seconds else None,
+            'picks_per_sec': self.picks / self.seconds if self.seconds else None,
+            'connect_latency': self.connect_latency.to_dict(),
+            'pick_latency': self.latency.to_dict(),
+        }
+
+
+async def bot(host: str, port: int, n: int, rate: float, version: int, start: float, deadline: float,
+              connecting: asyncio.Semaphore, result: LoadResult, rng: random.Random) -> None:
+    """
+    One player: connects, then picks random tiles until the deadline, waiting for every response.
+    :param host: Server address
+    :param port: Server port
+    :param n: Board size of the server, picks are in 0..n-1
+    :param rate: Picks per second, 0 to pick again as soon as the response arrives
+    :param version: PROTOCOL_V1, or PROTOCOL_V2 (negotiated with HELLO) for boards larger than 16x16
+    :param start: Wall-clock start of the run
+    :param deadline: Wall-clock time the bot stops picking
+    :param connecting: Limits the connection attempts in flight
+    :param result: Where counts and latencies are recorded
+    :param rng: Random generator for the picks
+    :return: None
+    """
+    async with connecting:
+        begin = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            name = await receive_decoded_string(reader, '!H')
+        except (OSError, asyncio.IncompleteReadError):
+            result.connect_errors += 1
+            return
+        if not name:
+            result.rejected += 1
+            writer.close()
+            return
+        result.connect_latency.add(time.perf_counter() - begin)
+        result.connections += 1
+        result.connect_seconds = max(result.connect_seconds, time.time() - start)
+    try:
+        session = Session()
+        if version >= PROTOCOL_V2:
+            session = await send_hello(reader, writer, 0, version)
+        frames = FrameReader(reader, BOT_READ_BUFFER)
+        scores = (parse_scores,) if session.version >= PROTOCOL_V2 else (parse_struct, SCORE_V1)
+        length = BOARD_LENGTH_V2 if session.version >= PROTOCOL_V2 else BOARD_LENGTH_V1
+        next_pick = time.time()
+        while next_pick < deadline:
+            if rate:
+                await asyncio.sleep(next_pick - time.time())
+                next_pick = max(next_pick + 1 / rate, time.time())
+            else:
+                next_pick = time.time()
+            sent = time.perf_counter()
+            writer.write(pack_pick(rng.randrange(n), rng.randrange(n), session))
+            await frames.read(*scores)
+            await frames.read(parse_sized, length)
+            result.latency.add(time.perf_counter() - sent)
+            result.picks += 1
+    except (OSError, asyncio.IncompleteReadError, ValueError):  # ValueError: refused HELLO or a bad frame
+        result.errors += 1
+    finally:
+        writer.close()
+
+
+def load_chunk(host: str, port: int, connections: int, n: int, rate: float, version: int, start: float,
+               seconds: float, connect_concurrency: int, seed: str, loop: str = DEFAULT_LOOP) -> LoadResult:
+    """
+    Runs a share of the bots in one event loop. Runs inside the worker processes of run_load().
+    :param seed: Seed for this chunk's picks
+    :return: Result for the chunk's bots
+    """
+    async def run_bots() -> LoadResult:
+        result = LoadResult()
+        connecting = asyncio.Semaphore(connect_concurrency)
+        rng = random.Random(seed)
+        await asyncio.gather(*(bot(host, port, n, rate, version, start, start + seconds, connecting, result,
+                                   random.Random(rng.random())) for _ in range(connections)))
+        result.seconds = seconds
+        return result
+    return run_with_loop(run_bots(), loop)
+
+
+def run_load(connections: int = DEFAULT_CONNECTIONS, n: int = 10, rate: float = 0.0, seconds: float = 10.0,
+             host: str = '127.0.0.1', port: int = PORT, version: int = PROTOCOL_V1, processes: int = 1,
+             connect_concurrency: int = DEFAULT_CONNECT_CONCURRENCY, seed: int = 0,
+             loop: str = DEFAULT_LOOP) -> LoadResult:
+    """
+    Puts load on a running server: spreads the bots over worker processes, each with its own event loop, and merges
+    their results. Every bot starts picking as soon as it is seated and stops seconds after the start, so the
+    connection ramp is part of the run.
+    :param connections: Number of bots (connections), every two share a game on a two-seat server
+    :param n: Board size of the server
+    :param rate: Picks per second per bot, 0 for as fast as responses arrive
+    :param seconds: Length of the run
+    :param host: Server address
+    :param port: Server port
+    :param version: PROTOCOL_V1 or PROTOCOL_V2
+    :param processes: Worker processes running bots; 1 runs them in this process
+    :param connect_concurrency: Connection attempts in flight per process
+    :param seed: Base seed for the picks
+    :param loop: Event loop backend of the bots (see network_functions.LOOP_BACKENDS)
+    :raises ValueError: if connections, n, rate, seconds, version, processes or connect_concurrency are invalid
+    :return: Merged result
+    """
+    if connections < 1: raise ValueError("connections must be >= 1")
+    if version not in (PROTOCOL_V1, PROTOCOL_V2): raise ValueError("version must be 1 or 2")
+    if not 1 <= n <= (0xFFFF if version == PROTOCOL_V2 else 16): raise ValueError("n does not fit the protocol")
+    if rate < 0: raise ValueError("rate must be >= 0")
+    if seconds <= 0: raise ValueError("seconds must be > 0")
+    if processes < 1: raise ValueError("processes must be >= 1")
+    if connect_concurrency < 1: raise ValueError("connect_concurrency must be >= 1")
+
+    start = time.time()
+    shares = [connections // processes + (index < connections % processes) for index in range(processes)]
+    chunks = [(host, port, share, n, rate, version, start, seconds, connect_concurrency, f"{seed}-{index}", loop)
+              for index, share in enumerate(shares) if share]
+    total = LoadResult()
+    if processes == 1:
+        total.merge(load_chunk(*chunks[0]))
+        return total
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for future in as_completed([executor.submit(load_chunk, *chunk) for chunk in chunks]):
+            total.merge(future.result())
+    return total
+
+
+def start_server(n: int, t: int, timeout: float = 10.0) -> subprocess.Popen:
+    """
+    Starts the main.py next to this file locally (seeded, so runs are comparable), whatever the current directory,
+    and waits until it accepts connections on PORT.
+    :param n: Board size
+    :param t: Number of treasure types
+    :param timeout: Seconds to wait for the server
+    :raises TimeoutError: if the server does not start in time
+    :return: The server process, to terminate after the run
+    """
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'),
+                               str(n), str(t), '0'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            socket.create_connection(('127.0.0.1', PORT)).close()
+            time.sleep(0.2)  # let the server drop the probe's seat
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    raise TimeoutError("server did not start")
+
+
+def main() -> None:
+    """
+    Command line entry point, e.g.: python loadgen.py --connections 2000 --rate 5 --seconds 30 --start-server
+    Prints the results as JSON to stdout.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Bot load generator for the treasure hunt TCP server")
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS)
+    parser.add_argument('--rate', type=float, default=0.0, help="picks per second per bot, 0 for no limit")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--n', type=int, default=10, help="board size")
+    parser.add_argument('--t', type=int, default=4, help="number of treasure types (with --start-server)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--v2', action='store_true', help="speak protocol v2 (boards larger than 16x16)")
+    parser.add_argument('--processes', type=int, default=1, help="bot processes")
+    parser.add_argument('--connect-concurrency', type=int, default=DEFAULT_CONNECT_CONCURRENCY)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--loop', choices=LOOP_BACKENDS, default=DEFAULT_LOOP)
+    parser.add_argument('--start-server', action='store_true', help="run main.py [n] [t] locally for the run")
+    args = parser.parse_args()
+
+    server = start_server(args.n, args.t) if args.start_server else None
+    try:
+        result = run_load(args.connections, args.n, args.rate, args.seconds, args.host, args.port,
+                          PROTOCOL_V2 if args.v2 else PROTOCOL_V1, args.processes, args.connect_concurrency,
+                          args.seed, args.loop)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print(json.dumps(result.to_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
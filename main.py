@@ -1,200 +1,1170 @@
 import asyncio
+import multiprocessing
+import os
+import signal
+import socket
 import sys
-import zlib
-from asyncio import run, StreamWriter, StreamReader, start_server
-from struct import unpack
+import time
+from asyncio import StreamWriter, StreamReader, start_server
+from collections import Counter
+from collections.abc import Callable
+from functools import partial
+from struct import pack
 from Board import Board
 from Player import Player
+from board_snapshot import SNAPSHOT_SUFFIX, BoardSnapshot, snapshot_path
+from move_journal import MoveJournal, journal_path
+from server_log import log, start_logging
+from server_metrics import (
+    METRICS_PORT,
+    BOARD_LATENCY,
+    CONNECTED,
+    CONNECTIONS,
+    PICKS,
+    REJECTED,
+    SPECTATORS,
+    metrics_server,
+    track_registry,
+)
 from network_functions import (
     HOST,
     PORT,
-    FORMAT_MAP,
     OUT_OF_BOUNDS,
+    HELLO_MAGIC,
+    FEATURE_DELTA,
+    FEATURE_BITPACK,
+    FEATURE_REJOIN,
+    FEATURE_PUSH,
+    FEATURE_PIPELINE,
+    PIPELINE_ACK,
+    SPECTATOR_PORT,
+    SPECTATE,
+    NEWEST_GAME,
+    MESSAGE,
+    MSG_RESPONSE,
+    BOARD_FRAME,
+    FRAMED_FEATURES,
+    SERVER_FEATURES,
+    REJOIN_TOKEN,
+    RESYNC_VERSION,
+    KNOWN_VERSION,
+    PROTOCOL_V2,
+    PICK_V2,
+    STATUS_OK,
+    STATUS_OUT_OF_BOUNDS,
+    FRAME_FULL,
+    FRAME_DELTA,
+    FRAME_BITMAP,
+    DEFAULT_LOOP,
+    Session,
+    read_hello,
+    accept_hello,
+    read_rejoin,
+    read_picks,
+    pick_size,
+    build_board_frame,
+    build_bitmap,
+    pack_indices,
     is_empty_buffer,
     byte_segment_to_space,
     encode_and_write_data,
-    pack_and_write_data,
     score_into_byte,
+    pack_scores,
+    build_update,
+    loop_name,
+    pop_loop_arg,
+    run_with_loop,
 )
 
-# Global variables
-ACTIVE_PLAYERS: list[Player] = []
-PLAYER_NAMES: list[str] = []
-CLIENT_COUNTER: int = 0
-# Global queues (w/ asyncio)
-input_queue = asyncio.Queue()
-output_queue = asyncio.Queue()
+PLAYER_NAMES = ("One", "Two")  # seats of every game, in the order connections fill them
+MAX_PLAYERS = 255  # most seats a game can have: SCORES_V2 counts them in one byte
+REJOIN_GRACE = 30.0  # seconds an abandoned game waits for a player to rejoin (launcher mode)
+NEW_PLAYER = 0xFFFFFFFF  # game id of a handed-over connection that is a new player, not a rejoin
+SPECTATOR_SEAT = 0xFF  # seat of a handed-over connection that is a spectator
+# Backpressure defaults, overridden by the environment variables of the same name
+SEND_HIGH_WATER = 64 * 1024  # bytes waiting to be sent to a connection before writing to it waits
+SEND_TIMEOUT = 10.0  # seconds a connection may stay above its high-water mark before it is dropped
 
 
-async def board_at_play(board: Board, players: list[Player]) -> None:
+def board_frame(board: Board, known_version: int, session: Session | None = None) -> bytes:
+    """
+    Builds the board frame for a framed-mode client that has the board at known_version.
+    Sends only the tiles picked since then, unless the client has no usable board (RESYNC_VERSION)
+    or the delta would be larger than a full snapshot is likely to be.
+    Full boards are one bit per tile (FRAME_BITMAP) with FEATURE_BITPACK, otherwise compressed text (FRAME_FULL).
+    :param board: The game Board object
+    :param known_version: Board version the client reported
+    :param session: Protocol options of the client, defaults to none negotiated
+    :return: FRAME_DELTA, FRAME_BITMAP or FRAME_FULL board frame
     """
-    Board task that processes game moves from the input queue using asyncio
-    Waits in a loop for incoming requests from client handlers via (asyncio) queue
-    Prints board after each pick
-    Calculates and returns a 2 byte score for each player packed into a single int
-    Pass result back to queue and mask_board()  to hide treasure locations
+    session = session or Session()
+    version = board.version
+    if known_version <= version and version - known_version <= max(1, board.n * board.n // 32):
+        return build_board_frame(FRAME_DELTA, known_version, version, pack_indices(board.changes_since(known_version)))
+    if session.has(FEATURE_BITPACK):
+        return build_board_frame(FRAME_BITMAP, version, version, build_bitmap(board.n, board.picked_bytes()))
+    return build_board_frame(FRAME_FULL, version, version, session.compress(board.mask_bytes()))
+
+
+async def board_at_play(board: Board, players: list[Player], requests: asyncio.Queue, game_id: int = 0,
+                        broadcast: 'Broadcast | None' = None, snapshot: BoardSnapshot | None = None,
+                        journal: MoveJournal | None = None) -> None:
+    """
+    Board task that processes game moves for one game using asyncio
+    Waits in a loop for incoming requests from client handlers via the game's (asyncio) queue (see request_board)
+    Logs each pick; the full board is only rendered and logged at DEBUG level
+    Calculates and returns a 2 byte score for each player packed into a single int (v1 clients, first two seats only),
+    or the SCORES_V2 field with every seat's score for v2 clients (see pack_scores)
+    Resolves the request's future with the result and mask_bytes() to hide treasure locations (v1 clients),
+    or with a board frame for clients that negotiated delta or bitpack mode (see board_frame)
+    Every request carries a batch of picks (see request_picks), applied in order; the response holds the state after
+    the last one. A request without picks only returns the scores and board (full snapshot on connect)
+    A request that fails gets the exception through its future, and the task goes on serving the other requests
     Score format: bits 14-8 (first 7 bits) are player 1 score , bits 6-0 are player 2 score (last 7 bits)
+    An out-of-bounds pick is answered with OUT_OF_BOUNDS instead (v1), or with OUT_OF_BOUNDS set over the scores
+    for a pipelined batch, so the scores after the batch's valid picks still reach the client
     :param board: The game Board object
-    :param players: List of all active Players objects
+    :param players: List of the game's active Players objects
+    :param requests: Queue of requests for this board, None stops the task
+    :param game_id: Id of the game, for the log
+    :param broadcast: Pushes every change to the game's subscribers (see Broadcast)
+    :param snapshot: Mirrors every pick into the game's snapshot file before it is answered (see BoardSnapshot)
+    :param journal: Server's move journal, every pick is appended to it (see MoveJournal)
     :return: None
     """
-    print(board)
-    try:
-        while True:
-            request = await input_queue.get()
-            if request is None:
-                break
+    log.debug("board game=%d version=%d\n%s", game_id, board.version, board)
+    while True:
+        request = await requests.get()
+        if request is None:
+            break
 
-            client_id, row, col, player = request
+        response, picks, player, session, known_version = request
+        try:
+            in_bounds = [(row, col) for row, col in picks if row < board.n and col < board.n]
+            out_of_bounds = len(in_bounds) < len(picks)
+            base = board.version
+            if in_bounds:
+                values = board.pick_many(in_bounds)
+                player.add_score(sum(values))
+                PICKS.inc(len(in_bounds))
+                for (row, col), picked in zip(in_bounds, values):
+                    log.debug("pick game=%d player=%s row=%d col=%d value=%d", game_id, player.name, row, col, picked)
+                if snapshot is not None:
+                    snapshot.record(board, base, players.index(player))
+                if journal is not None:
+                    journal.record(game_id, players.index(player), in_bounds, values)
 
-            if row >= board.n or col >= board.n:
+            if session.version >= PROTOCOL_V2:
+                scores = [seat.get_score() for seat in players]
+                result = pack_scores(STATUS_OUT_OF_BOUNDS if out_of_bounds else STATUS_OK, scores)
+            elif out_of_bounds and not session.has(FEATURE_PIPELINE):
                 result = OUT_OF_BOUNDS
             else:
-                picked = board.pick(row, col)
-                player.add_score(picked)
-
                 # Safely get scores even if some slots are None
                 player1_score = players[0].get_score() if len(players) > 0 and players[0] is not None else 0
                 player2_score = players[1].get_score() if len(players) > 1 and players[1] is not None else 0
 
                 result = (score_into_byte(player1_score) << 7) | score_into_byte(player2_score)
+                if out_of_bounds:
+                    # A pipelined batch keeps the scores of its valid picks: the marker bits are set over them
+                    result |= OUT_OF_BOUNDS
 
-            await output_queue.put((client_id, result, board.mask_board()))
-            print(board)
-    except Exception as e:
-        print(e)
+            if session.has(FRAMED_FEATURES):
+                payload = board_frame(board, known_version, session)
+            else:
+                payload = board.mask_bytes()
+            # The handler may be gone (client disconnected while waiting)
+            if not response.done():
+                response.set_result((result, payload))
+            if broadcast is not None and board.version != base:
+                broadcast.publish(base)
+            log.debug("board game=%d version=%d\n%s", game_id, board.version, board)
+        except Exception as e:
+            # Only this request fails: its client gets the error, and the game goes on serving the others
+            log.exception("board request failed game=%d player=%s", game_id, player.name)
+            if not response.done():
+                response.set_exception(e)
+
+
+async def request_picks(requests: asyncio.Queue, picks: list[tuple[int, int]], player: Player, session: Session,
+                        known_version: int = RESYNC_VERSION) -> tuple[int | bytes, bytes]:
+    """
+    Queues a batch of picks for the board task and waits for its answer, which comes back through a future owned by
+    this request only, so no other client handler ever sees it.
+    The board task applies the whole batch in order before it serves any other request.
+    :param requests: Request queue of the game's board task
+    :param picks: (row, col) of every pick, empty to only get the scores and board
+    :param player: Player making the picks
+    :param session: Protocol options negotiated with the client
+    :param known_version: Board version the client has (delta mode)
+    :return: (score field: v1 int or v2 bytes, board payload) after the last pick
+    """
+    started = time.perf_counter()
+    response = asyncio.get_running_loop().create_future()
+    await requests.put((response, picks, player, session, known_version))
+    result = await response
+    BOARD_LATENCY.observe(time.perf_counter() - started)
+    return result
+
+
+async def request_board(requests: asyncio.Queue, row: int | None, col: int | None, player: Player,
+                        session: Session, known_version: int = RESYNC_VERSION) -> tuple[int | bytes, bytes]:
+    """
+    Requests a single pick (see request_picks).
+    :param requests: Request queue of the game's board task
+    :param row: Row to pick, None to only get the scores and board
+    :param col: Column to pick
+    :param player: Player making the pick
+    :param session: Protocol options negotiated with the client
+    :param known_version: Board version the client has (delta mode)
+    :return: (score field: v1 int or v2 bytes, board payload)
+    """
+    return await request_picks(requests, [] if row is None else [(row, col)], player, session, known_version)
+
+
+class Backpressure:
+    """
+    Limits what a slow or stalled client can cost the server. Every connection's send buffer is bounded by a
+    high-water mark: above it, writing to that connection waits (and a waiting client handler stops reading picks).
+    Pushed updates that are superseded while a connection waits are dropped (see Broadcast). A connection that stays
+    above its high-water mark for longer than the timeout is disconnected.
+    counters records how often each policy fires: 'waited' (a write had to wait for the client), 'superseded'
+    (updates dropped for a newer one) and 'disconnected' (clients dropped for being too slow).
+    """
+
+    def __init__(self, high_water: int = SEND_HIGH_WATER, timeout: float = SEND_TIMEOUT) -> None:
+        """
+        :param high_water: Send buffer high-water mark of every connection, in bytes
+        :param timeout: Seconds a connection may take to drain below its high-water mark
+        :raises ValueError: if high_water is negative or timeout is not positive
+        """
+        if high_water < 0: raise ValueError("high_water must be >= 0")
+        if timeout <= 0: raise ValueError("timeout must be > 0")
+        self.high_water = high_water
+        self.timeout = timeout
+        self.counters = Counter()
+
+    @classmethod
+    def from_env(cls) -> 'Backpressure':
+        """
+        :return: Backpressure configured from the SEND_HIGH_WATER (bytes) and SEND_TIMEOUT (seconds) environment
+            variables, with the module defaults for any that are not set
+        """
+        return cls(int(os.getenv('SEND_HIGH_WATER', SEND_HIGH_WATER)), float(os.getenv('SEND_TIMEOUT', SEND_TIMEOUT)))
+
+    def limit(self, writer: StreamWriter) -> None:
+        """
+        Applies the high-water mark to a new connection.
+        :param writer: asyncio StreamWriter of the connection
+        :return: None
+        """
+        writer.transport.set_write_buffer_limits(high=self.high_water)
+
+    async def drain(self, writer: StreamWriter) -> None:
+        """
+        writer.drain(), bounded by the timeout.
+        :param writer: asyncio StreamWriter of the connection
+        :return: None
+        :raises ConnectionError: if the client did not drain in time; the connection is aborted
+        """
+        if writer.transport.get_write_buffer_size() <= self.high_water:
+            await writer.drain()
+            return
+        self.counters['waited'] += 1
+        try:
+            await asyncio.wait_for(writer.drain(), self.timeout)
+        except TimeoutError:
+            self.counters['disconnected'] += 1
+            log.warning("slow client dropped peer=%s buffered=%d", writer.get_extra_info('peername'),
+                        writer.transport.get_write_buffer_size())
+            writer.transport.abort()
+            raise ConnectionError("client too slow, disconnected")
+
+
+class Broadcast:
+    """
+    Pushes every board change of one game to its subscribers: players that negotiated FEATURE_PUSH and spectators.
+    Each change is encoded once (build_update with a FRAME_DELTA since the previous change) and the same bytes are
+    written to every subscriber. Every subscriber has its own writer task, so a slow connection never holds up the
+    others: when more changes arrive while it is still draining, it only gets the latest state afterwards, as a
+    FRAME_BITMAP snapshot that is also encoded once per version for every subscriber that needs it.
+    """
+
+    def __init__(self, board: Board, seats: list[Player], backpressure: Backpressure | None = None) -> None:
+        """
+        :param board: The game's Board
+        :param seats: The game's players by seat, for the scores
+        :param backpressure: Send limits and counters of the server
+        """
+        self.board = board
+        self.seats = seats
+        self.backpressure = backpressure or Backpressure()
+        self.published = 0  # changes published so far
+        self.subscribers: dict[StreamWriter, tuple[Session, asyncio.Event, asyncio.Task]] = {}
+        self.latest: tuple[int, int, bytes] | None = None  # (base version, version, update) of the last change
+        self.snapshot: tuple[int, bytes] | None = None  # (version, update) of the last snapshot built
+
+    def publish(self, base: int) -> None:
+        """
+        Encodes the change from base to the board's current version and wakes every subscriber.
+        Does nothing without subscribers.
+        :param base: Board version before the change
+        :return: None
+        """
+        if not self.subscribers:
+            return
+        version = self.board.version
+        frame = build_board_frame(FRAME_DELTA, base, version, pack_indices(self.board.changes_since(base)))
+        self.latest = (base, version, build_update(self.scores(), frame))
+        self.published += 1
+        for _, wake, _ in self.subscribers.values():
+            wake.set()
+
+    def scores(self) -> list[int]:
+        """
+        :return: Score of each seat, in seat order
+        """
+        return [seat.get_score() for seat in self.seats]
+
+    def update_for(self, known_version: int) -> bytes:
+        """
+        :param known_version: Newest board version the subscriber was sent, -1 for none
+        :return: The latest change if it starts at known_version, otherwise a snapshot of the current board
+        """
+        version = self.board.version
+        if self.latest is not None and self.latest[:2] == (known_version, version):
+            return self.latest[2]
+        if self.snapshot is None or self.snapshot[0] != version:
+            bitmap = build_bitmap(self.board.n, self.board.picked_bytes())
+            frame = build_board_frame(FRAME_BITMAP, version, version, bitmap)
+            self.snapshot = (version, build_update(self.scores(), frame))
+        return self.snapshot[1]
+
+    def subscribe(self, writer: StreamWriter, session: Session) -> None:
+        """
+        Starts pushing changes to a connection, beginning with the current board unless it already has it.
+        :param writer: asyncio StreamWriter of the connection
+        :param session: Protocol options of the connection; session.board_version tracks what it was sent
+        :return: None
+        """
+        wake = asyncio.Event()
+        wake.set()
+        task = asyncio.create_task(self._push(writer, session, wake))
+        self.subscribers[writer] = (session, wake, task)
+
+    def unsubscribe(self, writer: StreamWriter) -> None:
+        """
+        Stops pushing changes to a connection.
+        :param writer: asyncio StreamWriter given to subscribe
+        :return: None
+        """
+        subscriber = self.subscribers.pop(writer, None)
+        if subscriber is not None:
+            subscriber[2].cancel()
+
+    def close(self) -> None:
+        """
+        Stops every subscriber's writer task and closes the spectators' connections (players close their own).
+        :return: None
+        """
+        for writer in list(self.subscribers):
+            self.unsubscribe(writer)
+            writer.close()
+
+    async def _push(self, writer: StreamWriter, session: Session, wake: asyncio.Event) -> None:
+        seen = self.published
+        try:
+            while True:
+                await wake.wait()
+                wake.clear()
+                if self.published - seen > 1:
+                    self.backpressure.counters['superseded'] += self.published - seen - 1
+                seen = self.published
+                if session.board_version >= self.board.version:
+                    continue
+                update = self.update_for(session.board_version)
+                session.board_version = self.board.version
+                writer.write(update)
+                await self.backpressure.drain(writer)
+        except ConnectionError:
+            self.subscribers.pop(writer, None)
+
+
+class Game:
+    """
+    One game room: a board with its own board task, request queue and players.
+    Seats are handed out in PLAYER_NAMES order and never reused, so a game stops taking players once every seat has
+    been taken, even if some of them have left since. A player who left can take their own seat back (rejoin).
+    Scores are reported in seat order, whoever is connected.
+    """
+
+    def __init__(self, game_id: int, board: Board, player_names: tuple[str, ...] = PLAYER_NAMES,
+                 backpressure: Backpressure | None = None, snapshot: BoardSnapshot | None = None,
+                 journal: MoveJournal | None = None) -> None:
+        """
+        Starts the board task, so this must be called from inside the running event loop.
+        :param game_id: Unique id of the game in its registry
+        :param board: The game's Board
+        :param player_names: Seat names
+        :param backpressure: Send limits and counters of the server
+        :param snapshot: Snapshot file the game is mirrored into, None for none
+        :param journal: Move journal the game's picks are appended to, None for none
+        :raises ValueError: if there are no seat names
+        """
+        if len(player_names) == 0: raise ValueError("No player names available to assign")
+        self.id = game_id
+        self.board = board
+        self.player_names = player_names
+        self.players: list[Player] = []  # connected players
+        self.seats: list[Player] = []  # every player that joined, by seat
+        self.requests = asyncio.Queue()
+        self.backpressure = backpressure or Backpressure()
+        self.broadcast = Broadcast(board, self.seats, self.backpressure)
+        self.snapshot = snapshot
+        self.task = asyncio.create_task(board_at_play(board, self.seats, self.requests, game_id, self.broadcast,
+                                                      snapshot, journal))
+
+    @property
+    def open(self) -> bool:
+        """
+        :return: True while the game has a seat nobody has taken yet
+        """
+        return len(self.seats) < len(self.player_names)
+
+    def join(self) -> Player:
+        """
+        Seats a new player.
+        :return: The new Player
+        :raises ValueError: if every seat has been taken
+        """
+        if not self.open: raise ValueError("Game is full")
+        player = Player(self.player_names[len(self.seats)])
+        self.seats.append(player)
+        self.players.append(player)
+        if self.snapshot is not None:
+            self.snapshot.set_seats(len(self.seats))
+        return player
+
+    def rejoin(self, seat: int) -> Player:
+        """
+        Gives a seat back to the player who held it, score included.
+        :param seat: Seat number (index into PLAYER_NAMES)
+        :return: The seat's Player
+        :raises ValueError: if the seat was never taken or its player is still connected
+        """
+        if seat >= len(self.seats): raise ValueError("Unknown seat")
+        player = self.seats[seat]
+        if player in self.players: raise ValueError("Seat is taken")
+        self.players.append(player)
+        return player
+
+    async def close(self) -> None:
+        """
+        Stops the board task once it has answered every queued request, then disconnects the spectators.
+        The game is over, so its snapshot file is deleted.
+        :return: None
+        """
+        await self.requests.put(None)
+        await self.task
+        self.broadcast.close()
+        if self.snapshot is not None:
+            self.snapshot.close(remove=True)
+
+
+class GameRegistry:
+    """
+    Pairs incoming connections into game rooms: each connection takes the next seat of the newest open game, or
+    starts a new game when there is none. A game is closed and forgotten as soon as its last player leaves, or
+    rejoin_grace seconds later if nobody has rejoined by then.
+    In launcher mode every worker process has its own registry; game ids are worker + k * workers, so the worker
+    that owns any game can be told from its id (see owner). The workers also share a lobby: the index of a worker
+    with a game waiting for players, so new players who land on different workers still get paired (see match_worker).
+    """
+
+    def __init__(self, board_factory: Callable[[int], Board], player_names: tuple[str, ...] = PLAYER_NAMES,
+                 max_games: int | None = None, worker: int = 0, workers: int = 1, rejoin_grace: float = 0.0,
+                 lobby=None, backpressure: Backpressure | None = None, snapshot_dir: str | None = None,
+                 journal: MoveJournal | None = None) -> None:
+        """
+        :param board_factory: Creates the board for a new game from the game id
+        :param player_names: Seat names of every game
+        :param max_games: Most games running at once, None for no limit
+        :param worker: Index of this worker process
+        :param workers: Number of worker processes
+        :param rejoin_grace: Seconds an abandoned game is kept for rejoining players, 0 disables rejoining (except
+            into restored games, see restore)
+        :param lobby: multiprocessing.Value('i') shared by all workers: worker with a waiting game, or -1
+        :param backpressure: Send limits and counters shared by every game
+        :param snapshot_dir: Directory every game is mirrored into (see BoardSnapshot), None for none
+        :param journal: Move journal every game and pick is appended to, None for none
+        """
+        self.board_factory = board_factory
+        self.player_names = player_names
+        self.max_games = max_games
+        self.worker = worker
+        self.workers = workers
+        self.rejoin_grace = rejoin_grace
+        self.lobby = lobby
+        self.backpressure = backpressure or Backpressure()
+        self.snapshot_dir = snapshot_dir
+        self.journal = journal
+        # With snapshots, clients get rejoin tokens so that they can take their seats back after a restart
+        self.features = SERVER_FEATURES | FEATURE_REJOIN if rejoin_grace or snapshot_dir else SERVER_FEATURES
+        self.games: dict[int, Game] = {}
+        self.restored: set[Game] = set()  # restored games still open for rejoining (see restore)
+        self.open_game: Game | None = None
+        self.next_id = worker
+        self.closing: set[asyncio.Task] = set()
+        self.stopping = False  # set when the server stops: its games are kept for a restarted server (see leave)
+
+    def owner(self, game_id: int) -> int:
+        """
+        :param game_id: Id of a game on any worker
+        :return: Index of the worker process that owns the game
+        """
+        return game_id % self.workers
+
+    def match_worker(self) -> int:
+        """
+        Picks the worker a new player should join: this one if it has a game waiting for players or no other worker
+        has, otherwise the worker in the lobby. Best effort: the lobby may change before the player arrives there, in
+        which case that worker just seats the player itself.
+        :return: Worker index
+        """
+        if self.lobby is None or (self.open_game is not None and self.open_game.open):
+            return self.worker
+        waiting = self.lobby.value
+        return self.worker if waiting < 0 else waiting
+
+    def _update_lobby(self) -> None:
+        if self.lobby is None:
+            return
+        with self.lobby.get_lock():
+            if self.open_game is not None and self.open_game.open:
+                if self.lobby.value < 0:
+                    self.lobby.value = self.worker
+            elif self.lobby.value == self.worker:
+                self.lobby.value = -1
+
+    @property
+    def accepts_rejoin(self) -> bool:
+        """
+        :return: True if a new connection may be rejoining a game, so it is given the chance to send REJOIN first
+        """
+        return bool(self.rejoin_grace or self.restored)
+
+    @property
+    def full(self) -> bool:
+        """
+        :return: True if a new connection can neither join an open game nor start one
+        """
+        no_open_game = self.open_game is None or not self.open_game.open
+        return no_open_game and self.max_games is not None and len(self.games) >= self.max_games
+
+    def join(self) -> tuple[Game, Player]:
+        """
+        Seats a new connection.
+        :return: (the Game joined, the new Player)
+        :raises ValueError: if the registry is full
+        """
+        if self.full: raise ValueError("Server is full")
+        game = self.open_game
+        if game is None or not game.open:
+            board = self.board_factory(self.next_id)
+            snapshot = None
+            if self.snapshot_dir is not None:
+                snapshot = BoardSnapshot.create(snapshot_path(self.snapshot_dir, self.next_id), board, self.next_id)
+            if self.journal is not None:
+                self.journal.start_game(self.next_id, board)
+            game = Game(self.next_id, board, self.player_names, self.backpressure, snapshot, self.journal)
+            self.games[game.id] = game
+            self.open_game = game
+            self.next_id += self.workers
+        player = game.join()
+        self._update_lobby()
+        return game, player
+
+    def restore(self, grace: float = REJOIN_GRACE) -> int:
+        """
+        Resumes the games of this worker from the snapshot directory, after a crash or restart. Every restored game
+        keeps its board and its seats' scores; its players can take their seats back (see rejoin) for grace seconds,
+        after which a game nobody came back to is closed. New players are never seated in a restored game, even one
+        that still had a free seat: they start new games. Unreadable snapshot files are skipped, and so are games
+        with more seats taken than this server has (it was restarted with fewer --players); their files are kept.
+        New connections are only checked for REJOIN while a restored game is left (see accepts_rejoin), so without
+        rejoin_grace the games started after the restart are closed as soon as their players leave, as usual.
+        A restored game's picks go on in the move journal without a new game start, so replaying it covers the
+        picks from before the restart too.
+        :param grace: Seconds the restored games wait for their players
+        :return: Number of games restored
+        """
+        restored = []
+        for name in os.listdir(self.snapshot_dir):
+            if not name.endswith(SNAPSHOT_SUFFIX):
+                continue
+            try:
+                snapshot, game_id, board, scores = BoardSnapshot.restore(os.path.join(self.snapshot_dir, name))
+            except (OSError, ValueError) as e:
+                log.warning("snapshot skipped file=%s error=%r", name, e)
+                continue
+            if self.owner(game_id) != self.worker or game_id in self.games:
+                snapshot.close()
+                continue
+            if len(scores) > len(self.player_names):
+                log.warning("snapshot skipped file=%s seats=%d players=%d", name, len(scores), len(self.player_names))
+                snapshot.close()
+                continue
+            game = Game(game_id, board, self.player_names, self.backpressure, snapshot, self.journal)
+            for seat_name, score in zip(self.player_names, scores):
+                player = Player(seat_name)
+                player.add_score(score)
+                game.seats.append(player)
+            self.games[game_id] = game
+            self.next_id = max(self.next_id, game_id + self.workers)
+            restored.append(game)
+            log.info("restored game=%d version=%d seats=%d", game_id, board.version, len(game.seats))
+        loop = asyncio.get_running_loop()
+        for game in restored:
+            self.restored.add(game)
+            loop.call_later(grace, self._schedule_close, game)
+        return len(restored)
+
+    def spectate(self, game_id: int) -> Game:
+        """
+        :param game_id: Id of the game to watch, NEWEST_GAME for the newest game here
+        :return: The Game
+        :raises ValueError: if the game is not running here
+        """
+        if game_id == NEWEST_GAME and self.games: return self.games[max(self.games)]
+        if game_id not in self.games: raise ValueError("Unknown game")
+        return self.games[game_id]
+
+    def rejoin(self, game_id: int, seat: int) -> tuple[Game, Player]:
+        """
+        Gives a reconnecting client its old seat back.
+        :param game_id: Id of the game, from the client's REJOIN_TOKEN
+        :param seat: Seat number, from the same token
+        :return: (the Game, the seat's Player)
+        :raises ValueError: if the game is not running here or the seat cannot be taken back
+        """
+        game = self.games.get(game_id)
+        if game is None: raise ValueError("Unknown game")
+        return game, game.rejoin(seat)
+
+    async def leave(self, game: Game, player: Player) -> None:
+        """
+        Removes a player from its game, closing the game if nobody is left (after rejoin_grace, if set).
+        A stopping server closes no games, so their snapshot files are there for the next server to restore.
+        :param game: Game the player joined
+        :param player: Player that left
+        :return: None
+        """
+        if player in game.players:
+            game.players.remove(player)
+        if game.players or game.id not in self.games or self.stopping:
+            return
+        if not self.rejoin_grace:
+            await self.close_if_abandoned(game)
+            return
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.rejoin_grace, self._schedule_close, game)
+
+    def _schedule_close(self, game: Game) -> None:
+        task = asyncio.get_running_loop().create_task(self.close_if_abandoned(game))
+        self.closing.add(task)
+        task.add_done_callback(self.closing.discard)
+
+    async def close_if_abandoned(self, game: Game) -> None:
+        """
+        Closes and forgets a game that has no connected players.
+        :param game: Game to check
+        :return: None
+        """
+        if game.players or game.id not in self.games:
+            return
+        del self.games[game.id]
+        self.restored.discard(game)
+        if self.open_game is game:
+            self.open_game = None
+            self._update_lobby()
+        await game.close()
+
+
+class Handoff:
+    """
+    Passes client connections between worker processes in launcher mode, so a reconnecting client that the kernel
+    gave to the wrong worker ends up with the worker that owns its game.
+    Every worker reads from its own Unix datagram socket; the socket's file descriptor travels as SCM_RIGHTS
+    ancillary data, next to the REJOIN_TOKEN (game id, seat) already read from the client.
+    """
+
+    def __init__(self, worker: int, channels: list[tuple[socket.socket, socket.socket]]) -> None:
+        """
+        :param worker: Index of this worker process
+        :param channels: One (receive, send) Unix datagram socket pair per worker, created before forking
+        """
+        self.worker = worker
+        self.inbox = channels[worker][0]
+        self.outboxes = [send for _, send in channels]
+
+    def send(self, sock: socket.socket, owner: int, game_id: int, seat: int) -> None:
+        """
+        Sends a client connection to the worker that owns its game; the caller then closes its own copy.
+        :param sock: Client socket
+        :param owner: Index of the worker to send it to
+        :param game_id: Game the client is rejoining
+        :param seat: Seat the client is rejoining
+        :return: None
+        """
+        socket.send_fds(self.outboxes[owner], [REJOIN_TOKEN.pack(game_id, seat)], [sock.fileno()])
+
+    def listen(self, on_connection: Callable[[socket.socket, int, int], None]) -> None:
+        """
+        Calls on_connection(sock, game_id, seat) in the running event loop for every connection handed to this worker.
+        :param on_connection: Callback for each received connection
+        :return: None
+        """
+        self.inbox.setblocking(False)
+        asyncio.get_running_loop().add_reader(self.inbox, self._receive, on_connection)
+
+    def _receive(self, on_connection: Callable[[socket.socket, int, int], None]) -> None:
+        try:
+            data, fds, _, _ = socket.recv_fds(self.inbox, REJOIN_TOKEN.size, 1)
+        except BlockingIOError:
+            return
+        for fd in fds:
+            on_connection(socket.socket(fileno=fd), *REJOIN_TOKEN.unpack(data))
+
+
+def build_response(response: tuple[int | bytes, bytes], session: Session) -> list[bytes]:
+    """
+    Builds the board task's response to this client's request, as the parts of one message.
+    v1: score (2 bytes), compressed board length (2 bytes), compressed board data (N amount of bytes).
+    v2: score field (SCORES_V2 and a score per seat), compressed board length (4 bytes), compressed board data.
+    Delta/bitpack mode: score field, board frame (see board_frame).
+    Push mode: MSG_RESPONSE, then as delta/bitpack mode.
+    Pipelined mode: PIPELINE_ACK (after MSG_RESPONSE in push mode), then as above.
+    :param response: (score field, board payload) from request_board
+    :param session: Protocol options negotiated with the client; its board version and zlib stream are advanced
+    :return: The message, in parts
+    """
+    result, payload = response
+    wide = session.version >= PROTOCOL_V2
+    parts = []
+    if session.has(FEATURE_PUSH):
+        parts.append(MESSAGE.pack(MSG_RESPONSE))
+        session.board_version = max(session.board_version, BOARD_FRAME.unpack_from(payload)[2])
+    if session.has(FEATURE_PIPELINE):
+        parts.append(PIPELINE_ACK.pack(session.picks_answered))
+    parts.append(result if wide else pack('!H', result))
+
+    if session.has(FRAMED_FEATURES):
+        parts.append(payload)
+    else:
+        # compress board (w/zlib, or this connection's zlib stream) for sending
+        compressed_board = session.compress(payload)
+        parts.append(pack('!I' if wide else '!H', len(compressed_board)))
+        parts.append(compressed_board)
+    return parts
 
 
-async def client_handler(reader: StreamReader, writer: StreamWriter, client_id: int, player: Player,
-                         players: list[Player]) -> None:
+async def send_response(writer: StreamWriter, response: tuple[int | bytes, bytes], session: Session,
+                        backpressure: Backpressure | None = None) -> None:
+    """
+    Sends the board task's response to this client's request (see build_response) with one write and one drain.
+    :param writer: asyncio StreamWriter writes data to client
+    :param response: (score field, board payload) from request_board
+    :param session: Protocol options negotiated with the client
+    :param backpressure: Send limits; the client is disconnected if it does not drain in time
+    :return: None
+    :raises ConnectionError: if the client is disconnected for being too slow
+    """
+    # One writelines: the transport sends the response with one syscall (joined, or scatter/gather on Python 3.12+)
+    # rather than one per part, and a pushed update (see Broadcast) never lands inside it
+    writer.writelines(build_response(response, session))
+    await (backpressure or Backpressure()).drain(writer)
+
+
+async def client_handler(reader: StreamReader, writer: StreamWriter, game: Game, player: Player,
+                         features: int = SERVER_FEATURES) -> None:
     """
     Client handler coroutine that communicates with a single client using asyncio.
-    Receives move requests from client, puts them in the input queue for the board task.
-    Waits to get responses back from the board task via output queue.
-    After each move, sends to client: score (2 bytes), compressed board length (2 bytes), compressed board data (N amount of bytes).
-    Board string is sent and compressed using zlib.
+    Receives move requests from client, puts them in the request queue of the game's board task.
+    Waits for each response from the board task (see request_board) and sends it (see send_response).
+    If the client's first bytes are a HELLO, negotiates the protocol first. With PROTOCOL_V2 picks are PICK_V2 frames
+    (16-bit row and column) and responses carry every seat's score (see send_response). With FEATURE_DELTA or
+    FEATURE_BITPACK the client gets a full board snapshot straight away, and with FEATURE_DELTA every pick is followed
+    by the client's board version. With FEATURE_REJOIN the client is told its game id and seat (REJOIN_TOKEN). With
+    FEATURE_PUSH the client also gets every other board change (see Broadcast). With FEATURE_PIPELINE the client may
+    send picks without waiting: every pick received so far is applied as one batch (see read_picks) and answered with
+    one response.
     :param reader: asyncio StreamReader reads data from client
     :param writer: asyncio StreamWriter writes data to client
-    :param client_id: Unique ID assigned to this client connection
+    :param game: Game the client plays in
     :param player: Player object associated with this client
-    :param players: List of all active Player objects
+    :param features: Protocol features the server offers
     :return: None
     :raises: Exception if communication with client fails
     """
+    session = Session()
+    first_request = True
+    pending = bytearray()
+    peer = writer.get_extra_info('peername')
     try:
         while True:
-            data = await reader.readexactly(FORMAT_MAP['!B'])
+            if session.has(FEATURE_PIPELINE):
+                picks, known_version = await read_picks(reader, session, pending)
+                if not picks:
+                    log.info("disconnect game=%d peer=%s", game.id, peer)
+                    break
+                log.debug("recv game=%d peer=%s picks=%d", game.id, peer, len(picks))
+                response = await request_picks(game.requests, picks, player, session, known_version)
+                session.picks_answered += len(picks)
+                await send_response(writer, response, session, game.backpressure)
+                continue
+
+            data = await reader.readexactly(pick_size(session))
             if is_empty_buffer(data):
-                print("Client disconnected, closing socket.")
+                log.info("disconnect game=%d peer=%s", game.id, peer)
                 writer.close()
                 await writer.wait_closed()
-                players.remove(player)
                 break
 
-            unpacked = unpack("!B", data)[0]
-            row, col = byte_segment_to_space(unpacked)
-
-            # Print out ip and data, raw and unpacked
-            print(f"{writer.get_extra_info('peername')} {data.hex()} {unpacked} {row} {col}")
+            if first_request and data == HELLO_MAGIC[:1]:
+                first_request = False
+                requested = await read_hello(reader, data)
+                if requested is not None:
+                    session = await accept_hello(writer, requested, features)
+                    if session.has(FEATURE_REJOIN):
+                        writer.write(REJOIN_TOKEN.pack(game.id, game.seats.index(player)))
+                    if session.has(FRAMED_FEATURES):
+                        response = await request_board(game.requests, None, None, player, session)
+                        await send_response(writer, response, session, game.backpressure)
+                    if session.has(FEATURE_PUSH):
+                        game.broadcast.subscribe(writer, session)
+                    continue
+            first_request = False
 
-            await input_queue.put((client_id, row, col, player))
+            known_version = RESYNC_VERSION
+            if session.has(FEATURE_DELTA):
+                known_version = KNOWN_VERSION.unpack_from(data, len(data) - KNOWN_VERSION.size)[0]
 
-            while True:
-                response_id, result, board_str = await output_queue.get()
-                if response_id == client_id:
-                    await pack_and_write_data(writer, '!H', result)
-
-                    board_bytes = board_str.encode()
-                    # compress board (w/zlib) for sending
-                    compressed_board = zlib.compress(board_bytes)
+            if session.version >= PROTOCOL_V2:
+                row, col = PICK_V2.unpack_from(data)
+            else:
+                row, col = byte_segment_to_space(data[0])
 
-                    await pack_and_write_data(writer, '!H', len(compressed_board))
+            log.debug("recv game=%d peer=%s data=%s row=%d col=%d", game.id, peer, data.hex(), row, col)
 
-                    writer.write(compressed_board)
-                    await writer.drain()
-                    break
-                else:
-                    # Put it back for the correct client
-                    await output_queue.put((response_id, result, board_str))
+            response = await request_board(game.requests, row, col, player, session, known_version)
+            await send_response(writer, response, session, game.backpressure)
+    except asyncio.IncompleteReadError:
+        log.info("disconnect game=%d peer=%s", game.id, peer)
     except Exception as e:
-        print(f"Error in client_handler: {e}")
-        if player in players:
-            players.remove(player)
+        log.warning("client error game=%d peer=%s error=%r", game.id, peer, e)
+    finally:
+        game.broadcast.unsubscribe(writer)
 
 
-def game_args_for_board() -> Board:
+def game_args_for_board(game_id: int = 0) -> Board:
     """
     Parses command line arguments to create a Board object.
-    Expects: python main.py [n] [t]
-    Where n is board size (n x n grid) and t is the number of treasure types.
+    Expects: python main.py [n] [t] [seed]
+    Where n is board size (n x n grid), t is the number of treasure types
+    and seed (optional) makes the treasure layout reproducible; game N uses seed + N.
 
+    :param game_id: Id of the game the board is for
     :return: Board object initialized with command line arguments or defaults
     """
-    if len(sys.argv) >= 3: return Board(int(sys.argv[1]), sys.argv[2])
+    if len(sys.argv) >= 4: return Board(int(sys.argv[1]), sys.argv[2], seed=int(sys.argv[3]) + game_id)
+    if len(sys.argv) == 3: return Board(int(sys.argv[1]), sys.argv[2])
     if len(sys.argv) == 2: return Board(int(sys.argv[1]))
     return Board()
 
 
-async def game_server(reader: StreamReader, writer: StreamWriter) -> None:
+async def game_server(reader: StreamReader, writer: StreamWriter, registry: GameRegistry,
+                      handoff: Handoff | None = None, rejoin: tuple[int, int] | None = None,
+                      adopted: bool = False) -> None:
     """
     Connection handler coroutine for each client that connects to the server.
-    Assigns player names and creates client handler tasks.
-    Uses shared board task and asyncio queues for communication.
+    Seats the client in a game (see GameRegistry), sends its player name and runs its client handler.
+    When the registry allows rejoining, a client may first send REJOIN to take back its seat. In launcher mode a
+    client whose game belongs to another worker, or a new player while another worker has a game waiting for
+    players, is handed over to that worker (see Handoff).
     Rejects connections if server is full.
 
     :param reader: asyncio StreamReader for reading data from client
     :param writer: asyncio StreamWriter for writing data to client
+    :param registry: Games hosted by this server (worker)
+    :param handoff: Channels to the other workers, launcher mode only
+    :param rejoin: (game id, seat) already read from a connection handed over by another worker
+    :param adopted: True for a connection handed over by another worker, which is always served here
     :return: None
-    :raises: ValueError if player creation fails
-    :raises: ValueError if server is full (no more player names available)
     """
-    global CLIENT_COUNTER
-
-    if len(PLAYER_NAMES) == 0: raise ValueError("No player names available to assign")
-
     try:
-        # Check if server is full (max 2 players)
-        if len(ACTIVE_PLAYERS) >= len(PLAYER_NAMES):
-            print(f"Server full, rejecting connection from {writer.get_extra_info('peername')}")
+        if not adopted:
+            if registry.accepts_rejoin:
+                rejoin = await read_rejoin(reader)
+            owner = registry.match_worker() if rejoin is None else registry.owner(rejoin[0])
+            if owner != registry.worker:
+                log.info("handoff peer=%s worker=%d", writer.get_extra_info('peername'), owner)
+                handoff.send(writer.get_extra_info('socket'), owner, *(rejoin or (NEW_PLAYER, 0)))
+                return
+
+        if rejoin is None and registry.full:
+            log.warning("server full, rejecting peer=%s", writer.get_extra_info('peername'))
+            REJECTED.inc()
             await encode_and_write_data(writer, '!H', '')
             writer.close()
             await writer.wait_closed()
             return
 
-        client_id = CLIENT_COUNTER
-        CLIENT_COUNTER += 1
+        game, player = registry.join() if rejoin is None else registry.rejoin(*rejoin)
+        registry.backpressure.limit(writer)
+        CONNECTIONS.inc()
+        CONNECTED.inc()
+        try:
+            await encode_and_write_data(writer, '!H', player.name)
+            await client_handler(reader, writer, game, player, registry.features)
+        finally:
+            CONNECTED.dec()
+            await registry.leave(game, player)
+    except asyncio.CancelledError:
+        pass  # the server is stopping (see main)
+    except Exception as e:
+        log.warning("connection error peer=%s error=%r", writer.get_extra_info('peername'), e)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:  # the client reset the connection, e.g. while the server was stopping
+            pass
 
-        player = Player(PLAYER_NAMES[len(ACTIVE_PLAYERS)])
-        ACTIVE_PLAYERS.append(player)
 
-        await encode_and_write_data(writer, '!H', player.name)
-        await client_handler(reader, writer, client_id, player, ACTIVE_PLAYERS)
+async def spectator_server(reader: StreamReader, writer: StreamWriter, registry: GameRegistry,
+                           handoff: Handoff | None = None, game_id: int | None = None) -> None:
+    """
+    Connection handler coroutine for each spectator (SPECTATOR_PORT).
+    Reads SPECTATE and pushes every change of that game to the spectator (see Broadcast), starting with a snapshot,
+    until the spectator hangs up or the game closes. Spectators only receive; anything they send is ignored.
+    In launcher mode a spectator of a game that belongs to another worker is handed over to it.
+    :param reader: asyncio StreamReader for reading data from the spectator
+    :param writer: asyncio StreamWriter for writing data to the spectator
+    :param registry: Games hosted by this server (worker)
+    :param handoff: Channels to the other workers, launcher mode only
+    :param game_id: Game already read from a connection handed over by another worker
+    :return: None
+    """
+    peer = writer.get_extra_info('peername')
+    try:
+        if game_id is None:
+            game_id = SPECTATE.unpack(await reader.readexactly(SPECTATE.size))[0]
+            owner = registry.worker if game_id == NEWEST_GAME else registry.owner(game_id)
+            if owner != registry.worker:
+                log.info("handoff spectator peer=%s worker=%d", peer, owner)
+                handoff.send(writer.get_extra_info('socket'), owner, game_id, SPECTATOR_SEAT)
+                return
+        game = registry.spectate(game_id)
+        log.info("spectate game=%d peer=%s", game.id, peer)
+        registry.backpressure.limit(writer)
+        game.broadcast.subscribe(writer, Session())
+        SPECTATORS.inc()
+        try:
+            while await reader.read(1024):
+                pass
+        finally:
+            SPECTATORS.dec()
+            game.broadcast.unsubscribe(writer)
     except Exception as e:
-        print(f"Error in game_server: {e}")
+        log.warning("spectator error peer=%s error=%r", peer, e)
     finally:
         writer.close()
         await writer.wait_closed()
 
 
-async def main():
+async def adopt_connection(sock: socket.socket, game_id: int, seat: int, registry: GameRegistry) -> None:
+    """
+    Serves a client connection handed over by another worker.
+    :param sock: Client socket received through the Handoff
+    :param game_id: Game the client is rejoining or watching, NEW_PLAYER for a new player
+    :param seat: Seat the client is rejoining, SPECTATOR_SEAT for a spectator
+    :param registry: This worker's games
+    :return: None
+    """
+    reader, writer = await asyncio.open_connection(sock=sock)
+    if seat == SPECTATOR_SEAT:
+        await spectator_server(reader, writer, registry, game_id=game_id)
+        return
+    rejoin = None if game_id == NEW_PLAYER else (game_id, seat)
+    await game_server(reader, writer, registry, rejoin=rejoin, adopted=True)
+
+
+async def main(worker: int = 0, workers: int = 1, handoff: Handoff | None = None, lobby=None,
+               players: int = len(PLAYER_NAMES)):
     """
     Main function for the "refactored" game server, now using asyncio.
-    Initialize globals, creates the game board, starts the board task (replacing thread)  in the event loop,
-    and starts the server to accept client connections.
-    Server runs forever until interrupted.
+    Creates the game registry and starts the server to accept client connections; every game gets its own board
+    and board task (replacing thread) in the event loop.
+    Spectators connect to SPECTATOR_PORT (see spectator_server). Metrics are served over HTTP on METRICS_PORT, or
+    METRICS_PORT + worker in launcher mode (see server_metrics).
+    With SNAPSHOT_DIR set, every game is mirrored into a snapshot file there, games left by a crash or restart are
+    resumed on start, and their players can rejoin them for REJOIN_GRACE seconds (see GameRegistry.restore).
+    With JOURNAL_DIR set, every game and pick is appended to this worker's move journal there (see MoveJournal).
+    In launcher mode (handoff given) this is one worker: it shares PORT with the other workers (SO_REUSEPORT),
+    lets players rejoin for REJOIN_GRACE seconds, and serves connections handed over by the other workers.
+    Server runs until interrupted (Ctrl+C) or terminated (SIGTERM, e.g. docker stop); either way the move journal
+    is written out and fsynced before it exits.
+    :param worker: Index of this worker process
+    :param workers: Number of worker processes
+    :param handoff: Channels to the other workers, None for the single-process server
+    :param lobby: Lobby shared by the workers (see GameRegistry)
+    :param players: Seats per game; v1 clients only see the scores of the first two
     :return: None
     """
-    global ACTIVE_PLAYERS, PLAYER_NAMES, CLIENT_COUNTER
-    # Initialize global variables
-    PLAYER_NAMES = ["One", "Two"]
-    ACTIVE_PLAYERS = []
-    CLIENT_COUNTER = 0
+    snapshot_dir = os.getenv('SNAPSHOT_DIR') or None
+    journal_dir = os.getenv('JOURNAL_DIR') or None
+    journal = None
+    if journal_dir is not None:
+        os.makedirs(journal_dir, exist_ok=True)
+        journal = MoveJournal(journal_path(journal_dir, worker))
+    registry = GameRegistry(game_args_for_board, seat_names(players), worker=worker, workers=workers,
+                            rejoin_grace=REJOIN_GRACE if handoff else 0.0, lobby=lobby,
+                            backpressure=Backpressure.from_env(), snapshot_dir=snapshot_dir, journal=journal)
+    if snapshot_dir is not None:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        registry.restore()
+    if handoff is not None:
+        adopting = set()
+
+        def adopt(sock: socket.socket, game_id: int, seat: int) -> None:
+            task = asyncio.create_task(adopt_connection(sock, game_id, seat, registry))
+            adopting.add(task)
+            task.add_done_callback(adopting.discard)
 
-    board = game_args_for_board()
-    board_task = asyncio.create_task(board_at_play(board, ACTIVE_PLAYERS))
+        handoff.listen(adopt)
+
+    server = await start_server(partial(game_server, registry=registry, handoff=handoff), HOST, PORT,
+                                reuse_port=handoff is not None)
+    spectators = await start_server(partial(spectator_server, registry=registry, handoff=handoff), HOST,
+                                    SPECTATOR_PORT, reuse_port=handoff is not None)
+    track_registry(registry)
+    scrapes = await start_server(metrics_server, HOST, METRICS_PORT + worker)
+    log.info("serving port=%d spectator_port=%d metrics_port=%d worker=%d loop=%s", PORT, SPECTATOR_PORT,
+             METRICS_PORT + worker, worker, loop_name(asyncio.get_running_loop()))
+    writing = asyncio.create_task(journal.run()) if journal is not None else None
+    stop = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except NotImplementedError:  # no signal handlers on Windows event loops
+        pass
+    try:
+        await stop.wait()
+        log.info("stopping signal=SIGTERM worker=%d", worker)
+    finally:
+        # Not waiting for the open connections: they are cancelled when the loop ends, and their games are kept
+        registry.stopping = True
+        for listening in (server, spectators, scrapes):
+            listening.close()
+        if journal is not None:
+            writing.cancel()
+            journal.close()
 
-    server = await start_server(game_server, HOST, PORT)
-    await server.serve_forever()
+
+def seat_names(players: int) -> tuple[str, ...]:
+    """
+    :param players: Number of seats per game
+    :return: PLAYER_NAMES for two seats, otherwise "One", "Two", then "Player 3", "Player 4", ...
+    :raises ValueError: if players is not in 1..MAX_PLAYERS
+    """
+    if not 1 <= players <= MAX_PLAYERS: raise ValueError(f"players must be between 1 and {MAX_PLAYERS}")
+    return (PLAYER_NAMES + tuple(f"Player {seat + 1}" for seat in range(len(PLAYER_NAMES), players)))[:players]
+
+
+def pop_players_arg(argv: list[str]) -> int:
+    """
+    Removes "--players N" from the command line arguments, leaving [n] [t] [seed] for game_args_for_board.
+    :param argv: Command line arguments (changed in place)
+    :return: N, or len(PLAYER_NAMES) when the flag is not given
+    :raises ValueError: if N is missing or not in 1..MAX_PLAYERS
+    """
+    if '--players' not in argv: return len(PLAYER_NAMES)
+    index = argv.index('--players')
+    if index + 1 >= len(argv) or not argv[index + 1].isdigit() or not 1 <= int(argv[index + 1]) <= MAX_PLAYERS:
+        raise ValueError(f"--players needs a number of seats between 1 and {MAX_PLAYERS}")
+    players = int(argv[index + 1])
+    del argv[index:index + 2]
+    return players
+
+
+def pop_workers_arg(argv: list[str]) -> int:
+    """
+    Removes "--workers N" from the command line arguments, leaving [n] [t] [seed] for game_args_for_board.
+    :param argv: Command line arguments (changed in place)
+    :return: N, or 0 when the flag is not given (single-process server)
+    :raises ValueError: if N is missing or not a positive integer
+    """
+    if '--workers' not in argv: return 0
+    index = argv.index('--workers')
+    if index + 1 >= len(argv) or not argv[index + 1].isdigit() or int(argv[index + 1]) < 1:
+        raise ValueError("--workers needs a positive number of worker processes")
+    workers = int(argv[index + 1])
+    del argv[index:index + 2]
+    return workers
+
+
+def launch(workers: int, loop: str = DEFAULT_LOOP, players: int = len(PLAYER_NAMES)) -> None:
+    """
+    Launcher mode: python main.py --workers N [--loop NAME] [--players P] [n] [t] [seed]
+    Forks N worker processes, each with its own event loop and games, all listening on PORT with SO_REUSEPORT so
+    the kernel spreads new connections over them. A game only ever lives in the worker that created it; connections
+    that belong with another worker are handed over to it.
+    Waits for the workers and stops them when the launcher is interrupted (Ctrl+C) or terminated.
+    :param workers: Number of worker processes
+    :param loop: Event loop backend of every worker (see network_functions.LOOP_BACKENDS)
+    :param players: Seats per game
+    :return: None
+    """
+    channels = [socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM) for _ in range(workers)]
+    lobby = multiprocessing.Value('i', -1)
+    children = []
+    for worker in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            listener = start_logging()
+            try:
+                run_with_loop(main(worker, workers, Handoff(worker, channels), lobby, players), loop)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                listener.stop()
+                os._exit(0)
+        children.append(pid)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except (KeyboardInterrupt, SystemExit):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:  # already waited for
+                pass
+        for pid in children:  # the workers write out their journals first
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
 
 
-run(main())
+if __name__ == '__main__':
+    worker_count = pop_workers_arg(sys.argv)
+    loop_backend = pop_loop_arg(sys.argv)
+    player_count = pop_players_arg(sys.argv)
+    if worker_count:
+        launch(worker_count, loop_backend, player_count)
+    else:
+        log_listener = start_logging()
+        try:
+            run_with_loop(main(players=player_count), loop_backend)
+        finally:
+            log_listener.stop()
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import queue
+import sys
+import threading
+import time
+from array import array
+from struct import Struct
+from Board import Board, cell_typecode
+
+# time (ns since the epoch), game id, seat, row, col, value; little-endian, so journals can be replayed anywhere
+JOURNAL_RECORD = Struct('<qIIHHI')
+# Seat of the record that starts a game: row holds n, value holds t, and the board's tile values follow in the next
+# tile_records(n, t) records (little-endian, zero padded)
+GAME_START = 0xFFFFFFFF
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_INTERVAL = 1.0  # seconds between writes (and fsyncs) of the journal
+JOURNAL_BATCH = 256 * 1024  # bytes waiting to be written that trigger a write before the interval is up
+
+
+def journal_path(directory: str, worker: int = 0) -> str:
+    """
+    :param directory: Journal directory
+    :param worker: Index of the worker process writing the journal
+    :return: Path of the worker's journal file
+    """
+    return os.path.join(directory, f"worker-{worker}{JOURNAL_SUFFIX}")
+
+
+def tile_records(n: int, t: int) -> int:
+    """
+    :param n: Board size
+    :param t: Largest treasure value
+    :return: Number of records the tile values of a GAME_START record take
+    """
+    return -(-n * n * array(cell_typecode(t)).itemsize // JOURNAL_RECORD.size)
+
+
+class MoveJournal:
+    """
+    Append-only binary journal of every pick made on this server (worker), for settling disputes and replaying
+    games as regression workloads (see replay.py). Every pick is one fixed-width JOURNAL_RECORD; every new game
+    starts with a GAME_START record followed by its tile values, so a game can be rebuilt from the journal alone.
+    The board task only packs records into a buffer. The buffer is handed to a writer thread, which appends it to
+    the file and fsyncs it, every JOURNAL_INTERVAL seconds (see run) or as soon as JOURNAL_BATCH bytes are waiting,
+    so the game never waits on the disk. A crash loses at most the picks of the last interval.
+    """
+
+    def __init__(self, path: str, interval: float = JOURNAL_INTERVAL, batch: int = JOURNAL_BATCH) -> None:
+        """
+        Opens (or creates) the journal file for appending and starts the writer thread.
+        :param path: Path of the journal file
+        :param interval: Seconds between writes
+        :param batch: Bytes waiting that trigger an early write
+        :raises ValueError: if interval or batch is not positive
+        """
+        if interval <= 0 or batch <= 0: raise ValueError("interval and batch must be positive")
+        self.path = path
+        self.interval = interval
+        self.batch = batch
+        self._file = open(path, 'ab')
+        self._buffer = bytearray()
+        self._chunks = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_chunks, name='journal', daemon=True)
+        self._writer.start()
+
+    def start_game(self, game_id: int, board: Board) -> None:
+        """
+        Records the start of a game and its tile values.
+        :param game_id: Id of the game
+        :param board: The game's new Board
+        :return: None
+        """
+        tiles = array(cell_typecode(board.t), board.cells_bytes())
+        if sys.byteorder == 'big':
+            tiles.byteswap()
+        self._buffer += JOURNAL_RECORD.pack(time.time_ns(), game_id, GAME_START, board.n, 0, board.t)
+        self._buffer += tiles.tobytes().ljust(tile_records(board.n, board.t) * JOURNAL_RECORD.size, b'\0')
+        if len(self._buffer) >= self.batch:
+            self.write()
+
+    def record(self, game_id: int, seat: int, picks: list[tuple[int, int]], values) -> None:
+        """
+        Records a batch of picks made by one player, all stamped with the current time.
+        :param game_id: Id of the game
+        :param seat: Seat of the player who made the picks
+        :param picks: (row, col) of every pick, in order
+        :param values: Value each pick scored (see Board.pick_many)
+        :return: None
+        """
+        now = time.time_ns()
+        pack = JOURNAL_RECORD.pack
+        self._buffer += b''.join([pack(now, game_id, seat, row, col, value)
+                                  for (row, col), value in zip(picks, values)])
+        if len(self._buffer) >= self.batch:
+            self.write()
+
+    def write(self) -> None:
+        """
+        Hands the buffered records to the writer thread, without waiting for them to be written.
+        :return: None
+        """
+        if self._buffer:
+            self._chunks.put(self._buffer)
+            self._buffer = bytearray()
+
+    def _write_chunks(self) -> None:
+        while (chunk := self._chunks.get()) is not None:
+            self._file.write(chunk)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    async def run(self) -> None:
+        """
+        Hands the buffered records to the writer thread every interval seconds, until cancelled.
+        :return: None
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            self.write()
+
+    def close(self) -> None:
+        """
+        Writes the buffered records, waits until the writer thread has written everything, and closes the file.
+        :return: None
+        """
+        self.write()
+        self._chunks.put(None)
+        self._writer.join()
+        self._file.close()
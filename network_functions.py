@@ -1,15 +1,100 @@
-from asyncio import StreamReader, StreamWriter
+import asyncio
+import sys
+import zlib
+from array import array
+from asyncio import StreamReader, StreamWriter, wait_for, TimeoutError as AsyncTimeoutError
+from collections.abc import Callable, Coroutine
 from socket import socket
-from struct import unpack, pack
+from struct import unpack, unpack_from, pack, Struct
 
 HOST = ''  # IP address of server (StreamReader)
 PORT = 12345  # Port to listen on (StreamWriter)
 FORMAT_MAP = {
     '!H': 2,  # 2 bytes for unsigned short
     '!B': 1,  # 1 byte for unsigned char
+    '!I': 4,  # 4 bytes for unsigned int
 }
 OUT_OF_BOUNDS = 0b1100000000000000  # Bit 15 and 14 set constant to indicate out of bounds error
 
+# Handshake: a client that wants more than the original (v1) protocol sends HELLO right after it receives its name.
+# The first byte, 0xFF, is also the v1 pick for (15, 15), but a v1 client waits for a reply after every pick byte,
+# so if the rest of the magic does not follow within HELLO_TIMEOUT seconds the byte is treated as a v1 pick.
+HELLO_MAGIC = b'\xffTH'
+HELLO = Struct('!3sBB')  # magic, protocol version, feature flags (the server replies with the agreed ones)
+HELLO_TIMEOUT = 0.05
+PROTOCOL_V1 = 1
+PROTOCOL_V2 = 2  # wide frames: PICK_V2 picks, SCORES_V2 score vectors, '!I' board lengths (see below)
+FEATURE_DELTA = 0b00000001  # board frames carry only the tiles picked since the client's version
+FEATURE_BITPACK = 0b00000010  # full board frames carry one bit per tile instead of the zlib-compressed text
+FEATURE_ZSTREAM = 0b00000100  # compressed boards share one zlib stream per connection (see Session.compress)
+FEATURE_REJOIN = 0b00001000  # the server sends a REJOIN_TOKEN right after its HELLO reply (launcher mode only)
+FEATURE_PUSH = 0b00010000  # every server message starts with MESSAGE; other players' picks are pushed (MSG_UPDATE)
+FEATURE_PIPELINE = 0b00100000  # picks may be sent without waiting; responses start with PIPELINE_ACK
+SERVER_FEATURES = FEATURE_DELTA | FEATURE_BITPACK | FEATURE_ZSTREAM | FEATURE_PUSH | FEATURE_PIPELINE
+# with any of these, the reply after the score is a board frame
+FRAMED_FEATURES = FEATURE_DELTA | FEATURE_BITPACK | FEATURE_PUSH
+
+# Rejoin (launcher mode): a reconnecting client sends REJOIN as its very first bytes, before it gets its name, to take
+# back its seat. v1 clients never send anything before their name, so the server waits at most HELLO_TIMEOUT for it.
+REJOIN_MAGIC = b'\xfeTH'
+REJOIN = Struct('!3sIB')  # magic, game id, seat
+REJOIN_TOKEN = Struct('!IB')  # game id, seat
+
+# Protocol v2 (negotiated in HELLO): coordinates and scores no longer share a byte, so boards up to 65535 x 65535 and
+# games of up to 255 players work. A pick is PICK_V2 (followed by the client's board version in delta mode). Every
+# response starts with SCORES_V2 and one '!I' score per seat taken so far, in seat order; unframed boards are sent
+# after a '!I' length instead of '!H'.
+PICK_V2 = Struct('!HH')  # row, col
+SCORES_V2 = Struct('!BB')  # status, number of seats
+SCORE_V2 = Struct('!I')  # one seat's score
+SCORE_V1 = Struct('!H')  # both scores packed into one short (see score_into_byte)
+BOARD_LENGTH_V1 = Struct('!H')  # length of an unframed board
+BOARD_LENGTH_V2 = Struct('!I')
+STATUS_OK = 0
+STATUS_OUT_OF_BOUNDS = 1
+
+# Push (FEATURE_PUSH) and spectators: the server sends every board change to each player that negotiated push and to
+# every spectator. A spectator connects to SPECTATOR_PORT, sends SPECTATE and then only receives MSG_UPDATE messages.
+# An update is encoded once and the same bytes go to every connection: MESSAGE, the SCORES_V2 field (whatever the
+# protocol version), then a FRAME_DELTA since the previous update or, for connections that fell behind, a
+# FRAME_BITMAP snapshot of the latest board.
+SPECTATOR_PORT = PORT + 1
+SPECTATE = Struct('!I')  # game id to watch
+NEWEST_GAME = 0xFFFFFFFF  # spectate the newest game of the server (worker) the connection lands on
+MESSAGE = Struct('!B')  # message kind
+MSG_RESPONSE = 0  # the answer to the client's own request, as without push
+MSG_UPDATE = 1  # a pushed board change
+
+# Pipelining (FEATURE_PIPELINE): the client may send picks back to back without waiting for their responses. The server
+# takes every complete pick it has received so far (at most PIPELINE_MAX), applies them in order as one batch and
+# sends a single response with the state after the last one. Every response starts with PIPELINE_ACK (after MESSAGE in
+# push mode), the number of picks answered so far on the connection, so the client knows which of its picks it covers.
+# In delta mode the board version of the last pick in the batch is used. A v1 batch with an out-of-bounds pick is
+# answered with the OUT_OF_BOUNDS bits set over the scores after the batch (get_player_scores ignores them).
+PIPELINE_ACK = Struct('!I')  # picks answered so far on this connection
+PIPELINE_MAX = 1024  # most picks applied as one batch
+
+# Delta mode: each pick carries the board version the client has, the reply is a board frame after the score
+KNOWN_VERSION = Struct('!I')  # client's board version, after the row and col of a pick
+RESYNC_VERSION = 0xFFFFFFFF  # sent as the client version when it has no usable board: forces a full frame
+# Preset dictionary for FEATURE_ZSTREAM: runs of every masked tile pattern, so even the first board compresses well
+ZSTREAM_DICT = b'  ' * 64 + b'_ ' * 64 + b'\n' + b'_   ' * 32 + b'  _ ' * 32 + b'\n'
+BOARD_FRAME = Struct('!BIII')  # kind, base version, new version, payload length
+FRAME_FULL = 0  # payload is the zlib-compressed masked board
+FRAME_DELTA = 1  # payload is the row-major index (!I) of every tile picked since the base version
+FRAME_BITMAP = 2  # payload is BITMAP_HEADER, then one bit per tile (row-major, MSB first, 1 = picked)
+BITMAP_HEADER = Struct('!I')  # board size n
+BITMAP_TILES = bytes.maketrans(b'01', b'_ ')  # bitmap bit as a masked tile character
+
+# Buffered reading (FrameReader): initial buffer size of a connection; it grows to fit the largest message
+READ_BUFFER = 64 * 1024
+DIRECT_READ = 128 * 1024  # FrameReader: most bytes of a part read past the buffer with one readexactly
+
+# Event loop backends for main.py and client.py (--loop NAME). uvloop is optional: when it is not installed, every
+# backend falls back to the stdlib loop.
+LOOP_BACKENDS = ('asyncio', 'uvloop', 'auto')
+DEFAULT_LOOP = 'asyncio'
+
 
 def is_empty_buffer(byte: str | int | bytes) -> bool:
     """
@@ -61,10 +146,28 @@ def get_player_scores(byte: int) -> tuple[int, int]:
     return (byte & 0b11111110000000) >> 7, byte & 0b1111111
 
 
+def receive_into(sc: socket, view: memoryview) -> int:
+    """
+    Fills a buffer from a socket with recv_into, so the data is written in place instead of being joined from chunks.
+    Loops until the buffer is full or the connection is closed.
+
+    :param sc: Socket to receive from
+    :param view: Writable buffer to fill
+    :return: Number of bytes received: len(view), or fewer if the connection was closed
+    """
+    received = 0
+    while received < len(view):
+        count = sc.recv_into(view[received:])
+        if count == 0:
+            break
+        received += count
+    return received
+
+
 def receive(sc: socket, size: int) -> bytes:
     """
     Receive exactly 'size' bytes from a socket.
-    Loops until all bytes are received or connection is closed.
+    Loops until all bytes are received or connection is closed, reading into one preallocated buffer.
 
     :param sc: Socket to receive from
     :param size: Number of bytes to receive
@@ -73,13 +176,11 @@ def receive(sc: socket, size: int) -> bytes:
     """
     if size < 0: raise ValueError("size must be >= 0")
     if sc is None: raise ValueError("sc must be a socket")
-    data = b''
-    while len(data) < size:
-        curr_data = sc.recv(size - len(data))
-        if is_empty_buffer(curr_data):
-            return data
-        data += curr_data
-    return data
+    buffer = bytearray(size)
+    with memoryview(buffer) as view:
+        received = receive_into(sc, view)
+    del buffer[received:]
+    return bytes(buffer)
 
 
 async def receive_decoded_string(reader: StreamReader, flag: str) -> str:
@@ -167,7 +268,7 @@ async def pack_and_write_data(writer: StreamWriter, flag: str, data: int) -> Non
 async def encode_and_write_data(writer: StreamWriter, flag: str, string: str) -> None:
     """
     Encode and send a string with length prefix for efficiency.
-    First sends the length of the string, packed according to flag, then sends encoded string.
+    Sends the length of the string, packed according to flag, and the encoded string with one write.
     The length prefix allows the receiver to know exactly how many bytes to read, allowing for efficient buffering.
 
     :param writer: asyncio StreamWriter to write data
@@ -177,9 +278,650 @@ async def encode_and_write_data(writer: StreamWriter, flag: str, string: str) ->
     :raises ValueError: if encoding or writing fails
     """
     try:
-        length_data = pack(flag, len(string))
-        writer.write(length_data)
-        writer.write(string.encode())
+        encoded = string.encode()
+        writer.write(pack(flag, len(encoded)) + encoded)
         await writer.drain()
     except Exception as e:
         raise ValueError(f"Failed to write and send data: {e}")
+
+
+class Session:
+    """
+    Protocol options in use on one connection. Connections that never send HELLO keep the v1 defaults.
+    With FEATURE_ZSTREAM the connection also owns a zlib compressor/decompressor pair that lives as long as it does.
+    """
+
+    def __init__(self, version: int = PROTOCOL_V1, features: int = 0) -> None:
+        """
+        :param version: Agreed protocol version
+        :param features: Agreed feature flags (FEATURE_*)
+        """
+        self.version = version
+        self.features = features
+        self.board_version = -1  # newest board version sent on this connection (FEATURE_PUSH), -1 before any
+        self.picks_answered = 0  # picks answered on this connection (FEATURE_PIPELINE)
+        self._compressor = None
+        self._decompressor = None
+
+    def has(self, feature: int) -> bool:
+        """
+        :param feature: A FEATURE_* flag
+        :return: True if the feature was negotiated
+        """
+        return bool(self.features & feature)
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compresses one board for this connection.
+        Without FEATURE_ZSTREAM every board is compressed on its own (zlib.compress). With it, boards are chunks of
+        one zlib stream primed with ZSTREAM_DICT and ended with Z_SYNC_FLUSH. Each chunk can be decompressed as soon
+        as it arrives and back-references the boards before it, so it must be sent, in order, on this connection.
+        :param data: Uncompressed board bytes
+        :return: Compressed bytes
+        """
+        if not self.has(FEATURE_ZSTREAM):
+            return zlib.compress(data)
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(zdict=ZSTREAM_DICT)
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Reverses compress() on the other end of the connection; chunks must be passed in the order they arrive.
+        :param data: Compressed bytes
+        :return: Uncompressed board bytes
+        """
+        if not self.has(FEATURE_ZSTREAM):
+            return zlib.decompress(data)
+        if self._decompressor is None:
+            self._decompressor = zlib.decompressobj(zdict=ZSTREAM_DICT)
+        return self._decompressor.decompress(data)
+
+
+async def read_hello(reader: StreamReader, first: bytes) -> Session | None:
+    """
+    Server side of the handshake, called when the first byte from a client is HELLO_MAGIC[0].
+    Waits up to HELLO_TIMEOUT for the rest of the HELLO frame.
+    :param reader: asyncio StreamReader of the client
+    :param first: First byte already read from the client
+    :return: Session with the version and features the client asked for, or None if it is a v1 pick
+    :raises ValueError: if the bytes that follow are not a HELLO frame
+    """
+    try:
+        rest = await wait_for(reader.readexactly(HELLO.size - len(first)), HELLO_TIMEOUT)
+    except AsyncTimeoutError:
+        return None
+    magic, version, features = HELLO.unpack(first + rest)
+    if magic != HELLO_MAGIC: raise ValueError("invalid hello")
+    return Session(version, features)
+
+
+async def accept_hello(writer: StreamWriter, requested: Session, supported: int = SERVER_FEATURES) -> Session:
+    """
+    Replies to a HELLO with the agreed protocol version and the features both sides support.
+    :param writer: asyncio StreamWriter of the client
+    :param requested: Session read by read_hello
+    :param supported: Feature flags the server supports (the version is the lower of the client's and PROTOCOL_V2)
+    :return: The agreed Session
+    """
+    session = Session(min(requested.version, PROTOCOL_V2), requested.features & supported)
+    writer.write(HELLO.pack(HELLO_MAGIC, session.version, session.features))
+    await writer.drain()
+    return session
+
+
+async def send_hello(reader: StreamReader, writer: StreamWriter, features: int,
+                     version: int = PROTOCOL_V1) -> Session:
+    """
+    Client side of the handshake: sends HELLO and waits for the server's reply.
+    :param reader: asyncio StreamReader of the connection
+    :param writer: asyncio StreamWriter of the connection
+    :param features: Feature flags the client wants
+    :param version: Highest protocol version the client speaks
+    :return: The Session the server agreed to
+    :raises ValueError: if the server does not reply with a HELLO frame
+    """
+    writer.write(HELLO.pack(HELLO_MAGIC, version, features))
+    await writer.drain()
+    magic, version, features = HELLO.unpack(await reader.readexactly(HELLO.size))
+    if magic != HELLO_MAGIC: raise ValueError("server did not accept hello")
+    return Session(version, features)
+
+
+async def read_rejoin(reader: StreamReader) -> tuple[int, int] | None:
+    """
+    Server side of a rejoin, called before the new connection is given a seat.
+    Waits up to HELLO_TIMEOUT for a REJOIN frame.
+    :param reader: asyncio StreamReader of the client
+    :return: (game id, seat) to rejoin, or None for a new player
+    :raises ValueError: if the client sent something that is not a REJOIN frame
+    """
+    try:
+        frame = await wait_for(reader.readexactly(REJOIN.size), HELLO_TIMEOUT)
+    except AsyncTimeoutError:
+        return None
+    magic, game_id, seat = REJOIN.unpack(frame)
+    if magic != REJOIN_MAGIC: raise ValueError("invalid rejoin")
+    return game_id, seat
+
+
+async def send_rejoin(writer: StreamWriter, game_id: int, seat: int) -> None:
+    """
+    Client side of a rejoin: must be sent right after connecting, before reading the player name.
+    :param writer: asyncio StreamWriter of the connection
+    :param game_id: Game id from the REJOIN_TOKEN of the earlier connection
+    :param seat: Seat from the same token
+    :return: None
+    """
+    writer.write(REJOIN.pack(REJOIN_MAGIC, game_id, seat))
+    await writer.drain()
+
+
+def pack_pick(row: int, col: int, session: Session, known_version: int | None = None) -> bytes:
+    """
+    Builds a pick for the protocol version of the session: one row/col byte for v1, PICK_V2 for v2.
+    In delta mode the client's board version follows.
+    :param row: Row to pick
+    :param col: Column to pick
+    :param session: Protocol options agreed with the server
+    :param known_version: Client board version (delta mode), None otherwise
+    :return: Pick bytes
+    :raises ValueError: if row or col do not fit the protocol version
+    """
+    if session.version >= PROTOCOL_V2:
+        if not (0 <= row <= 0xFFFF and 0 <= col <= 0xFFFF): raise ValueError("row and col must be in 0-65535")
+        data = PICK_V2.pack(row, col)
+    else:
+        if not (0 <= row <= 15 and 0 <= col <= 15): raise ValueError("row and col must be in 0-15")
+        data = pack("!B", (row << 4) | col)
+    return data if known_version is None else data + KNOWN_VERSION.pack(known_version)
+
+
+def pick_size(session: Session) -> int:
+    """
+    :param session: Protocol options agreed with the server
+    :return: Size in bytes of one pick (see pack_pick)
+    """
+    size = PICK_V2.size if session.version >= PROTOCOL_V2 else FORMAT_MAP['!B']
+    return size + KNOWN_VERSION.size if session.has(FEATURE_DELTA) else size
+
+
+async def read_picks(reader: StreamReader, session: Session, pending: bytearray) -> tuple[list[tuple[int, int]], int]:
+    """
+    Server side of pipelining: waits for at least one complete pick, then takes every complete pick received so far
+    (at most PIPELINE_MAX), so picks the client sent back to back are answered together.
+    :param reader: asyncio StreamReader of the client
+    :param session: Protocol options agreed with the client
+    :param pending: Bytes received but not used yet, kept by the caller between calls
+    :return: ([(row, col), ...] in the order they were sent, board version of the last pick or RESYNC_VERSION without
+             delta mode); no picks once the client has hung up
+    """
+    size = pick_size(session)
+    while len(pending) < size:
+        data = await reader.read(PIPELINE_MAX * size)
+        if not data:
+            return [], RESYNC_VERSION
+        pending += data
+    count = min(len(pending) // size, PIPELINE_MAX)
+    wide = session.version >= PROTOCOL_V2
+    picks = [PICK_V2.unpack_from(pending, offset) if wide else byte_segment_to_space(pending[offset])
+             for offset in range(0, count * size, size)]
+    known_version = RESYNC_VERSION
+    if session.has(FEATURE_DELTA):
+        known_version = KNOWN_VERSION.unpack_from(pending, count * size - KNOWN_VERSION.size)[0]
+    del pending[:count * size]
+    return picks, known_version
+
+
+def pack_scores(status: int, scores: list[int]) -> bytes:
+    """
+    Builds the v2 score field: SCORES_V2, then every seat's score.
+    :param status: STATUS_OK or STATUS_OUT_OF_BOUNDS
+    :param scores: Score of each seat, in seat order
+    :return: Score field bytes
+    :raises ValueError: if there are more than 255 seats
+    """
+    if len(scores) > 0xFF: raise ValueError("at most 255 seats")
+    return SCORES_V2.pack(status, len(scores)) + pack(f"!{len(scores)}I", *scores)
+
+
+async def read_scores(reader: StreamReader) -> tuple[int, tuple[int, ...]]:
+    """
+    Reads the v2 score field that starts every response.
+    :param reader: asyncio StreamReader of the connection
+    :return: (status, score of each seat)
+    """
+    status, seats = SCORES_V2.unpack(await reader.readexactly(SCORES_V2.size))
+    return status, unpack(f"!{seats}I", await reader.readexactly(seats * SCORE_V2.size))
+
+
+def pack_indices(indices: array) -> bytes:
+    """
+    Packs tile indices as consecutive big-endian unsigned ints.
+    :param indices: array('I') of row-major tile indices
+    :return: Packed bytes, 4 per index
+    """
+    indices = array('I', indices)
+    if sys.byteorder == 'little':
+        indices.byteswap()
+    return indices.tobytes()
+
+
+def unpack_indices(payload: bytes) -> array:
+    """
+    Reverses pack_indices.
+    :param payload: Bytes (or a memoryview) from a FRAME_DELTA payload
+    :return: array('I') of tile indices
+    """
+    indices = array('I')
+    indices.frombytes(payload)
+    if sys.byteorder == 'little':
+        indices.byteswap()
+    return indices
+
+
+def build_bitmap(n: int, bitmap: bytes) -> bytes:
+    """
+    Builds a FRAME_BITMAP payload.
+    :param n: Board size
+    :param bitmap: Picked tiles, one bit per tile, row-major, MSB first, padded to a whole byte
+    :return: Payload bytes
+    :raises ValueError: if the bitmap does not have one bit per tile
+    """
+    if len(bitmap) != (n * n + 7) // 8: raise ValueError("bitmap must have one bit per tile")
+    return BITMAP_HEADER.pack(n) + bitmap
+
+
+def unpack_bitmap(payload: bytes) -> tuple[int, bytes]:
+    """
+    Reverses build_bitmap.
+    :param payload: Bytes from a FRAME_BITMAP payload
+    :return: (n, bitmap)
+    :raises ValueError: if the bitmap does not have one bit per tile
+    """
+    n = BITMAP_HEADER.unpack_from(payload)[0]
+    bitmap = payload[BITMAP_HEADER.size:]
+    if len(bitmap) != (n * n + 7) // 8: raise ValueError("bitmap must have one bit per tile")
+    return n, bitmap
+
+
+def bitmap_to_mask(n: int, bitmap: bytes) -> bytearray:
+    """
+    Expands a picked-tile bitmap into the masked board text (same bytes as Board.mask_bytes()).
+    :param n: Board size
+    :param bitmap: Picked tiles, one bit per tile, row-major, MSB first
+    :return: Masked board bytes
+    """
+    bits = format(int.from_bytes(bitmap, 'big'), f'0{8 * len(bitmap)}b')
+    tiles = bytearray(b' ') * (2 * n * n)
+    tiles[::2] = bits[:n * n].encode().translate(BITMAP_TILES)
+    width = 2 * n
+    return bytearray(b'\n'.join([tiles[start:start + width] for start in range(0, width * n, width)]))
+
+
+def build_board_frame(kind: int, base: int, version: int, payload: bytes) -> bytes:
+    """
+    Builds a board frame: BOARD_FRAME header followed by the payload.
+    :param kind: FRAME_FULL, FRAME_DELTA or FRAME_BITMAP
+    :param base: Version the frame applies on top of (ignored by clients for FRAME_FULL)
+    :param version: Board version after applying the frame
+    :param payload: Frame payload
+    :return: Frame bytes ready to write
+    """
+    return BOARD_FRAME.pack(kind, base, version, len(payload)) + payload
+
+
+def build_update(scores: list[int], frame: bytes) -> bytes:
+    """
+    Builds a pushed MSG_UPDATE message.
+    :param scores: Score of each seat, in seat order
+    :param frame: FRAME_DELTA or FRAME_BITMAP board frame
+    :return: Message bytes, the same for every connection
+    """
+    return MESSAGE.pack(MSG_UPDATE) + pack_scores(STATUS_OK, scores) + frame
+
+
+async def read_update(reader: StreamReader) -> tuple[tuple[int, ...], tuple[int, int, int, bytes]]:
+    """
+    Reads the rest of a MSG_UPDATE message, after its MESSAGE byte.
+    :param reader: asyncio StreamReader of the connection
+    :return: (score of each seat, board frame as returned by read_board_frame)
+    """
+    _, scores = await read_scores(reader)
+    return scores, await read_board_frame(reader)
+
+
+async def read_board_frame(reader: StreamReader) -> tuple[int, int, int, bytes]:
+    """
+    Reads one board frame.
+    :param reader: asyncio StreamReader to read from
+    :return: (kind, base version, version, payload)
+    """
+    kind, base, version, length = BOARD_FRAME.unpack(await reader.readexactly(BOARD_FRAME.size))
+    return kind, base, version, await reader.readexactly(length)
+
+
+# Frame codec: every parse_* function decodes one message part from data (the bytes received so far) at offset and
+# returns (the value, offset after it), or, if data does not hold all of it yet, the number of bytes from offset it
+# needs (as far as is known: a length prefix that has not arrived counts as the prefix alone). Payloads are
+# memoryviews into data, not copies. FrameReader and SocketFrameReader feed them from one buffer per connection.
+
+def parse_struct(data: memoryview, offset: int, struct: Struct) -> tuple[tuple, int] | int:
+    """
+    :param data: Bytes received so far
+    :param offset: Where the value starts
+    :param struct: Fixed-size message part, e.g. MESSAGE or PIPELINE_ACK
+    :return: (the unpacked tuple, offset after it), bytes needed if incomplete
+    """
+    end = offset + struct.size
+    return (struct.unpack_from(data, offset), end) if end <= len(data) else struct.size
+
+
+def parse_sized(data: memoryview, offset: int, length: Struct) -> tuple[memoryview, int] | int:
+    """
+    Decodes a length-prefixed payload: a player name or an unframed board.
+    :param data: Bytes received so far
+    :param offset: Where the length starts
+    :param length: Struct of the length prefix, e.g. BOARD_LENGTH_V1
+    :return: (payload, offset after it), bytes needed if incomplete
+    """
+    start = offset + length.size
+    if start > len(data):
+        return length.size
+    end = start + length.unpack_from(data, offset)[0]
+    return (data[start:end], end) if end <= len(data) else end - offset
+
+
+def parse_scores(data: memoryview, offset: int = 0) -> tuple[tuple[int, tuple[int, ...]], int] | int:
+    """
+    Decodes the v2 score field (see read_scores).
+    :param data: Bytes received so far
+    :param offset: Where the field starts
+    :return: ((status, score of each seat), offset after it), bytes needed if incomplete
+    """
+    start = offset + SCORES_V2.size
+    if start > len(data):
+        return SCORES_V2.size
+    status, seats = SCORES_V2.unpack_from(data, offset)
+    end = start + seats * SCORE_V2.size
+    return ((status, unpack_from(f"!{seats}I", data, start)), end) if end <= len(data) else end - offset
+
+
+def parse_board_frame(data: memoryview, offset: int = 0) -> tuple[tuple[int, int, int, memoryview], int] | int:
+    """
+    Decodes one board frame (see read_board_frame).
+    :param data: Bytes received so far
+    :param offset: Where the frame starts
+    :return: ((kind, base version, version, payload), offset after it), bytes needed if incomplete
+    """
+    start = offset + BOARD_FRAME.size
+    if start > len(data):
+        return BOARD_FRAME.size
+    kind, base, version, length = BOARD_FRAME.unpack_from(data, offset)
+    end = start + length
+    return ((kind, base, version, data[start:end]), end) if end <= len(data) else end - offset
+
+
+def parse_update(data: memoryview, offset: int = 0) -> tuple[tuple[tuple[int, ...], tuple], int] | int:
+    """
+    Decodes the rest of a MSG_UPDATE message, after its MESSAGE byte (see read_update).
+    :param data: Bytes received so far
+    :param offset: Where the score field starts
+    :return: ((score of each seat, board frame as returned by parse_board_frame), offset after it), bytes needed if
+    incomplete
+    """
+    scores = parse_scores(data, offset)
+    if isinstance(scores, int):
+        return scores
+    frame = parse_board_frame(data, scores[1])
+    return ((scores[0][1], frame[0]), frame[1]) if not isinstance(frame, int) else scores[1] - offset + frame
+
+
+class FrameBuffer:
+    """
+    Receive buffer of one connection, shared by FrameReader and SocketFrameReader: a preallocated bytearray that
+    reads land in, and that messages are parsed out of with the parse_* functions. Once a parse function reports how
+    many bytes a message part needs, room is made for all of it: the buffer is compacted, or grows once when the part
+    is larger than the buffer, so even a large board frame is received in a few large reads.
+    Payloads returned by read are views into the buffer: they stay valid until the next read.
+    """
+
+    def __init__(self, size: int = READ_BUFFER) -> None:
+        """
+        :param size: Initial buffer size in bytes
+        :raises ValueError: if size is not positive
+        """
+        if size <= 0: raise ValueError("size must be positive")
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # first byte not parsed yet
+        self._end = 0  # end of the bytes received
+
+    def _parse(self, parse: Callable, args: tuple):
+        """
+        :return: The value parse decoded, None if it is incomplete (room for it is made first, see _reserve)
+        """
+        parsed = parse(self._view[self._start:self._end], 0, *args)
+        if isinstance(parsed, int):
+            self._reserve(parsed)
+            return None
+        value, used = parsed
+        self._start += used
+        if self._start == self._end:
+            self._start = self._end = 0
+        return value
+
+    def _reserve(self, needed: int) -> None:
+        """
+        Makes room for a message part of needed bytes that starts at the first unparsed byte: moves the unparsed bytes
+        to the front of the buffer, or into a larger one (at least twice as large) if the part does not fit at all.
+        :param needed: Size of the part, more than the unparsed bytes
+        """
+        if self._start + needed <= len(self._buffer):
+            return
+        unparsed = self._end - self._start
+        if needed <= len(self._buffer):
+            self._view[:unparsed] = self._view[self._start:self._end]
+        else:
+            buffer = bytearray(max(needed, 2 * len(self._buffer)))
+            buffer[:unparsed] = self._view[self._start:self._end]
+            self._buffer, self._view = buffer, memoryview(buffer)
+        self._start, self._end = 0, unparsed
+
+    def _closed(self) -> asyncio.IncompleteReadError:
+        return asyncio.IncompleteReadError(bytes(self._view[self._start:self._end]), None)
+
+
+class FrameReader(FrameBuffer):
+    """
+    Buffered message reader for an asyncio connection. Each read takes everything the StreamReader has received, up
+    to the free space of the buffer, so a response (scores and board frame) or a burst of pushed updates that arrived
+    together is parsed out of one read instead of two or three readexactly calls per message.
+    A part larger than the buffer (a large board frame) is not copied into it if the rest of the part is at most
+    DIRECT_READ bytes: the rest is read with one readexactly and joined to the part's bytes already buffered, and the
+    buffer does not grow. Larger parts still grow the buffer: a readexactly of megabytes has the StreamReader pause
+    and resume the transport many times.
+    Once a FrameReader is in use, all reads on the connection must go through it.
+    """
+
+    def __init__(self, reader: StreamReader, size: int = READ_BUFFER) -> None:
+        """
+        :param reader: asyncio StreamReader of the connection
+        :param size: Initial buffer size in bytes
+        """
+        super().__init__(size)
+        self.reader = reader
+        self._oversized = 0  # size of the part being read, when it is larger than the buffer (see _reserve)
+
+    def _reserve(self, needed: int) -> None:
+        if len(self._buffer) < needed <= self._end - self._start + DIRECT_READ:
+            self._oversized = needed
+        else:
+            super()._reserve(needed)
+
+    async def _read_oversized(self, parse: Callable, args: tuple):
+        """
+        :return: The value parse decoded from the buffered start of the part and the readexactly rest of it
+        """
+        data, needed = self._view[self._start:self._end], self._oversized
+        self._start = self._end = self._oversized = 0
+        while True:
+            try:
+                rest = await self.reader.readexactly(needed - len(data))
+            except asyncio.IncompleteReadError as e:
+                raise asyncio.IncompleteReadError(bytes(data) + e.partial, None) from None
+            data = memoryview(b''.join((data, rest)))
+            parsed = parse(data, 0, *args)
+            if not isinstance(parsed, int):
+                return parsed[0]
+            needed = parsed  # a header was incomplete, e.g. the board frame after the scores of parse_update
+
+    async def read(self, parse: Callable, *args):
+        """
+        Reads until a whole message part has arrived and decodes it.
+        :param parse: One of the parse_* functions
+        :param args: Extra arguments of parse, e.g. the Struct of parse_struct
+        :return: The value parse decoded
+        :raises asyncio.IncompleteReadError: if the connection is closed first
+        """
+        while (value := self._parse(parse, args)) is None:
+            if self._oversized:
+                return await self._read_oversized(parse, args)
+            free = self._view[self._end:]
+            data = await self.reader.read(len(free))
+            if not data:
+                raise self._closed()
+            free[:len(data)] = data
+            self._end += len(data)
+        return value
+
+
+class SocketFrameReader(FrameBuffer):
+    """
+    Buffered message reader for a blocking socket: the same as FrameReader, but the kernel copies straight into the
+    buffer (recv_into), with no bytes object in between.
+    """
+
+    def __init__(self, sc: socket, size: int = READ_BUFFER) -> None:
+        """
+        :param sc: Connected socket
+        :param size: Initial buffer size in bytes
+        """
+        super().__init__(size)
+        self.socket = sc
+
+    def read(self, parse: Callable, *args):
+        """
+        Receives until a whole message part has arrived and decodes it.
+        :param parse: One of the parse_* functions
+        :param args: Extra arguments of parse, e.g. the Struct of parse_struct
+        :return: The value parse decoded
+        :raises asyncio.IncompleteReadError: if the connection is closed first
+        """
+        while (value := self._parse(parse, args)) is None:
+            received = self.socket.recv_into(self._view[self._end:])
+            if received == 0:
+                raise self._closed()
+            self._end += received
+        return value
+
+
+class ClientBoard:
+    """
+    Client copy of the masked board, kept up to date from board frames.
+    """
+
+    def __init__(self, session: Session | None = None) -> None:
+        """
+        :param session: Session the frames arrive on, used to decompress FRAME_FULL payloads
+        """
+        self.session = session or Session()
+        self.n = 0
+        self.mask = bytearray()
+        self.version = RESYNC_VERSION
+
+    def apply_frame(self, kind: int, base: int, version: int, payload: bytes) -> bool:
+        """
+        Applies a full (text or bitmap) or delta board frame.
+        A frame older than this board is ignored. A delta that starts before this board's version is still applied:
+        picking a tile twice changes nothing, so with pushed updates the order of responses and updates does not matter.
+        :return: True if applied or ignored, False if a delta starts after this board's version (the client must
+            resync)
+        :raises ValueError: if kind is unknown
+        """
+        if self.version != RESYNC_VERSION and version < self.version:
+            return True
+        if kind == FRAME_FULL:
+            self.mask = bytearray(self.session.decompress(payload))
+            row_end = self.mask.find(b'\n')
+            self.n = (row_end if row_end >= 0 else len(self.mask)) // 2
+        elif kind == FRAME_BITMAP:
+            self.n, bitmap = unpack_bitmap(payload)
+            self.mask = bitmap_to_mask(self.n, bitmap)
+        elif kind == FRAME_DELTA:
+            if self.version == RESYNC_VERSION or base > self.version:
+                self.version = RESYNC_VERSION
+                return False
+            n = self.n
+            for index in unpack_indices(payload):
+                self.mask[(index // n) * (2 * n + 1) + 2 * (index % n)] = 0x20
+        else:
+            raise ValueError("unknown board frame kind")
+        self.version = version
+        return True
+
+    def __str__(self) -> str:
+        return self.mask.decode()
+
+
+def loop_factory(backend: str = DEFAULT_LOOP) -> Callable[[], asyncio.AbstractEventLoop]:
+    """
+    Picks the event loop implementation for a backend name.
+    'asyncio' is the stdlib loop. 'uvloop' and 'auto' use uvloop when it is installed; 'uvloop' warns on stderr when
+    it has to fall back to the stdlib loop, 'auto' falls back silently.
+    :param backend: One of LOOP_BACKENDS
+    :return: Function that creates a new event loop
+    :raises ValueError: if backend is unknown
+    """
+    if backend not in LOOP_BACKENDS: raise ValueError(f"loop must be one of {', '.join(LOOP_BACKENDS)}")
+    if backend == 'asyncio': return asyncio.new_event_loop
+    try:
+        import uvloop
+    except ImportError:
+        if backend == 'uvloop': print("uvloop is not installed, using the asyncio event loop", file=sys.stderr)
+        return asyncio.new_event_loop
+    return uvloop.new_event_loop
+
+
+def loop_name(loop: asyncio.AbstractEventLoop) -> str:
+    """
+    :return: 'uvloop' if loop is a uvloop loop, otherwise 'asyncio'
+    """
+    return 'uvloop' if type(loop).__module__.startswith('uvloop') else 'asyncio'
+
+
+def pop_loop_arg(argv: list[str]) -> str:
+    """
+    Removes "--loop NAME" from the command line arguments.
+    :param argv: Command line arguments (changed in place)
+    :return: NAME, or DEFAULT_LOOP when the flag is not given
+    :raises ValueError: if NAME is missing or not one of LOOP_BACKENDS
+    """
+    if '--loop' not in argv: return DEFAULT_LOOP
+    index = argv.index('--loop')
+    if index + 1 >= len(argv) or argv[index + 1] not in LOOP_BACKENDS:
+        raise ValueError(f"--loop needs one of {', '.join(LOOP_BACKENDS)}")
+    backend = argv[index + 1]
+    del argv[index:index + 2]
+    return backend
+
+
+def run_with_loop(main: Coroutine, backend: str = DEFAULT_LOOP):
+    """
+    asyncio.run() on the event loop chosen by backend (see loop_factory).
+    :param main: Coroutine to run
+    :param backend: One of LOOP_BACKENDS
+    :return: The coroutine's result
+    """
+    with asyncio.Runner(loop_factory=loop_factory(backend)) as runner:
+        return runner.run(main)
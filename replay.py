@@ -0,0 +1,181 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from Board import Board, cell_typecode
+from move_journal import GAME_START, JOURNAL_RECORD, tile_records
+
+# JOURNAL_RECORD as a NumPy structured dtype, so a whole journal is read with one frombuffer()
+RECORD_DTYPE = np.dtype([('time', '<i8'), ('game', '<u4'), ('seat', '<u4'), ('row', '<u2'), ('col', '<u2'),
+                         ('value', '<u4')])
+assert RECORD_DTYPE.itemsize == JOURNAL_RECORD.size
+
+
+def read_journal(path: str) -> np.ndarray:
+    """
+    Reads a move journal (see move_journal.MoveJournal). A partly written record at the end (the server was killed
+    while writing) is ignored.
+    :param path: Path of the journal file
+    :return: Structured array of RECORD_DTYPE records, in journal order
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    return np.frombuffer(data, dtype=RECORD_DTYPE, count=len(data) // RECORD_DTYPE.itemsize)
+
+
+class JournalGame:
+    """
+    One game in a journal: its tile values and every pick made in it, in order. A game runs from its GAME_START
+    record up to the next start of a game with the same id (a restarted server reuses ids).
+    """
+
+    def __init__(self, game_id: int, started: int, n: int, t: int, tiles: bytes, records: np.ndarray,
+                 picks: np.ndarray) -> None:
+        """
+        :param game_id: Id of the game
+        :param started: Time the game started, in ns since the epoch
+        :param n: Board size
+        :param t: Largest treasure value
+        :param tiles: Tile values in the native byte order (see Board.from_cells)
+        :param records: Records of the whole journal
+        :param picks: Indices of the game's pick records, in order
+        """
+        self.id = game_id
+        self.started = started
+        self.n = n
+        self.t = t
+        self.tiles = tiles
+        self._records = records
+        self._picks = picks
+
+    def __len__(self) -> int:
+        return len(self._picks)
+
+    def moves(self, count: int | None = None) -> np.ndarray:
+        """
+        :param count: Number of picks, None for all of them
+        :return: The game's first count pick records, in order (copied out of the journal)
+        """
+        return self._records[self._picks[:count]]
+
+    def last_pick(self, count: int | None = None) -> int | None:
+        """
+        :param count: Number of picks, None for all of them
+        :return: Time of the last of the first count picks, in ns since the epoch, None if there are none
+        """
+        picks = self._picks[:count]
+        return int(self._records['time'][picks[-1]]) if len(picks) else None
+
+    def replay(self, moves: int | None = None) -> tuple[Board, list[int], int]:
+        """
+        Rebuilds the game after its first moves picks, applying them all with one bulk pick (see Board.pick_many).
+        :param moves: Number of picks to replay, None for all of them
+        :return: (the Board, score of every seat that picked, picks whose journaled value differs from the replay)
+        :raises ValueError: if moves is negative
+        """
+        if moves is not None and moves < 0: raise ValueError("moves must be >= 0")
+        picks = self.moves(moves)
+        board = Board.from_cells(self.n, self.t, self.tiles)
+        coords = np.stack((picks['row'], picks['col']), axis=1).astype(np.int64)
+        values = np.frombuffer(board.pick_many(coords), dtype=np.dtype(cell_typecode(self.t)))
+        scores = np.bincount(picks['seat'], weights=values).astype(np.int64).tolist()
+        return board, scores, int(np.count_nonzero(values != picks['value']))
+
+    def to_dict(self) -> dict:
+        """
+        :return: The game's summary as JSON-friendly types
+        """
+        return {'game': self.id, 'started_ns': self.started, 'n': self.n, 't': self.t, 'picks': len(self._picks)}
+
+
+def journal_games(records: np.ndarray) -> list[JournalGame]:
+    """
+    Splits a journal into its games. Picks made before their game's GAME_START record was written (the journal was
+    switched on mid-game) are ignored, and so is a game whose tile values were cut off by a crash.
+    :param records: Records of a journal (see read_journal)
+    :return: Every game in the journal, in the order they started
+    """
+    # GAME_START records, skipping tile values that happen to look like one, and every record of their tile values
+    starts = []
+    inside = np.zeros(len(records) + 1, dtype=np.int64)
+    end = 0
+    for index in np.flatnonzero(records['seat'] == GAME_START).tolist():
+        if index < end:
+            continue
+        end = index + 1 + tile_records(int(records['row'][index]), int(records['value'][index]))
+        if end > len(records):
+            break
+        starts.append(index)
+        inside[index] += 1
+        inside[end] -= 1
+    moves = np.flatnonzero(np.cumsum(inside[:-1]) == 0)
+
+    if not starts:
+        return []
+
+    # Sort starts and picks by game, keeping journal order: every pick then follows the latest start of its game
+    events = np.sort(np.concatenate((np.array(starts, dtype=np.int64), moves)))
+    events = events[np.argsort(records['game'][events], kind='stable')]
+    is_start = records['seat'][events] == GAME_START
+    game_starts = events[is_start]
+    owners = np.cumsum(is_start) - 1
+    owned = ~is_start & (owners >= 0)
+    owned &= records['game'][game_starts[np.maximum(owners, 0)]] == records['game'][events]
+    owners, picks = owners[owned], events[owned]
+
+    games = []
+    for owner, index in enumerate(game_starts.tolist()):
+        n, t = int(records['row'][index]), int(records['value'][index])
+        dtype = np.dtype(cell_typecode(t))
+        tiles = records[index + 1:index + 1 + tile_records(n, t)].tobytes()[:n * n * dtype.itemsize]
+        tiles = np.frombuffer(tiles, dtype=dtype.newbyteorder('<')).astype(dtype).tobytes()
+        game_picks = picks[np.searchsorted(owners, owner):np.searchsorted(owners, owner, 'right')]
+        games.append((index, JournalGame(int(records['game'][index]), int(records['time'][index]), n, t, tiles,
+                                         records, game_picks)))
+    return [game for _, game in sorted(games, key=lambda entry: entry[0])]
+
+
+def main() -> None:
+    """
+    Command line entry point, e.g.: python replay.py journal/worker-0.journal --game 4 --moves 20 --board
+    Without --game, lists the games in the journal. Prints the results as JSON to stdout.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Rebuilds treasure hunt games from a server move journal")
+    parser.add_argument('journal', help="journal file, JOURNAL_DIR/worker-W.journal")
+    parser.add_argument('--game', type=int, default=None, help="id of the game to replay")
+    parser.add_argument('--start', type=int, default=-1,
+                        help="which game with that id (a restarted server reuses ids), -1 for the latest")
+    parser.add_argument('--moves', type=int, default=None, help="replay only the first MOVES picks")
+    parser.add_argument('--board', action='store_true', help="include the board, treasure included")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    games = journal_games(read_journal(args.journal))
+    if args.game is None:
+        print(json.dumps([game.to_dict() for game in games], indent=2))
+        return
+    matching = [game for game in games if game.id == args.game]
+    if not -len(matching) <= args.start < len(matching):
+        sys.exit(f"game {args.game} (start {args.start}) is not in {args.journal}")
+    game = matching[args.start]
+    board, scores, mismatches = game.replay(args.moves)
+    elapsed = time.perf_counter() - started
+    picks = len(range(len(game))[:args.moves])
+    result = game.to_dict() | {
+        'picks_replayed': picks,
+        'last_pick_ns': game.last_pick(args.moves),
+        'version': board.version,
+        'scores': scores,
+        'mismatches': mismatches,
+        'seconds': round(elapsed, 6),
+        'picks_per_sec': round(picks / elapsed),
+    }
+    if args.board:
+        result['board'] = str(board).split('\n')
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOGGER_NAME = 'treasure_hunt'
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(process)d] %(message)s'
+
+log = logging.getLogger(LOGGER_NAME)
+
+
+class SnapshotQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+    Only the message is merged with its arguments on the event loop (so the record holds the values at the time it
+    was logged); timestamps, formatting and the write itself happen in the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        :param record: Record logged on the event loop
+        :return: The same record, with its message merged and exception text rendered
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def log_level() -> int:
+    """
+    Level for the server log: LOG_LEVEL (a level name such as INFO) if set, otherwise DEBUG when DEBUG=True
+    (the same switch as the Django settings), otherwise INFO.
+    :return: Logging level
+    :raises ValueError: if LOG_LEVEL is not a level name
+    """
+    name = os.getenv('LOG_LEVEL') or ('DEBUG' if os.getenv('DEBUG', 'False') == 'True' else 'INFO')
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int): raise ValueError(f"unknown LOG_LEVEL: {name}")
+    return level
+
+
+def start_logging(level: int | None = None, stream=None) -> QueueListener:
+    """
+    Sends the server log through a queue: the event loop only puts records on it, and a listener thread writes
+    them to the stream, so a slow terminal or pipe never blocks the game.
+    Call once per process (after fork in launcher mode) and stop the listener on exit to flush the queue.
+    :param level: Logging level, defaults to log_level()
+    :param stream: Where the records are written, defaults to stdout
+    :return: The started listener
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    records = queue.SimpleQueue()
+    log.handlers = [SnapshotQueueHandler(records)]
+    log.setLevel(log_level() if level is None else level)
+    log.propagate = False
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    return listener
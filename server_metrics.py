@@ -0,0 +1,202 @@
+import asyncio
+from asyncio import StreamReader, StreamWriter
+from bisect import bisect_left
+from collections.abc import Callable
+from network_functions import PORT
+
+METRICS_PORT = PORT + 2  # HTTP port for the metrics; launcher worker W serves on METRICS_PORT + W
+METRICS_PREFIX = 'treasure_hunt_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'  # Prometheus text exposition format
+HTTP_TIMEOUT = 5.0  # seconds a scrape may take to send its request
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Metric:
+    """
+    Base class for a metric. Updating one is a plain attribute change, so it is cheap enough for the hot path; all
+    formatting happens when the metrics are scraped. Counters and gauges can instead read their value from a
+    function at scrape time (e.g. queue depths or counts kept elsewhere).
+    """
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, function: Callable[[], float] | None = None) -> None:
+        """
+        :param name: Metric name, without METRICS_PREFIX
+        :param help_text: One line description for the HELP line
+        :param function: Returns the current value at scrape time, instead of the value kept by the metric
+        """
+        self.name = METRICS_PREFIX + name
+        self.help = help_text
+        self.function = function
+        self.value = 0
+
+    def samples(self) -> list[tuple[str, float]]:
+        """
+        :return: (sample name with labels, value) of every sample to expose
+        """
+        return [(self.name, self.function() if self.function is not None else self.value)]
+
+    def render(self) -> str:
+        """
+        :return: The metric in the Prometheus text format
+        """
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name} {value}" for name, value in self.samples()]
+        return '\n'.join(lines) + '\n'
+
+
+class Counter(Metric):
+    """
+    Value that only goes up.
+    """
+    kind = 'counter'
+
+    def inc(self, amount: int = 1) -> None:
+        """
+        :param amount: How much to add
+        :return: None
+        """
+        self.value += amount
+
+
+class Gauge(Metric):
+    """
+    Value that goes up and down.
+    """
+    kind = 'gauge'
+
+    def inc(self, amount: int = 1) -> None:
+        """
+        :param amount: How much to add
+        :return: None
+        """
+        self.value += amount
+
+    def dec(self, amount: int = 1) -> None:
+        """
+        :param amount: How much to subtract
+        :return: None
+        """
+        self.value -= amount
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over fixed buckets (cumulative when exposed, as Prometheus expects).
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """
+        :param name: Metric name, without METRICS_PREFIX
+        :param help_text: One line description for the HELP line
+        :param buckets: Bucket upper bounds, in increasing order (+Inf is added)
+        :raises ValueError: if the buckets are not in increasing order
+        """
+        if list(buckets) != sorted(set(buckets)): raise ValueError("buckets must be in increasing order")
+        super().__init__(name, help_text)
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        :param value: Observed value (e.g. seconds)
+        :return: None
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self) -> list[tuple[str, float]]:
+        samples = []
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            samples.append((f'{self.name}_bucket{{le="{bound}"}}', total))
+        return samples + [(f"{self.name}_sum", self.sum), (f"{self.name}_count", total)]
+
+
+class Metrics:
+    """
+    The metrics of one server process, in the order they are exposed.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        :param metric: Metric to expose
+        :return: The same metric
+        :raises ValueError: if a metric with the same name is already registered
+        """
+        if any(known.name == metric.name for known in self.metrics): raise ValueError(f"duplicate metric {metric.name}")
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        :return: Every metric in the Prometheus text format
+        """
+        return ''.join(metric.render() for metric in self.metrics)
+
+
+metrics = Metrics()
+CONNECTIONS = metrics.register(Counter('connections_total', "Player connections seated"))
+REJECTED = metrics.register(Counter('connections_rejected_total', "Player connections rejected, server full"))
+CONNECTED = metrics.register(Gauge('connections', "Players connected"))
+SPECTATORS = metrics.register(Gauge('spectators', "Spectators connected"))
+GAMES = metrics.register(Gauge('games', "Games running"))
+PICKS = metrics.register(Counter('picks_total', "Picks applied to boards"))
+QUEUE_DEPTH = metrics.register(Gauge('board_queue_depth', "Requests waiting for board tasks, all games"))
+QUEUE_DEPTH_MAX = metrics.register(Gauge('board_queue_depth_max', "Requests waiting for the busiest board task"))
+BOARD_LATENCY = metrics.register(Histogram('board_request_seconds',
+                                           "Time from queuing a board request until its answer"))
+SEND_WAITS = metrics.register(Counter('send_waits_total', "Writes that waited for a send buffer to drain"))
+SUPERSEDED = metrics.register(Counter('updates_superseded_total', "Pushed updates replaced by a newer one"))
+SLOW_DISCONNECTS = metrics.register(Counter('slow_clients_disconnected_total', "Clients dropped for not draining"))
+
+
+def track_registry(registry) -> None:
+    """
+    Points the metrics that are read at scrape time at a server's games (main.GameRegistry): games running, board
+    queue depths and the backpressure counters.
+    :param registry: Games hosted by this server (worker)
+    :return: None
+    """
+    GAMES.function = lambda: len(registry.games)
+    QUEUE_DEPTH.function = lambda: sum(game.requests.qsize() for game in registry.games.values())
+    QUEUE_DEPTH_MAX.function = lambda: max((game.requests.qsize() for game in registry.games.values()), default=0)
+    SEND_WAITS.function = lambda: registry.backpressure.counters['waited']
+    SUPERSEDED.function = lambda: registry.backpressure.counters['superseded']
+    SLOW_DISCONNECTS.function = lambda: registry.backpressure.counters['disconnected']
+
+
+async def metrics_server(reader: StreamReader, writer: StreamWriter, exposed: Metrics = metrics) -> None:
+    """
+    Minimal HTTP/1.1 handler: answers GET /metrics with the metrics in the Prometheus text format, then closes
+    the connection. A request line that is not "METHOD PATH VERSION" gets 400 Bad Request.
+    :param reader: asyncio StreamReader of the scraper
+    :param writer: asyncio StreamWriter of the scraper
+    :param exposed: Metrics to serve
+    :return: None
+    """
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HTTP_TIMEOUT)
+        request_line = request.split(b'\r\n', 1)[0].split(b' ')
+        if len(request_line) != 3:  # not "METHOD PATH VERSION": a malformed request or a port scan
+            status, body = b'400 Bad Request', b''
+        elif request_line[0] != b'GET':
+            status, body = b'405 Method Not Allowed', b''
+        elif request_line[1].split(b'?')[0] != b'/metrics':
+            status, body = b'404 Not Found', b''
+        else:
+            status, body = b'200 OK', exposed.render().encode()
+        writer.write(b'HTTP/1.1 %s\r\nContent-Type: %s\r\nContent-Length: %d\r\nConnection: close\r\n\r\n'
+                     % (status, CONTENT_TYPE.encode(), len(body)) + body)
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
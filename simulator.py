@@ -0,0 +1,333 @@
+import argparse
+import json
+import math
+import random
+import sys
+from abc import ABC, abstractmethod
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Board import Board
+from Player import Player
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class Strategy(ABC):
+    """
+    Base class for a bot strategy. A strategy chooses the next tile to pick and observes every pick made in the
+    game (its own and its opponents'), so it never needs to look at the hidden board.
+    """
+    name = 'strategy'
+
+    def __init__(self, n: int, rng: random.Random) -> None:
+        """
+        :param n: Board size
+        :param rng: Random generator for this game
+        """
+        self.n = n
+        self.rng = rng
+        self.picked = bytearray(n * n)
+
+    @abstractmethod
+    def choose(self) -> int:
+        """
+        :return: Row-major index (row * n + col) of an unpicked tile to pick next
+        """
+
+    def observe(self, index: int, value: int) -> None:
+        """
+        Records the result of a pick made by any player.
+        :param index: Row-major index of the picked tile
+        :param value: Treasure value the pick returned (0 if empty)
+        :return: None
+        """
+        self.picked[index] = 1
+
+
+class RandomStrategy(Strategy):
+    """
+    Picks unpicked tiles in a random order.
+    """
+    name = 'random'
+
+    def __init__(self, n: int, rng: random.Random) -> None:
+        super().__init__(n, rng)
+        self.order = list(range(n * n))
+        rng.shuffle(self.order)
+
+    def choose(self) -> int:
+        while self.picked[self.order[-1]]:
+            self.order.pop()
+        return self.order.pop()
+
+
+class ScanLineStrategy(Strategy):
+    """
+    Picks tiles row by row, left to right.
+    """
+    name = 'scan'
+
+    def __init__(self, n: int, rng: random.Random) -> None:
+        super().__init__(n, rng)
+        self.next_index = 0
+
+    def choose(self) -> int:
+        while self.picked[self.next_index]:
+            self.next_index += 1
+        return self.next_index
+
+
+class ChainStrategy(RandomStrategy):
+    """
+    Picks randomly until a treasure is hit, then follows the chain: the tiles next to every hit (wrapping around
+    the edges like the board does) are picked before going back to random picks.
+    """
+    name = 'chain'
+
+    def __init__(self, n: int, rng: random.Random) -> None:
+        super().__init__(n, rng)
+        self.targets = []
+
+    def choose(self) -> int:
+        while self.targets:
+            index = self.targets.pop()
+            if not self.picked[index]:
+                return index
+        return super().choose()
+
+    def observe(self, index: int, value: int) -> None:
+        super().observe(index, value)
+        if value:
+            n = self.n
+            row, col = divmod(index, n)
+            self.targets.extend([((row - 1) % n) * n + col, ((row + 1) % n) * n + col,
+                                 row * n + (col - 1) % n, row * n + (col + 1) % n])
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (RandomStrategy, ScanLineStrategy, ChainStrategy)}
+
+
+class RunningStats:
+    """
+    Streaming count, mean, variance, min and max (Welford), mergeable across workers (Chan et al.).
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        """
+        Adds one sample.
+        :param value: Sample value
+        :return: None
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'RunningStats') -> None:
+        """
+        Folds another RunningStats into this one.
+        :param other: Stats gathered separately (e.g. by another worker)
+        :return: None
+        """
+        if other.count == 0: return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def stdev(self) -> float:
+        """
+        :return: Sample standard deviation, 0 with fewer than two samples
+        """
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'mean': self.mean, 'stdev': self.stdev,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None}
+
+
+class SimulationResult:
+    """
+    Aggregated statistics for a set of games, without keeping any individual game.
+    Per seat: score stats and wins (ties count for every tied seat). Per game: picks needed to find every treasure,
+    as running stats plus a histogram.
+    """
+
+    def __init__(self, strategies: list[str]) -> None:
+        self.strategies = list(strategies)
+        self.games = 0
+        self.scores = [RunningStats() for _ in strategies]
+        self.wins = [0] * len(strategies)
+        self.picks = RunningStats()
+        self.picks_histogram = Counter()
+
+    def add_game(self, scores: list[int], picks: int) -> None:
+        """
+        Records one finished game.
+        :param scores: Final score of each seat
+        :param picks: Total picks it took to find every treasure
+        :return: None
+        """
+        self.games += 1
+        best = max(scores)
+        for seat, score in enumerate(scores):
+            self.scores[seat].add(score)
+            if score == best:
+                self.wins[seat] += 1
+        self.picks.add(picks)
+        self.picks_histogram[picks] += 1
+
+    def merge(self, other: 'SimulationResult') -> None:
+        """
+        Folds another result for the same strategies into this one.
+        :param other: Result from another chunk of games
+        :raises ValueError: if the results are for different strategies
+        :return: None
+        """
+        if other.strategies != self.strategies: raise ValueError("results must be for the same strategies")
+        self.games += other.games
+        for seat in range(len(self.strategies)):
+            self.scores[seat].merge(other.scores[seat])
+            self.wins[seat] += other.wins[seat]
+        self.picks.merge(other.picks)
+        self.picks_histogram.update(other.picks_histogram)
+
+    def to_dict(self) -> dict:
+        return {
+            'games': self.games,
+            'seats': [{'strategy': name, 'score': self.scores[seat].to_dict(), 'wins': self.wins[seat]}
+                      for seat, name in enumerate(self.strategies)],
+            'picks_to_clear': self.picks.to_dict(),
+            'picks_histogram': dict(sorted(self.picks_histogram.items())),
+        }
+
+
+def play_game(n: int, t: int, strategies: list[str], rng: random.Random) -> tuple[list[int], int]:
+    """
+    Plays one game on a fresh board: seats take turns in order until every treasure has been found.
+    :param n: Board size
+    :param t: Number of treasure types
+    :param strategies: Strategy name for each seat (see STRATEGIES)
+    :param rng: Random generator for the board and the strategies
+    :return: (final score of each seat, total picks)
+    """
+    board = Board(n, str(t), rng=rng)
+    bots = [STRATEGIES[name](n, rng) for name in strategies]
+    players = [Player(name) for name in strategies]
+    remaining = sum(value * value for value in range(1, t + 1))
+    picks = 0
+    while remaining:
+        seat = picks % len(bots)
+        index = bots[seat].choose()
+        value = board.pick(index // n, index % n)
+        players[seat].add_score(value)
+        for bot in bots:
+            bot.observe(index, value)
+        remaining -= value
+        picks += 1
+    return [player.get_score() for player in players], picks
+
+
+def simulate_chunk(n: int, t: int, strategies: list[str], games: int, seed: str) -> SimulationResult:
+    """
+    Plays a chunk of games in one process. Runs inside the worker processes of simulate().
+    :param seed: Seed for this chunk; chunks with the same seed play the same games
+    :return: Aggregated result for the chunk
+    """
+    rng = random.Random(seed)
+    result = SimulationResult(strategies)
+    for _ in range(games):
+        result.add_game(*play_game(n, t, strategies, rng))
+    return result
+
+
+def iter_simulation(games: int, n: int = 10, t: int = 4, strategies: tuple[str, ...] = ('chain', 'random'),
+                    workers: int | None = None, seed: int = 0,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[SimulationResult]:
+    """
+    Spreads games over a ProcessPoolExecutor in chunks and yields the running aggregate as each chunk finishes,
+    so progress can be reported without holding every game in memory.
+    Each chunk is seeded from (seed, chunk number), so results do not depend on the number of workers.
+    :param games: Total games to play
+    :param n: Board size
+    :param t: Number of treasure types
+    :param strategies: Strategy name for each seat (see STRATEGIES)
+    :param workers: Worker processes, defaults to the CPU count; 1 runs in this process
+    :param seed: Base seed
+    :param chunk_size: Games per task sent to a worker
+    :raises ValueError: if a strategy is unknown or games, n or t are invalid
+    :return: Iterator of the merged result after each finished chunk
+    """
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown: raise ValueError(f"unknown strategies: {', '.join(unknown)}")
+    if not strategies: raise ValueError("at least one strategy is required")
+    if games < 0: raise ValueError("games must be >= 0")
+    Board(n, str(t))  # validate n and t before starting any workers
+
+    chunks = [(n, t, list(strategies), min(chunk_size, games - start), f"{seed}-{number}")
+              for number, start in enumerate(range(0, games, chunk_size))]
+    total = SimulationResult(strategies)
+    if workers == 1:
+        for chunk in chunks:
+            total.merge(simulate_chunk(*chunk))
+            yield total
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(simulate_chunk, *chunk) for chunk in chunks]):
+            total.merge(future.result())
+            yield total
+
+
+def simulate(games: int, **kwargs) -> SimulationResult:
+    """
+    Runs iter_simulation to completion.
+    :return: Aggregated result for every game
+    """
+    result = SimulationResult(kwargs.get('strategies', ('chain', 'random')))
+    for result in iter_simulation(games, **kwargs):
+        pass
+    return result
+
+
+def main() -> None:
+    """
+    Command line entry point, e.g.: python simulator.py --games 100000 --strategies chain random
+    Prints a progress line per finished chunk to stderr and the final statistics as JSON to stdout.
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description="Monte Carlo treasure hunt strategy simulator")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--n', type=int, default=10, help="board size")
+    parser.add_argument('--t', type=int, default=4, help="number of treasure types")
+    parser.add_argument('--strategies', nargs='+', default=['chain', 'random'], choices=sorted(STRATEGIES),
+                        help="one strategy per seat, seats take turns in this order")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    result = None
+    for result in iter_simulation(args.games, args.n, args.t, tuple(args.strategies), args.workers, args.seed,
+                                  args.chunk_size):
+        means = ' '.join(f"{name}={stats.mean:.2f}" for name, stats in zip(result.strategies, result.scores))
+        print(f"{result.games}/{args.games} games | mean score {means} | "
+              f"mean picks to clear {result.picks.mean:.1f}", file=sys.stderr)
+    print(json.dumps((result or SimulationResult(args.strategies)).to_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,30 @@
+import asyncio
+import functools
+import importlib.util
+import io
+import logging
+import multiprocessing
 import random
+import socket
+import zlib
+from array import array
 import pytest
-from Board import Board
+import main
+import network_functions
+import server_log
+import server_metrics
+from board_snapshot import BoardSnapshot
+from Board import Board, chain_candidates, place_chains, rows_layout
 from Player import Player
+from network_functions import (ClientBoard, FEATURE_DELTA, FEATURE_PIPELINE, FEATURE_PUSH, FEATURE_ZSTREAM, MESSAGE,
+                               FEATURE_REJOIN,
+                               MSG_RESPONSE, MSG_UPDATE, NEWEST_GAME, PIPELINE_ACK, SPECTATE, FRAME_BITMAP, FRAME_DELTA,
+                               FRAME_FULL, OUT_OF_BOUNDS, PROTOCOL_V1, PROTOCOL_V2, RESYNC_VERSION, STATUS_OK,
+                               STATUS_OUT_OF_BOUNDS, Session, build_bitmap, loop_factory, loop_name, pack_indices,
+                               pack_pick, pack_scores, pop_loop_arg, read_board_frame, read_picks, read_scores,
+                               read_update, run_with_loop, send_hello, unpack_bitmap, unpack_indices, FrameReader,
+                               SocketFrameReader, build_board_frame, parse_board_frame, parse_scores, parse_struct,
+                               parse_update, receive, get_player_scores)
 
 
 def test_name():
@@ -148,3 +171,844 @@ def test_board_str_output():
     ]
     expected = '\n'.join([' '.join(['_' for _ in range(2)]) for _ in range(2)])
     assert str(b) == expected
+
+
+def test_pick_twice_returns_zero():
+    b = Board(2, "2")
+    b.board = [
+        ['2', '2'],
+        ['1', '_']
+    ]
+
+    assert b.pick(0, 0) == 2
+    assert b.pick(0, 0) == 0
+    assert b.board == [[' ', '2'], ['1', '_']]
+    with pytest.raises(TypeError, match="read-only"):
+        b.board[1][1] = '1'  # a copy: the write would be lost
+
+
+def test_treasure_values_above_nine():
+    b = Board(12, "12")
+    assert sum(cell == '12' for row in b.board for cell in row) == 12
+    assert sum(cell != '_' for row in b.board for cell in row) == 78
+
+    row, col = next((r, c) for r in range(12) for c in range(12) if b.board[r][c] == '12')
+    assert b.pick(row, col) == 12
+
+
+def test_mask_board_tracks_picks():
+    b = Board(3, "1")
+    assert b.mask_board() == '_ _ _ \n_ _ _ \n_ _ _ '
+
+    b.pick(1, 2)
+    b.pick(0, 0)
+    assert b.mask_board() == '  _ _ \n_ _   \n_ _ _ '
+    assert b.mask_bytes() == b.mask_board().encode()
+
+    b.board = [[' ', '_', '_'], ['_', ' ', '_'], ['1', '_', ' ']]
+    assert b.mask_board() == '  _ _ \n_   _ \n_ _   '
+
+
+def test_dense_placement_terminates():
+    for n in range(2, 9):
+        for _ in range(20):
+            b = Board(n, str(n))
+            for value in range(1, n + 1):
+                assert sum(cell == str(value) for row in b.board for cell in row) == value
+
+
+def test_place_chains_rejects_impossible():
+    with pytest.raises(ValueError, match="Treasure t length cant be greater than n board length"):
+        place_chains(array('B', bytes(9)), 3, 4, random)
+    with pytest.raises(ValueError, match="t must be greater than 0"):
+        place_chains(array('B', bytes(9)), 3, 0, random)
+
+
+def test_placement_engines_agree():
+    placement = pytest.importorskip('game.placement')
+    for n in range(1, 10):
+        for t in range(1, n + 1):
+            for seed in range(5):
+                cells = [0] * (n * n)
+                place_chains(cells, n, t, random.Random(seed))
+                assert placement.place_treasure(n, t, random.Random(seed)) == cells
+
+
+def test_rows_layout():
+    cells = array('B', bytes(16))
+    rows_layout(cells, 4, 4, random.Random(3))
+    assert sorted(cells) == [0] * 6 + [1] + [2] * 2 + [3] * 3 + [4] * 4
+
+
+def test_chain_candidates():
+    cells = array('B', [
+        1, 0, 0,
+        0, 0, 0,
+        0, 0, 1,
+    ])
+    # Horizontal runs of 3 only fit in row 1, vertical ones only in column 1
+    assert sorted(chain_candidates(cells, 3, 3)) == [(0, 1, (1, 0)), (1, 0, (0, 1)), (1, 1, (0, 1)), (1, 1, (1, 0)),
+                                                     (1, 2, (0, 1)), (2, 1, (1, 0))]
+    assert len(chain_candidates(cells, 3, 1)) == 7
+
+
+def test_seeded_board_is_reproducible():
+    assert Board(10, '4', seed=5).board == Board(10, '4', seed=5).board
+    assert Board(10, '4', rng=random.Random(5)).board == Board(10, '4', seed=5).board
+
+    with pytest.raises(ValueError, match="Pass either seed or rng, not both"):
+        Board(10, '4', seed=5, rng=random.Random(5))
+
+
+def test_generate_many():
+    np = pytest.importorskip('numpy')
+    boards = Board.generate_many(200, 6, '6', seed=11)
+    assert boards.shape == (200, 6, 6)
+    for tiles in boards:
+        for value in range(1, 7):
+            assert np.count_nonzero(tiles == value) == value
+
+    assert np.array_equal(boards, Board.generate_many(200, 6, '6', seed=11))
+    with pytest.raises(ValueError, match="Treasure t length cant be greater than n board length"):
+        Board.generate_many(1, 4, '5')
+
+
+def test_from_array():
+    np = pytest.importorskip('numpy')
+    tiles = Board.generate_many(1, 5, '3', seed=4)[0]
+    b = Board.from_array(tiles)
+    assert b.n == 5 and b.t == 3
+    assert b.board == [[str(value) if value else '_' for value in row] for row in tiles.tolist()]
+    row, col = np.argwhere(tiles == 3)[0]
+    assert b.pick(int(row), int(col)) == 3
+
+
+def test_pick_many():
+    b = Board(2, "2")
+    b.board = [
+        ['1', '2'],
+        ['_', '2']
+    ]
+
+    assert list(b.pick_many([(0, 0), (0, 1), (0, 1), (1, 0)])) == [1, 2, 0, 0]
+    assert b.mask_board() == '    \n  _ '
+
+    with pytest.raises(ValueError, match="Row and Column must be between 0 and n-1"):
+        b.pick_many([(1, 1), (2, 0)])
+    with pytest.raises(ValueError, match="Row and Column must be digits"):
+        b.pick_many([(1, 1), ("1", 0)])
+    # Nothing is picked when any coordinate is invalid
+    assert b.pick(1, 1) == 2
+
+
+def test_pick_many_ndarray():
+    np = pytest.importorskip('numpy')
+    b = Board(2, "2")
+    b.board = [
+        ['1', '2'],
+        [' ', '2']
+    ]
+
+    assert list(b.pick_many(np.array([[1, 1], [0, 0], [1, 1], [1, 0]]))) == [2, 1, 0, 0]
+    assert b.board == [[' ', '2'], [' ', ' ']]
+    assert b.mask_board() == '  _ \n    '
+
+    with pytest.raises(ValueError, match="Row and Column must be between 0 and n-1"):
+        b.pick_many(np.array([[0, 1], [0, -1]]))
+    with pytest.raises(ValueError, match="Row and Column must be digits"):
+        b.pick_many(np.array([[0.0, 1.0]]))
+
+
+def test_pick_many_unsigned_ndarray():
+    np = pytest.importorskip('numpy')
+    b = Board(2, "2")
+    b.board = [
+        ['1', '2'],
+        [' ', '2']
+    ]
+
+    assert list(b.pick_many(np.array([[1, 1], [0, 0], [1, 1]], dtype=np.uint64))) == [2, 1, 0]
+    assert b.board == [[' ', '2'], [' ', ' ']]
+
+    with pytest.raises(ValueError, match="Row and Column must be between 0 and n-1"):
+        b.pick_many(np.array([[0, 2 ** 64 - 1]], dtype=np.uint64))
+
+
+def test_changes_since():
+    b = Board(3, "1")
+    assert b.version == 0
+    b.pick(0, 1)
+    b.pick(0, 1)
+    b.pick_many([(2, 2), (1, 0)])
+    assert b.version == 3
+    assert list(b.changes_since(0)) == [1, 8, 3]
+    assert list(b.changes_since(2)) == [3]
+    assert list(b.changes_since(3)) == []
+    with pytest.raises(ValueError, match="version must be between 0 and board version"):
+        b.changes_since(4)
+
+
+def test_client_board_applies_frames():
+    b = Board(4, "2")
+    client = ClientBoard()
+    assert client.apply_frame(FRAME_FULL, 0, 0, zlib.compress(b.mask_bytes()))
+    assert client.n == 4
+
+    b.pick(1, 2)
+    b.pick(3, 0)
+    delta = pack_indices(b.changes_since(0))
+    assert list(unpack_indices(delta)) == [6, 12]
+    assert client.apply_frame(FRAME_DELTA, 0, b.version, delta)
+    assert str(client) == b.mask_board()
+    assert client.version == 2
+
+    # A delta that does not start at the client's version is refused and forces a resync
+    assert not client.apply_frame(FRAME_DELTA, 5, 6, b'')
+    assert client.version == RESYNC_VERSION
+
+
+def test_bitmap_frame():
+    b = Board(5, "2")
+    b.pick(0, 0)
+    b.pick(4, 4)
+    payload = build_bitmap(5, b.picked_bytes())
+    assert len(payload) == 4 + 4
+    n, bitmap = unpack_bitmap(payload)
+    assert n == 5 and bitmap[0] == 0b10000000 and bitmap[3] == 0b10000000
+
+    client = ClientBoard()
+    assert client.apply_frame(FRAME_BITMAP, 2, 2, payload)
+    assert client.n == 5
+    assert str(client) == b.mask_board()
+
+    with pytest.raises(ValueError, match="bitmap must have one bit per tile"):
+        build_bitmap(6, b.picked_bytes())
+
+
+def test_zstream_session():
+    server = Session(features=FEATURE_ZSTREAM)
+    client = ClientBoard(Session(features=FEATURE_ZSTREAM))
+    b = Board(6, "3")
+    sizes = []
+    for row in range(3):
+        b.pick(row, row)
+        payload = server.compress(b.mask_bytes())
+        sizes.append(len(payload))
+        assert client.apply_frame(FRAME_FULL, b.version, b.version, payload)
+        assert str(client) == b.mask_board()
+    # Later boards compress against the earlier ones in the same stream
+    assert sizes[-1] < len(zlib.compress(b.mask_bytes()))
+
+
+def test_frame_readers():
+    frame = build_board_frame(FRAME_BITMAP, 1, 2, bytes(range(40)))
+    data = pack_scores(STATUS_OK, [3, 4]) + frame + MESSAGE.pack(MSG_UPDATE) + pack_scores(STATUS_OK, [5]) + frame
+    # incomplete parts report the bytes they need: the 13-byte header, then the whole frame once its length is known
+    assert parse_board_frame(memoryview(frame)[:5]) == 13 and parse_board_frame(memoryview(frame)[:20]) == len(frame)
+    update = len(pack_scores(STATUS_OK, [5])) + len(frame)
+    assert parse_update(memoryview(data)[:-1], len(data) - update) == update
+
+    async def read(chunks):
+        reader = asyncio.StreamReader()
+        frames = FrameReader(reader, size=8)  # smaller than a frame, which is read past the buffer
+        for chunk in chunks:
+            reader.feed_data(chunk)
+        reader.feed_eof()
+        status, scores = await frames.read(parse_scores)
+        kind, base, version, payload = await frames.read(parse_board_frame)
+        assert (status, scores, kind, base, version) == (STATUS_OK, (3, 4), FRAME_BITMAP, 1, 2)
+        assert bytes(payload) == bytes(range(40))
+        assert await frames.read(parse_struct, MESSAGE) == (MSG_UPDATE,)
+        scores, update = await frames.read(parse_update)
+        assert scores == (5,) and bytes(update[3]) == bytes(range(40))
+        with pytest.raises(asyncio.IncompleteReadError):
+            await frames.read(parse_scores)
+
+    asyncio.run(read([data]))
+    asyncio.run(read([data[i:i + 3] for i in range(0, len(data), 3)]))
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(network_functions, 'DIRECT_READ', 0)  # the buffer grows to fit every part instead
+        asyncio.run(read([data[i:i + 3] for i in range(0, len(data), 3)]))
+
+    async def read_truncated():
+        reader = asyncio.StreamReader()
+        reader.feed_data(frame[:20])
+        reader.feed_eof()
+        with pytest.raises(asyncio.IncompleteReadError) as error:
+            await FrameReader(reader, size=8).read(parse_board_frame)
+        return error.value.partial
+
+    assert asyncio.run(read_truncated()) == frame[:20]
+
+    one, two = socket.socketpair()
+    with one, two:
+        one.sendall(frame + frame[:20])
+        one.shutdown(socket.SHUT_WR)
+        frames = SocketFrameReader(two, size=8)
+        assert bytes(frames.read(parse_board_frame)[3]) == bytes(range(40))
+        with pytest.raises(asyncio.IncompleteReadError) as error:
+            frames.read(parse_board_frame)
+        assert error.value.partial == frame[:20]
+
+    one, two = socket.socketpair()
+    with one, two:
+        one.sendall(frame)
+        assert receive(two, len(frame)) == frame
+
+
+def test_board_task_answers_concurrent_clients():
+    async def play():
+        requests = asyncio.Queue()
+        board = Board(4, "1")
+        board.board = [['_', '_', '_', '_'], ['_', '_', '1', '_'], ['_', '_', '_', '_'], ['_', '_', '_', '_']]
+        players = [Player("One"), Player("Two")]
+        task = asyncio.create_task(main.board_at_play(board, players, requests))
+        session = Session()
+        # Both clients wait at once; each must get its own answer
+        miss, hit = await asyncio.gather(main.request_board(requests, 0, 0, players[0], session),
+                                         main.request_board(requests, 1, 2, players[1], session))
+        out_of_bounds = await main.request_board(requests, 4, 0, players[0], session)
+        await requests.put(None)
+        await task
+        return miss, hit, out_of_bounds
+
+    miss, hit, out_of_bounds = asyncio.run(play())
+    assert miss[0] == 0
+    assert hit[0] == 1
+    assert hit[1].count(b'_') == 14
+    assert out_of_bounds[0] == OUT_OF_BOUNDS
+
+
+def test_board_task_survives_a_failed_request():
+    class BrokenBoard(Board):
+        def pick_many(self, picks):
+            if picks == [(1, 1)]: raise RuntimeError("broken pick")
+            return super().pick_many(picks)
+
+    async def play():
+        players = [Player("One")]
+        requests = asyncio.Queue()
+        task = asyncio.create_task(main.board_at_play(BrokenBoard(3, "1", seed=1), players, requests))
+        with pytest.raises(RuntimeError, match="broken pick"):
+            await main.request_board(requests, 1, 1, players[0], Session())
+        _, board = await main.request_board(requests, 0, 0, players[0], Session())
+        await requests.put(None)
+        await task
+        return board
+
+    assert asyncio.run(play())[:2] == b'  '
+
+
+def test_game_registry_pairs_and_cleans_up():
+    async def play():
+        registry = main.GameRegistry(lambda game_id: Board(4, "2", seed=game_id), max_games=2)
+        first, one = registry.join()
+        second, two = registry.join()
+        third, three = registry.join()
+        assert first is second and third is not first
+        assert (one.name, two.name, three.name) == ("One", "Two", "One")
+
+        # A started game never reuses a seat
+        await registry.leave(first, one)
+        assert registry.open_game is third and not first.open
+        fourth, four = registry.join()
+        assert fourth is third and four.name == "Two"
+        assert registry.full
+        with pytest.raises(ValueError, match="Server is full"):
+            registry.join()
+
+        await registry.leave(first, two)
+        assert first.task.done() and list(registry.games) == [third.id]
+        await registry.leave(third, three)
+        await registry.leave(third, four)
+        assert registry.games == {} and registry.open_game is None
+
+    asyncio.run(play())
+
+
+def test_game_registry_workers_and_rejoin():
+    async def play():
+        lobby = multiprocessing.Value('i', -1)
+        registry = main.GameRegistry(lambda game_id: Board(4, "2"), worker=1, workers=3, rejoin_grace=0.05,
+                                     lobby=lobby)
+        game, one = registry.join()
+        assert game.id == 1 and registry.owner(game.id) == 1
+        assert lobby.value == 1 and registry.match_worker() == 1
+        one.add_score(4)
+
+        # The seat is kept for rejoin_grace seconds, score included
+        await registry.leave(game, one)
+        assert registry.rejoin(game.id, 0) == (game, one) and one.get_score() == 4
+        with pytest.raises(ValueError, match="Seat is taken"):
+            registry.rejoin(game.id, 0)
+        with pytest.raises(ValueError, match="Unknown seat"):
+            registry.rejoin(game.id, 1)
+
+        _, two = registry.join()
+        second, _ = registry.join()
+        assert second.id == 4 and lobby.value == 1
+        await registry.leave(game, one)
+        await registry.leave(game, two)
+        await asyncio.sleep(0.1)
+        with pytest.raises(ValueError, match="Unknown game"):
+            registry.rejoin(game.id, 0)
+
+        # Another worker's waiting game takes new players once this one has none
+        lobby.value = 2
+        assert registry.match_worker() == 1
+        second.seats.append(Player("Two"))
+        assert registry.match_worker() == 2
+
+    asyncio.run(play())
+
+
+def test_handoff_passes_connections():
+    async def play():
+        channels = [socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM) for _ in range(2)]
+        sender, receiver = main.Handoff(0, channels), main.Handoff(1, channels)
+        client, server = socket.socketpair()
+        received = asyncio.get_running_loop().create_future()
+        receiver.listen(lambda sock, game_id, seat: received.set_result((sock, game_id, seat)))
+
+        sender.send(server, 1, 7, 1)
+        server.close()
+        sock, game_id, seat = await asyncio.wait_for(received, 1)
+        assert (game_id, seat) == (7, 1)
+        client.sendall(b'hi')
+        assert sock.recv(2) == b'hi'
+        for s in (sock, client, *(end for pair in channels for end in pair)):
+            s.close()
+
+    asyncio.run(play())
+
+
+def test_loop_backends():
+    argv = ['main.py', '--loop', 'auto', '10']
+    assert pop_loop_arg(argv) == 'auto'
+    assert argv == ['main.py', '10']
+    assert pop_loop_arg(argv) == 'asyncio'
+    with pytest.raises(ValueError, match="--loop needs one of"):
+        pop_loop_arg(['main.py', '--loop', 'trio'])
+    with pytest.raises(ValueError, match="loop must be one of"):
+        loop_factory('trio')
+
+    async def running_loop():
+        return loop_name(asyncio.get_running_loop())
+
+    assert run_with_loop(running_loop(), 'asyncio') == 'asyncio'
+    expected = 'uvloop' if importlib.util.find_spec('uvloop') else 'asyncio'
+    assert run_with_loop(running_loop(), 'auto') == expected
+
+
+def test_board_task_logs_through_queue(monkeypatch):
+    for attribute in ('handlers', 'level', 'propagate'):
+        monkeypatch.setattr(server_log.log, attribute, getattr(server_log.log, attribute))
+
+    async def play(level):
+        stream = io.StringIO()
+        listener = server_log.start_logging(level, stream)
+        requests = asyncio.Queue()
+        board = Board(4, "1", seed=1)
+        players = [Player("One"), Player("Two")]
+        task = asyncio.create_task(main.board_at_play(board, players, requests, 7))
+        await main.request_board(requests, 0, 1, players[0], Session())
+        await requests.put(None)
+        await task
+        listener.stop()
+        return stream.getvalue()
+
+    quiet = asyncio.run(play(logging.INFO))
+    verbose = asyncio.run(play(logging.DEBUG))
+    assert quiet == ''
+    assert 'pick game=7 player=One row=0 col=1 value=' in verbose
+    assert verbose.count('board game=7') == 2
+
+    monkeypatch.setenv('LOG_LEVEL', 'warning')
+    assert server_log.log_level() == logging.WARNING
+    monkeypatch.delenv('LOG_LEVEL')
+    monkeypatch.setenv('DEBUG', 'False')
+    assert server_log.log_level() == logging.INFO
+    monkeypatch.setenv('LOG_LEVEL', 'loud')
+    with pytest.raises(ValueError, match="unknown LOG_LEVEL"):
+        server_log.log_level()
+
+
+def test_protocol_v2():
+    v1, v2 = Session(PROTOCOL_V1), Session(PROTOCOL_V2)
+    assert pack_pick(1, 2, v1) == b'\x12'
+    assert pack_pick(1, 2, v1, 7) == b'\x12\x00\x00\x00\x07'
+    assert pack_pick(300, 2, v2) == b'\x01\x2c\x00\x02'
+    with pytest.raises(ValueError, match="0-15"):
+        pack_pick(16, 0, v1)
+    with pytest.raises(ValueError, match="0-65535"):
+        pack_pick(0, 65536, v2)
+    assert pack_scores(STATUS_OK, [1, 200, 70000]) == b'\x00\x03' + b''.join(
+        score.to_bytes(4, 'big') for score in (1, 200, 70000))
+    assert main.seat_names(3) == ("One", "Two", "Player 3")
+    assert main.seat_names(1) == ("One",)
+    argv = ['main.py', '--players', '4', '20']
+    assert main.pop_players_arg(argv) == 4
+    assert argv == ['main.py', '20']
+    with pytest.raises(ValueError, match="--players needs"):
+        main.pop_players_arg(['main.py', '--players', '256'])
+
+    async def play():
+        def board_factory(game_id):
+            board = Board(20, "1")
+            board.board = [['3' if (row, col) == (17, 5) else '_' for col in range(20)] for row in range(20)]
+            return board
+
+        registry = main.GameRegistry(board_factory, main.seat_names(3))
+        server = await asyncio.start_server(functools.partial(main.game_server, registry=registry), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        clients = [await asyncio.open_connection('127.0.0.1', port) for _ in range(3)]
+        reader, writer = clients[2]
+        name = await reader.readexactly(2)
+        assert await reader.readexactly(int.from_bytes(name, 'big')) == b'Player 3'
+        session = await send_hello(reader, writer, 0, PROTOCOL_V2)
+        assert session.version == PROTOCOL_V2
+        board = registry.games[0].board
+        results = []
+        for pick in ((17, 5), (20, 0)):
+            writer.write(pack_pick(*pick, session))
+            results.append(await read_scores(reader))
+            size = int.from_bytes(await reader.readexactly(4), 'big')
+            mask = zlib.decompress(await reader.readexactly(size))
+        for _, client in clients:
+            client.close()
+        server.close()
+        await server.wait_closed()
+        return results, mask, board
+
+    (picked, out_of_bounds), mask, board = asyncio.run(play())
+    assert picked == (STATUS_OK, (0, 0, 3))
+    assert out_of_bounds == (STATUS_OUT_OF_BOUNDS, picked[1])
+    assert mask == board.mask_bytes()
+
+
+def test_pipelined_picks_are_answered_as_one_batch():
+    async def parse():
+        reader = asyncio.StreamReader()
+        session = Session(PROTOCOL_V1, FEATURE_DELTA | FEATURE_PIPELINE)
+        reader.feed_data(pack_pick(1, 2, session, 5) + pack_pick(3, 0, session, 6) + pack_pick(0, 1, session, 7)[:2])
+        pending = bytearray()
+        first = await read_picks(reader, session, pending)
+        reader.feed_data(pack_pick(0, 1, session, 7)[2:])
+        reader.feed_eof()
+        return first, await read_picks(reader, session, pending), await read_picks(reader, session, pending)
+
+    first, second, closed = asyncio.run(parse())
+    assert first == ([(1, 2), (3, 0)], 6)
+    assert second == ([(0, 1)], 7)
+    assert closed == ([], RESYNC_VERSION)
+
+    async def play():
+        def board_factory(game_id):
+            board = Board(4, "1")
+            board.board = [['1' if (row, col) == (1, 2) else '_' for col in range(4)] for row in range(4)]
+            return board
+
+        registry = main.GameRegistry(board_factory)
+        server = await asyncio.start_server(functools.partial(main.game_server, registry=registry), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await reader.readexactly(int.from_bytes(await reader.readexactly(2), 'big'))
+        session = await send_hello(reader, writer, FEATURE_PIPELINE)
+        # one write, so the server receives every pick before it answers any
+        writer.write(b''.join(pack_pick(row, col, session) for row, col in ((0, 0), (1, 2), (4, 0))))
+        acked = PIPELINE_ACK.unpack(await reader.readexactly(PIPELINE_ACK.size))[0]
+        score = int.from_bytes(await reader.readexactly(2), 'big')
+        mask = zlib.decompress(await reader.readexactly(int.from_bytes(await reader.readexactly(2), 'big')))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return session, acked, score, mask, registry.games[0].board
+
+    session, acked, score, mask, board = asyncio.run(play())
+    assert session.has(FEATURE_PIPELINE)
+    assert acked == 3
+    # the batch held an out-of-bounds pick: flagged, with the scores after the valid picks, which were applied
+    assert score & OUT_OF_BOUNDS == OUT_OF_BOUNDS
+    assert get_player_scores(score) == (1, 0)
+    assert board.version == 2
+    assert mask == board.mask_bytes()
+
+
+def test_metrics_are_served_as_prometheus_text():
+    histogram = server_metrics.Histogram('test_seconds', "Test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.render().splitlines()[2:] == ['treasure_hunt_test_seconds_bucket{le="0.1"} 1',
+                                                   'treasure_hunt_test_seconds_bucket{le="1.0"} 2',
+                                                   'treasure_hunt_test_seconds_bucket{le="+Inf"} 3',
+                                                   'treasure_hunt_test_seconds_sum 5.55',
+                                                   'treasure_hunt_test_seconds_count 3']
+    with pytest.raises(ValueError, match="duplicate metric"):
+        server_metrics.metrics.register(server_metrics.Counter('picks_total', "Again"))
+
+    async def scrape(port, request):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request)
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def play():
+        registry = main.GameRegistry(lambda game_id: Board(4, "2", seed=3))
+        server_metrics.track_registry(registry)
+        server = await asyncio.start_server(functools.partial(main.game_server, registry=registry), '127.0.0.1', 0)
+        scrapes = await asyncio.start_server(server_metrics.metrics_server, '127.0.0.1', 0)
+        port, metrics_port = (s.sockets[0].getsockname()[1] for s in (server, scrapes))
+        picks = server_metrics.PICKS.value
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await reader.readexactly(int.from_bytes(await reader.readexactly(2), 'big'))
+        writer.write(bytes([0x12]))
+        await reader.readexactly(2)
+        await reader.readexactly(int.from_bytes(await reader.readexactly(2), 'big'))
+        body = await scrape(metrics_port, b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        missing = await scrape(metrics_port, b'GET / HTTP/1.1\r\n\r\n')
+        garbage = await scrape(metrics_port, b'GARBAGE\r\n\r\n')
+        writer.close()
+        server.close()
+        scrapes.close()
+        return body, missing, garbage, server_metrics.PICKS.value - picks
+
+    body, missing, garbage, picked = asyncio.run(play())
+    head, _, text = body.partition(b'\r\n\r\n')
+    assert head.startswith(b'HTTP/1.1 200 OK') and b'text/plain; version=0.0.4' in head
+    lines = text.decode().splitlines()
+    assert picked == 1
+    assert 'treasure_hunt_connections 1' in lines
+    assert 'treasure_hunt_games 1' in lines
+    assert 'treasure_hunt_board_queue_depth 0' in lines
+    assert '# TYPE treasure_hunt_board_request_seconds histogram' in lines
+    assert missing.startswith(b'HTTP/1.1 404')
+    assert garbage.startswith(b'HTTP/1.1 400')
+
+
+def test_snapshots_resume_games_after_a_crash(tmp_path):
+    board = Board(4, "2", seed=3)
+    snapshot = BoardSnapshot.create(str(tmp_path / "one.snap"), board, 7, 2)
+    for index, seat in ((0, 0), (5, 1), (0, 1), (10, 0)):
+        base = board.version
+        board.pick(*divmod(index, 4))
+        snapshot.record(board, base, seat)
+    snapshot.close()
+    snapshot, game_id, restored, scores = BoardSnapshot.restore(str(tmp_path / "one.snap"))
+    snapshot.close(remove=True)
+    assert game_id == 7
+    assert restored.mask_bytes() == board.mask_bytes()
+    assert restored.changes_since(0).tolist() == [0, 5, 10]
+    values = Board(4, "2", seed=3).pick_many([(0, 0), (1, 1), (2, 2)])
+    assert scores == [values[0] + values[2], values[1]]  # the repeated pick of tile 0 changed nothing
+
+    async def play():
+        registry = main.GameRegistry(lambda game_id: Board(4, "2", seed=3), snapshot_dir=str(tmp_path))
+        game, one = registry.join()
+        _, two = registry.join()
+        await main.request_board(game.requests, 0, 0, one, Session())
+        await main.request_board(game.requests, 1, 2, two, Session())
+        game.task.cancel()  # the server dies without closing the game
+        (tmp_path / "game-9.snap").write_bytes(b'junk')
+
+        resumed = main.GameRegistry(lambda game_id: Board(4, "2", seed=3), snapshot_dir=str(tmp_path))
+        assert not resumed.accepts_rejoin
+        count = resumed.restore(grace=0.05)
+        assert resumed.accepts_rejoin and resumed.features & FEATURE_REJOIN
+        again = resumed.games[0]
+        _, player = resumed.rejoin(0, 1)
+        await main.request_board(again.requests, 3, 3, player, Session())
+        joined = resumed.join()[0]  # both seats were taken before the crash, so a new player starts a new game
+        await resumed.leave(again, player)
+        await asyncio.sleep(0.1)
+        assert not resumed.accepts_rejoin  # no restored game is left: new connections are not checked for REJOIN
+        await joined.close()
+        return count, again, [seat.get_score() for seat in game.seats], sorted(path.name for path in tmp_path.iterdir())
+
+    count, again, before, files = asyncio.run(play())
+    assert count == 1
+    assert [seat.name for seat in again.seats] == ["One", "Two"]
+    assert [seat.get_score() for seat in again.seats][0] == before[0]
+    assert again.board.version == 3
+    assert files == ["game-9.snap"]  # closed games delete their snapshot, unreadable files are left alone
+
+
+def test_restored_games_do_not_seat_new_players(tmp_path):
+    async def play():
+        registry = main.GameRegistry(lambda game_id: Board(4, "2", seed=3), snapshot_dir=str(tmp_path))
+        game, one = registry.join()  # the second seat is still free when the server dies
+        await main.request_board(game.requests, 0, 0, one, Session())
+        game.task.cancel()
+
+        resumed = main.GameRegistry(lambda game_id: Board(4, "2", seed=3), snapshot_dir=str(tmp_path))
+        resumed.restore(grace=0.05)
+        fresh, player = resumed.join()
+        restored, back = resumed.rejoin(0, 0)
+        names = player.name, back.name, fresh.id, fresh.board.version
+        await resumed.leave(fresh, player)  # a new game, so it closes at once; the grace only covers restored games
+        assert sorted(resumed.games) == [0]
+        await resumed.leave(restored, back)
+        await asyncio.sleep(0.1)
+        return names, sorted(resumed.games)
+
+    names, games = asyncio.run(play())
+    assert names == ("One", "One", 1, 0)  # a new game; the restored one only takes its own player back
+    assert games == []
+
+
+def test_restore_skips_games_with_more_seats(tmp_path, caplog):
+    BoardSnapshot.create(str(tmp_path / "game-0.snap"), Board(4, "2", seed=3), 0, 3).close()
+
+    async def play():
+        registry = main.GameRegistry(lambda game_id: Board(4, "2"), snapshot_dir=str(tmp_path))
+        return registry.restore(), registry.games
+
+    with caplog.at_level(logging.WARNING, logger=server_log.LOGGER_NAME):
+        count, games = asyncio.run(play())
+    assert (count, games) == (0, {})
+    assert "seats=3 players=2" in caplog.text
+    assert (tmp_path / "game-0.snap").exists()
+
+
+def test_broadcast_pushes_to_players_and_spectators():
+    async def play():
+        registry = main.GameRegistry(lambda game_id: Board(4, "2", seed=3))
+        server = await asyncio.start_server(functools.partial(main.game_server, registry=registry), '127.0.0.1', 0)
+        watch = await asyncio.start_server(functools.partial(main.spectator_server, registry=registry), '127.0.0.1', 0)
+        pusher, picker = [await asyncio.open_connection('127.0.0.1', s.sockets[0].getsockname()[1])
+                          for s in (server, server)]
+        for reader, _ in (pusher, picker):
+            await reader.readexactly(5)  # player name
+        reader, writer = pusher
+        session = await send_hello(reader, writer, FEATURE_PUSH | FEATURE_DELTA)
+        board = ClientBoard(session)
+        assert MESSAGE.unpack(await reader.readexactly(1))[0] == MSG_RESPONSE
+        await reader.readexactly(2)
+        board.apply_frame(*await read_board_frame(reader))
+
+        spectator = await asyncio.open_connection('127.0.0.1', watch.sockets[0].getsockname()[1])
+        spectator[1].write(SPECTATE.pack(NEWEST_GAME))
+        watcher = ClientBoard()
+        assert MESSAGE.unpack(await spectator[0].readexactly(1))[0] == MSG_UPDATE
+        watcher.apply_frame(*(await read_update(spectator[0]))[1])
+
+        picker[1].write(bytes([0x12]))  # the v1 player picks (1, 2)
+        await picker[0].readexactly(2)
+        await picker[0].readexactly(int.from_bytes(await picker[0].readexactly(2), 'big'))
+        updates = []
+        for client_reader, client_board in ((reader, board), (spectator[0], watcher)):
+            assert MESSAGE.unpack(await client_reader.readexactly(1))[0] == MSG_UPDATE
+            scores, frame = await read_update(client_reader)
+            assert client_board.apply_frame(*frame)
+            updates.append((scores, frame))
+        expected = registry.games[0].board.mask_board()
+        for _, client in (pusher, picker):
+            client.close()
+        closed = await asyncio.wait_for(spectator[0].read(), 1)  # the game closes, and with it the spectators
+        server.close()
+        watch.close()
+        return updates, str(board), str(watcher), expected, closed
+
+    updates, board, watcher, expected, closed = asyncio.run(play())
+    assert updates[0] == updates[1]
+    assert updates[0][1][0] == FRAME_DELTA
+    assert board == watcher == expected
+    assert closed == b''
+
+
+class SlowWriter:
+    """
+    StreamWriter stand-in whose send buffer only drains once drained is set.
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.drained = asyncio.Event()
+        self.transport = self
+        self.aborted = False
+
+    def write(self, data):
+        self.sent.append(data)
+
+    def writelines(self, parts):
+        self.sent.append(b''.join(parts))
+
+    def close(self):
+        pass
+
+    def abort(self):
+        self.aborted = True
+
+    def get_extra_info(self, name):
+        return None
+
+    def get_write_buffer_size(self):
+        return 0 if self.drained.is_set() else 1 << 20
+
+    async def drain(self):
+        await self.drained.wait()
+
+
+def test_broadcast_coalesces_for_slow_subscribers():
+    async def play():
+        board = Board(4, "2", seed=3)
+        seats = [Player("One")]
+        broadcast = main.Broadcast(board, seats)
+        fast, slow = SlowWriter(), SlowWriter()
+        fast.drained.set()
+        fast_session, slow_session = Session(), Session()
+        broadcast.subscribe(fast, fast_session)
+        broadcast.subscribe(slow, slow_session)
+        await asyncio.sleep(0)
+        for index in range(5):
+            base = board.version
+            board.pick(index // 4, index % 4)
+            broadcast.publish(base)
+            await asyncio.sleep(0)
+        slow.drained.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        broadcast.close()
+        return board, fast, slow, slow_session, broadcast.backpressure.counters
+
+    board, fast, slow, slow_session, counters = asyncio.run(play())
+    # The fast subscriber got the snapshot and then every change; the slow one the snapshot and then only the latest
+    assert len(fast.sent) == 6
+    assert [update[7] for update in fast.sent] == [FRAME_BITMAP] + [FRAME_DELTA] * 5
+    assert len(slow.sent) == 2
+    assert slow.sent[1][7] == FRAME_BITMAP
+    assert slow_session.board_version == board.version
+    assert counters == {'waited': 1, 'superseded': 4}
+
+
+def test_backpressure_disconnects_stalled_clients():
+    async def play():
+        backpressure = main.Backpressure(high_water=1024, timeout=0.01)
+        writer = SlowWriter()
+        with pytest.raises(ConnectionError, match="too slow"):
+            await backpressure.drain(writer)
+        writer.drained.set()
+        await backpressure.drain(writer)
+        return writer, backpressure.counters
+
+    writer, counters = asyncio.run(play())
+    assert writer.aborted
+    assert counters == {'waited': 1, 'disconnected': 1}
+    with pytest.raises(ValueError, match="timeout must be > 0"):
+        main.Backpressure(timeout=0)
+
+
+def test_responses_are_written_at_once():
+    async def send(session, response):
+        writer = SlowWriter()
+        writer.drained.set()
+        await main.send_response(writer, response, session)
+        return writer.sent
+
+    frame = build_board_frame(FRAME_BITMAP, 1, 1, build_bitmap(2, bytes(1)))
+    session = Session(PROTOCOL_V2, FEATURE_PUSH | FEATURE_PIPELINE)
+    sent = asyncio.run(send(session, (pack_scores(STATUS_OK, [3]), frame)))
+    assert sent == [MESSAGE.pack(MSG_RESPONSE) + PIPELINE_ACK.pack(0) + pack_scores(STATUS_OK, [3]) + frame]
+    assert session.board_version == 1
+    sent = asyncio.run(send(Session(), (7, b'abc')))
+    assert len(sent) == 1 and sent[0][:2] == b'\x00\x07' and zlib.decompress(sent[0][4:]) == b'abc'
@@ -0,0 +1,78 @@
+import asyncio
+import functools
+import random
+import time
+import pytest
+import main
+from Board import Board
+from loadgen import LatencyHistogram, LoadResult, bot, run_load
+from network_functions import HELLO, PROTOCOL_V1, PROTOCOL_V2
+
+
+def test_latency_histogram_percentiles_and_merge():
+    left, right = LatencyHistogram(), LatencyHistogram()
+    for ms in range(1, 91):
+        left.add(ms / 1000)
+    for ms in range(91, 101):
+        right.add(ms / 1000)
+    left.merge(right)
+
+    assert left.count == 100
+    assert left.max == pytest.approx(0.1)
+    # percentiles are bucket upper bounds, at most one bucket (2 ** (1 / 8), about 9%) above the exact value
+    for percent, exact in ((50, 0.050), (95, 0.095), (99, 0.099)):
+        assert exact <= left.percentile(percent) <= exact * 2 ** (1 / 8)
+    assert LatencyHistogram().percentile(99) == 0.0
+    assert sum(left.to_dict()['histogram_ms'].values()) == 100
+    with pytest.raises(ValueError, match="percent must be between 0 and 100"):
+        left.percentile(101)
+
+
+def test_bots_play_against_the_server():
+    async def play():
+        registry = main.GameRegistry(lambda game_id: Board(20, "2", seed=game_id), max_games=2)
+        server = await asyncio.start_server(functools.partial(main.game_server, registry=registry), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        result = LoadResult()
+        start = time.time()
+        connecting = asyncio.Semaphore(2)
+        await asyncio.gather(*(bot('127.0.0.1', port, 20, 0, PROTOCOL_V2, start, start + 0.3, connecting, result,
+                                   random.Random(seed)) for seed in range(5)))
+        server.close()
+        await server.wait_closed()
+        return result
+
+    result = asyncio.run(play())
+    assert (result.connections, result.rejected, result.errors) == (4, 1, 0)  # two games of two seats
+    assert result.picks == result.latency.count > 0
+    assert result.connect_latency.count == 4
+
+    with pytest.raises(ValueError, match="n does not fit the protocol"):
+        run_load(n=20, version=PROTOCOL_V1)
+
+
+def test_a_bot_refused_by_the_server_is_counted_as_an_error():
+    async def refuse(reader, writer):
+        writer.write(b'\x00\x03One' + bytes(HELLO.size))  # a seat, then no HELLO magic in the reply
+        await reader.read()
+        writer.close()
+
+    async def play():
+        registry = main.GameRegistry(lambda game_id: Board(20, "2", seed=game_id))
+        server = await asyncio.start_server(functools.partial(main.game_server, registry=registry), '127.0.0.1', 0)
+        refusing = await asyncio.start_server(refuse, '127.0.0.1', 0)
+        ports = [s.sockets[0].getsockname()[1] for s in (server, refusing)]
+        result = LoadResult()
+        start = time.time()
+        connecting = asyncio.Semaphore(2)
+        await asyncio.gather(*(bot('127.0.0.1', port, 20, 0, PROTOCOL_V2, start, start + 0.3, connecting, result,
+                                   random.Random(seed)) for seed, port in enumerate(ports)))
+        for s in (server, refusing):
+            s.close()
+            await s.wait_closed()
+        return result
+
+    result = asyncio.run(play())
+    # the other bot's picks are kept
+    assert (result.connections, result.errors) == (2, 1)
+    assert result.picks == result.latency.count > 0
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import pytest
+import main
+from Board import Board
+from move_journal import JOURNAL_RECORD, MoveJournal, journal_path
+from network_functions import PORT, Session, receive
+
+pytest.importorskip('numpy')
+from replay import journal_games, read_journal  # noqa: E402
+
+
+def test_journal_replays_games_played_on_the_server(tmp_path):
+    path = journal_path(str(tmp_path))
+
+    async def play(moves):
+        journal = MoveJournal(path, interval=0.01)
+        writing = asyncio.create_task(journal.run())
+        registry = main.GameRegistry(lambda game_id: Board(6, "3", seed=game_id), journal=journal)
+        game, one = registry.join()
+        _, two = registry.join()
+        for seat, picks in moves:
+            await main.request_picks(game.requests, picks, (one, two)[seat], Session())
+        await asyncio.sleep(0.05)
+        written = os.path.getsize(path)  # handed to the writer thread by run(), before close
+        mask, scores = game.board.mask_bytes(), [one.get_score(), two.get_score()]
+        await registry.leave(game, one)
+        await registry.leave(game, two)
+        writing.cancel()
+        journal.close()
+        return written, mask, scores
+
+    # the server restarts and reuses game id 0; then dies partway through writing a record
+    first = asyncio.run(play([(0, [(0, 0), (0, 1), (9, 9)]), (1, [(0, 0), (2, 2)]), (0, [(5, 5)])]))
+    second = asyncio.run(play([(1, [(3, 3)])]))
+    with open(path, 'ab') as file:
+        file.write(bytes(JOURNAL_RECORD.size // 2))
+
+    assert first[0] > 0
+    games = journal_games(read_journal(path))
+    assert [(game.id, len(game)) for game in games] == [(0, 5), (0, 1)]  # the out of bounds pick is not journaled
+    for game, (_, mask, scores) in zip(games, (first, second)):
+        board, replayed_scores, mismatches = game.replay()
+        assert board.mask_bytes() == mask
+        assert replayed_scores + [0] * (2 - len(replayed_scores)) == scores
+        assert mismatches == 0
+
+    board, _, _ = games[0].replay(3)  # after (0, 0) (0, 1) and the repeated (0, 0)
+    assert (board.version, board.mask_board()[:4]) == (2, "    ")
+    assert list(games[0].moves(3)['seat']) == [0, 0, 1]
+    assert games[1].last_pick() >= games[0].last_pick() > games[0].started
+
+
+def test_journal_is_written_out_when_the_server_is_terminated(tmp_path):
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), 'main.py'), '6', '3', '0'],
+                              env=dict(os.environ, JOURNAL_DIR=str(tmp_path)), stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, text=True)
+    try:
+        end = time.time() + 10
+        while True:
+            try:
+                client = socket.create_connection(('127.0.0.1', PORT))
+                break
+            except OSError:
+                assert time.time() < end, "server did not start"
+                time.sleep(0.05)
+        with client:
+            receive(client, int.from_bytes(receive(client, 2), 'big'))  # player name
+            for row in range(3):
+                client.sendall(bytes((row << 4 | row,)))
+                receive(client, 2)  # score
+                receive(client, int.from_bytes(receive(client, 2), 'big'))  # board
+            server.send_signal(signal.SIGTERM)  # the picks are still buffered: the journal is written every second
+            errors = server.communicate(timeout=10)[1]
+            assert server.returncode == 0
+            assert 'Traceback' not in errors  # the open connection is closed quietly
+    finally:
+        server.kill()
+
+    games = journal_games(read_journal(journal_path(str(tmp_path))))
+    assert [len(game) for game in games] == [3]
+    assert games[0].replay()[2] == 0
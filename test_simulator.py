@@ -0,0 +1,55 @@
+import random
+import pytest
+from simulator import RunningStats, SimulationResult, Strategy, play_game, simulate, simulate_chunk
+
+
+def test_play_game_finds_every_treasure():
+    for strategy in ('random', 'scan', 'chain'):
+        scores, picks = play_game(6, 4, [strategy], random.Random(1))
+        assert scores == [30]
+        assert 10 <= picks <= 36
+
+
+def test_running_stats_merge():
+    values = [3, 1, 4, 1, 5, 9, 2, 6]
+    whole, left, right = RunningStats(), RunningStats(), RunningStats()
+    for value in values:
+        whole.add(value)
+    for value in values[:3]:
+        left.add(value)
+    for value in values[3:]:
+        right.add(value)
+    left.merge(right)
+
+    assert left.count == whole.count == 8
+    assert left.mean == pytest.approx(whole.mean)
+    assert left.stdev == pytest.approx(whole.stdev)
+    assert (left.min, left.max) == (1, 9)
+
+
+def test_simulate_is_reproducible():
+    kwargs = dict(n=5, t=3, strategies=('chain', 'scan'), seed=7, chunk_size=10)
+    single = simulate(35, workers=1, **kwargs)
+    pooled = simulate(35, workers=2, **kwargs)
+
+    assert single.games == pooled.games == 35
+    assert single.picks_histogram == pooled.picks_histogram
+    assert [stats.mean for stats in single.scores] == pytest.approx([stats.mean for stats in pooled.scores])
+    assert sum(single.picks_histogram.values()) == 35
+
+    with pytest.raises(ValueError, match="unknown strategies: psychic"):
+        simulate(1, strategies=('psychic',))
+
+
+def test_simulation_result_merge_rejects_other_strategies():
+    result = simulate_chunk(4, 2, ['random'], 3, 'a')
+    with pytest.raises(ValueError, match="results must be for the same strategies"):
+        result.merge(SimulationResult(['scan']))
+
+
+def test_a_strategy_without_choose_cannot_be_created():
+    class Idle(Strategy):
+        name = 'idle'
+
+    with pytest.raises(TypeError, match="abstract"):
+        Idle(4, random.Random(0))
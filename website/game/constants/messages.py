@@ -12,4 +12,7 @@ class ErrorMessages:
     TOO_MANY_PLAYERS = "Maximum number of players reached in this game"
     PLAYER_404 = "Player not found"
     PAGE_404 = "I cannot find the file you requested!"
-    BAD_TILE_VALUE = "Tile value is invalid"
\ No newline at end of file
+    BAD_TILE_VALUE = "Tile value is invalid"
+    BAD_BOARD_SIZE = "Board size must be greater than 0"
+    BAD_TREASURE_COUNT = "Treasure count must be greater than 0"
+    TREASURE_TOO_LONG = "Treasure length can't be greater than the board size"
@@ -0,0 +1,125 @@
+import random
+from game.constants.messages import ErrorMessages
+
+# The same engine as place_chains in the TCP server's Board.py: the web app and the server are deployed separately
+# (website/ on its own, the server image only has the top-level modules), so each keeps a copy.
+# test_game.py::test_placement_engines_agree checks that both lay out the same board from the same seed.
+
+# Random probes per chain before falling back to enumerating every valid placement
+SAMPLE_ATTEMPTS = 32
+# Chains undone while searching before switching to the guaranteed one-chain-per-row layout
+MAX_BACKTRACKS = 64
+# Up/left chains cover the same tiles as down/right chains started at their other end
+CHAIN_STEPS = ((1, 0), (0, 1))
+
+
+def check_treasure_fits(size: int, treasure: int) -> None:
+    """
+    Rejects board sizes and treasure counts that can never be placed.
+    Any treasure <= size always fits: one chain per row.
+    """
+    if size < 1:
+        raise ValueError(ErrorMessages.BAD_BOARD_SIZE)
+    if treasure < 1:
+        raise ValueError(ErrorMessages.BAD_TREASURE_COUNT)
+    if treasure > size:
+        raise ValueError(ErrorMessages.TREASURE_TOO_LONG)
+
+
+def chain_positions(size, row, col, step, length):
+    return [((row + step[0] * i) % size) * size + (col + step[1] * i) % size for i in range(length)]
+
+
+def free_runs(line):
+    """
+    Counts the consecutive free (0) tiles starting at each tile of a circular line.
+    """
+    size = len(line)
+    if not any(line):
+        return [size] * size
+    runs = [0] * size
+    run = 0
+    for i in range(2 * size - 1, -1, -1):
+        run = 0 if line[i % size] else run + 1
+        runs[i % size] = run
+    return runs
+
+
+def chain_candidates(cells, size, length):
+    """
+    Every (row, col, step) where a chain of the given length fits on free tiles.
+    """
+    down, right = CHAIN_STEPS
+    candidates = []
+    for row in range(size):
+        runs = free_runs(cells[row * size:(row + 1) * size])
+        candidates.extend((row, col, right) for col in range(size) if runs[col] >= length)
+    if length == 1:
+        return candidates
+    for col in range(size):
+        runs = free_runs(cells[col::size])
+        candidates.extend((row, col, down) for row in range(size) if runs[row] >= length)
+    return candidates
+
+
+def sample_chain(cells, size, length, rng):
+    for _ in range(SAMPLE_ATTEMPTS):
+        positions = chain_positions(size, rng.randrange(size), rng.randrange(size), rng.choice(CHAIN_STEPS), length)
+        if not any(cells[index] for index in positions):
+            return positions
+    return None
+
+
+def rows_layout(cells, size, treasure, rng):
+    """
+    Places each chain in its own random row (or column); always fits when treasure <= size.
+    """
+    transpose = rng.random() < 0.5
+    for length, line in zip(range(treasure, 0, -1), rng.sample(range(size), treasure)):
+        step = CHAIN_STEPS[0] if transpose else CHAIN_STEPS[1]
+        row, col = (rng.randrange(size), line) if transpose else (line, rng.randrange(size))
+        for index in chain_positions(size, row, col, step, length):
+            cells[index] = length
+
+
+def place_treasure(size: int, treasure: int, rng=random) -> list[int]:
+    """
+    Lays out treasure chains from treasure down to 1 on a size x size board with wraparound edges.
+    Each chain is tried with a few random probes, then chosen from every valid placement; when none is left,
+    earlier chains are moved (backtracking). After MAX_BACKTRACKS the one-chain-per-row layout is used,
+    so this always finishes in bounded time.
+    Returns row-major tile values: 0 for no treasure, otherwise the chain length.
+    """
+    check_treasure_fits(size, treasure)
+    cells = [0] * (size * size)
+    placed = []
+    backtracks = 0
+    length = treasure
+    while length > 0:
+        remaining = None
+        positions = sample_chain(cells, size, length, rng)
+        if positions is None:
+            remaining = chain_candidates(cells, size, length)
+            rng.shuffle(remaining)
+        while positions is None:
+            if remaining:
+                row, col, step = remaining.pop()
+                positions = chain_positions(size, row, col, step, length)
+                break
+            if not placed or backtracks >= MAX_BACKTRACKS:
+                cells = [0] * (size * size)
+                rows_layout(cells, size, treasure, rng)
+                return cells
+            backtracks += 1
+            length, remaining, undone = placed.pop()
+            for index in undone:
+                cells[index] = 0
+            if remaining is None:
+                remaining = [candidate for candidate in chain_candidates(cells, size, length)
+                             if chain_positions(size, *candidate, length) != undone]
+                rng.shuffle(remaining)
+        for index in positions:
+            cells[index] = length
+        placed.append((length, remaining, positions))
+        length -= 1
+    return cells
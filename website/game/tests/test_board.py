@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from game.models import Tile, Player
 from game.constants.constants import (
     DEFAULT_BOARD_SIZE,
@@ -84,3 +84,15 @@ class BoardCreationTests(TestCase):
         default_tiles = Tile.objects.filter(value=DEFAULT_TILE).count()
         expected_default = (DEFAULT_BOARD_SIZE * DEFAULT_BOARD_SIZE) - treasure_tiles
         self.assertEqual(default_tiles, expected_default)
+
+    @override_settings(GAME_SEED=226)
+    def test_seeded_board_is_reproducible(self):
+        """
+        Test that two boards started with the same GAME_SEED have the same treasure layout.
+        """
+        self.client.get('/game/')
+        first = list(Tile.objects.order_by('row', 'col').values_list('value', flat=True))
+        Tile.objects.all().delete()
+        self.client.get('/game/')
+        second = list(Tile.objects.order_by('row', 'col').values_list('value', flat=True))
+        self.assertEqual(first, second)
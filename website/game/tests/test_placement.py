@@ -0,0 +1,31 @@
+import random
+from django.test import SimpleTestCase
+from game.placement import place_treasure, rows_layout
+from game.constants.messages import ErrorMessages
+
+
+class PlacementTests(SimpleTestCase):
+    """Tests for the treasure placement engine used when a game starts."""
+
+    def assertChains(self, cells, treasure):
+        for value in range(1, treasure + 1):
+            self.assertEqual(cells.count(value), value, f'Expected {value} tiles with value {value}')
+
+    def test_dense_boards_terminate(self):
+        """
+        Boards where treasure equals the board size are the densest allowed and must always finish.
+        """
+        for size in range(1, 9):
+            for _ in range(20):
+                self.assertChains(place_treasure(size, size), size)
+
+    def test_rows_layout(self):
+        cells = [0] * 25
+        rows_layout(cells, 5, 5, random.Random(1))
+        self.assertChains(cells, 5)
+
+    def test_impossible_treasure_rejected(self):
+        with self.assertRaisesMessage(ValueError, ErrorMessages.TREASURE_TOO_LONG):
+            place_treasure(3, 4)
+        with self.assertRaisesMessage(ValueError, ErrorMessages.BAD_TREASURE_COUNT):
+            place_treasure(3, 0)
@@ -1,3 +1,5 @@
+import random
+from django.conf import settings
 from django.db import transaction
 from django.http import HttpResponse, HttpRequest, HttpResponseRedirect
 from django.shortcuts import redirect
@@ -7,7 +9,7 @@ from game.constants.constants import (
     DEFAULT_BOARD_SIZE,
     DEFAULT_TREASURE_COUNT,
 )
-import random
+from game.placement import place_treasure
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
@@ -40,49 +42,24 @@ def reset_game(request: HttpRequest) -> HttpResponse:
     return response
 
 @transaction.atomic
-def start_game(request: HttpRequest, size: int = DEFAULT_BOARD_SIZE, treasure : int = DEFAULT_TREASURE_COUNT) -> HttpResponse:
+def start_game(request: HttpRequest, size: int = DEFAULT_BOARD_SIZE, treasure : int = DEFAULT_TREASURE_COUNT,
+               seed: int | None = None) -> HttpResponse:
     """
     Starts the game with existing players.
     Creates a new board and places treasure.
+    The layout is reproducible when a seed is given, or when settings.GAME_SEED is set.
+    :raises ValueError: if treasure chains can never fit on the board
     """
-    tiles = [Tile(row=i, col=j, value=DEFAULT_TILE) for i in range(size) for j in range(size)]
-    Tile.objects.bulk_create(tiles)
-    
-    t_count = treasure
-
-    directions = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1)}
-    while t_count > 0:
-        placed = False
-        while not placed:
-            row = random.randint(0, size - 1)
-            col = random.randint(0, size - 1)
-            direction = random.choice(list(directions.values()))
+    if seed is None:
+        seed = settings.GAME_SEED
+    rng = random.Random(seed) if seed is not None else random
 
-            temp_row, temp_col = row, col
-
-            positions = []
-            for _ in range(t_count):
-                temp_row = temp_row % size
-                temp_col = temp_col % size
-
-                # locked until committed
-                tile = Tile.objects.select_for_update().get(row=temp_row, col=temp_col)
-                if tile.value != DEFAULT_TILE:
-                    break
-                positions.append((temp_row, temp_col))
-                temp_row += direction[0]
-                temp_col += direction[1]
-
-            if len(positions) == t_count:
-                for pos_row, pos_col in positions:
+    # Lay out the treasure in memory first; the engine always terminates and rejects impossible sizes up front
+    cells = place_treasure(size, treasure, rng)
+    tiles = [Tile(row=i, col=j, value=str(cells[i * size + j]) if cells[i * size + j] else DEFAULT_TILE)
+             for i in range(size) for j in range(size)]
+    Tile.objects.bulk_create(tiles)
 
-                    #locked until committed
-                    tile = Tile.objects.select_for_update().get(row=pos_row, col=pos_col)
-                    tile.value = str(t_count)
-                    tile.save()
-                placed = True
-                t_count -= 1
-    
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
         "game_default",
@@ -92,6 +92,9 @@ TEMPLATES = [
 WSGI_APPLICATION = 'website.wsgi.application'
 ASGI_APPLICATION = 'website.asgi.application'
 
+# Seed for treasure placement; set GAME_SEED to make every new board reproducible
+GAME_SEED = int(os.getenv("GAME_SEED")) if os.getenv("GAME_SEED") else None
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels.layers.InMemoryChannelLayer"